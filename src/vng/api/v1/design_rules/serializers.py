@@ -4,9 +4,14 @@ from django.core.validators import URLValidator
 from django.utils.translation import gettext_lazy as _
 
 from rest_framework import serializers, validators
+from drf_spectacular.utils import extend_schema_field
 
 from vng.design_rules.choices import DesignRuleChoices
-from vng.design_rules.models import DesignRuleTestSuite, DesignRuleSession, DesignRuleResult, DesignRuleTestVersion, DesignRuleTestOption
+from vng.design_rules.tasks.base import parse_specification
+from vng.design_rules.models import (
+    DesignRuleBatch, DesignRuleTestSuite, DesignRuleSession, DesignRuleResult, DesignRuleTestVersion, DesignRuleTestOption,
+    DesignRuleTrend
+)
 
 
 class TestVersionField(serializers.Field):
@@ -72,6 +77,46 @@ class StartSessionSerializer(serializers.Serializer):
     specification_url = serializers.URLField(validators=[URLValidator(message=_('Enter a valid URL.'))], required=False)
 
 
+class StartBatchSerializer(serializers.Serializer):
+    test_version = TestVersionField()
+    api_endpoints = serializers.ListField(
+        child=serializers.URLField(validators=[URLValidator(message=_('Enter a valid URL.'))]),
+        required=False,
+        help_text=_("The endpoints to test, all the registered test suites when omitted")
+    )
+
+
+class SpecificationField(serializers.Field):
+    """
+    An OpenAPI specification, as an uploaded file, pasted JSON or YAML text or a JSON object
+    """
+    default_error_messages = {
+        'invalid': _('Enter a valid OpenAPI specification in JSON or YAML format.'),
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, dict):
+            return data, True
+        if hasattr(data, 'read'):
+            data = data.read()
+        if not isinstance(data, (str, bytes)):
+            self.fail('invalid')
+        spec, is_json = parse_specification(data)
+        if spec is None:
+            self.fail('invalid')
+        return spec, is_json
+
+
+class LintSerializer(serializers.Serializer):
+    specification = SpecificationField()
+    test_version = TestVersionField(required=False, help_text=_("The latest active test version when omitted"))
+    api_endpoint = serializers.URLField(
+        validators=[URLValidator(message=_('Enter a valid URL.'))], required=False,
+        help_text=_("Also run the design rules that only check the URL of the endpoint")
+    )
+    save = serializers.BooleanField(default=False, help_text=_("Store the session and its results"))
+
+
 class DesignRuleTestOptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = DesignRuleTestOption
@@ -117,13 +162,20 @@ class DesignRuleSessionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = DesignRuleSession
-        fields = ("uuid", "started_at", "percentage_score", "test_version", "results")
-        read_only_fields = ("uuid", "started_at", "percentage_score")
+        fields = ("uuid", "started_at", "status", "progress", "finished_at", "percentage_score", "test_version", "results")
+        read_only_fields = ("uuid", "started_at", "status", "progress", "finished_at", "percentage_score")
 
     def get_test_version(self, obj):
         return obj.test_version.version
 
 
+class DesignRuleSessionStatusSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DesignRuleSession
+        fields = ("uuid", "status", "progress", "started_at", "finished_at", "percentage_score")
+        read_only_fields = fields
+
+
 class DesignRuleTestSuiteSerializer(DynamicFieldsModelSerializer, serializers.ModelSerializer):
     sessions = serializers.HyperlinkedRelatedField(
         many=True,
@@ -141,3 +193,85 @@ class DesignRuleTestSuiteSerializer(DynamicFieldsModelSerializer, serializers.Mo
     def create(self, validated_data):
         instance, _ = DesignRuleTestSuite.objects.get_or_create(api_endpoint=validated_data.get("api_endpoint"))
         return instance
+
+
+class DesignRuleTrendSerializer(serializers.ModelSerializer):
+    session = serializers.UUIDField(source="session.uuid", read_only=True)
+    passed = serializers.SerializerMethodField()
+    failed = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DesignRuleTrend
+        fields = ("session", "started_at", "duration", "percentage_score", "passed", "failed")
+        read_only_fields = fields
+
+    def get_passed(self, obj):
+        return [rule_type for rule_type, success in obj.get_passed().items() if success]
+
+    def get_failed(self, obj):
+        return [rule_type for rule_type, success in obj.get_passed().items() if not success]
+
+
+class DesignRuleTestSuiteTrendSerializer(serializers.Serializer):
+    test_suite = serializers.UUIDField()
+    api_endpoint = serializers.URLField()
+    history = DesignRuleTrendSerializer(many=True)
+
+
+class DesignRuleTrendDiffSerializer(serializers.Serializer):
+    session = serializers.UUIDField(help_text=_("The session that is compared"))
+    compared_to = serializers.UUIDField(help_text=_("The earlier session it is compared to"))
+    score_change = serializers.DecimalField(decimal_places=2, max_digits=6)
+    fixed = serializers.ListField(child=serializers.CharField(), help_text=_("Design rules that failed and now pass"))
+    regressed = serializers.ListField(child=serializers.CharField(), help_text=_("Design rules that passed and now fail"))
+    added = serializers.ListField(child=serializers.CharField(), help_text=_("Design rules that were not run before"))
+    removed = serializers.ListField(child=serializers.CharField(), help_text=_("Design rules that are no longer run"))
+
+
+class DesignRuleBatchSerializer(serializers.ModelSerializer):
+    test_version = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DesignRuleBatch
+        fields = ("uuid", "test_version", "created_at", "finished_at", "status")
+        read_only_fields = fields
+
+    def get_test_version(self, obj):
+        return obj.test_version.version
+
+
+class DesignRuleBatchResultSerializer(serializers.Serializer):
+    session = serializers.UUIDField()
+    api_endpoint = serializers.URLField()
+    status = serializers.CharField()
+    percentage_score = serializers.DecimalField(decimal_places=2, max_digits=5)
+    failed = serializers.ListField(child=serializers.CharField(), help_text=_("Design rules that failed"))
+
+
+class DesignRuleBatchReportSerializer(serializers.Serializer):
+    sessions = serializers.IntegerField()
+    finished = serializers.IntegerField()
+    errors = serializers.IntegerField()
+    successful = serializers.IntegerField(help_text=_("Sessions with a score of 100%"))
+    average_score = serializers.DecimalField(decimal_places=2, max_digits=5, allow_null=True)
+    results = DesignRuleBatchResultSerializer(many=True)
+
+
+class DesignRuleBatchDetailSerializer(DesignRuleBatchSerializer):
+    report = serializers.SerializerMethodField()
+
+    class Meta(DesignRuleBatchSerializer.Meta):
+        fields = DesignRuleBatchSerializer.Meta.fields + ("report", )
+        read_only_fields = fields
+
+    @extend_schema_field(DesignRuleBatchReportSerializer)
+    def get_report(self, obj):
+        return DesignRuleBatchReportSerializer(obj.get_report()).data
+
+
+class DesignRuleLintSerializer(serializers.Serializer):
+    session = serializers.UUIDField(allow_null=True, help_text=_("The stored session, only when it was asked to be saved"))
+    test_version = serializers.CharField()
+    percentage_score = serializers.DecimalField(decimal_places=2, max_digits=5)
+    results = DesignRuleResultSerializer(many=True)
+    skipped = serializers.ListField(child=serializers.CharField(), help_text=_("Design rules that need the live API"))
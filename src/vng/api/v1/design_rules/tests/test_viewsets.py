@@ -1,11 +1,16 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+import mock
+
 from django_webtest import WebTest
 from vng.design_rules.choices import DesignRuleChoices
 
 from vng.utils.factories import UserFactory
 from vng.api_authentication.tests.factories import CustomTokenFactory
 from vng.design_rules.choices import DesignRuleChoices
+from vng.design_rules.models import DesignRuleBatch, DesignRuleSession, DesignRuleTrend
 from vng.design_rules.tests.factories import DesignRuleSessionFactory, DesignRuleTestOptionFactory, DesignRuleTestSuiteFactory, DesignRuleTestVersionFactory, DesignRuleResultFactory
 
 
@@ -31,7 +36,15 @@ class DesignRuleTestSuiteViewSetTests(WebTest):
             'HTTP_AUTHORIZATION': 'Token {}'.format(token.key),
         }
         response = self.app.post(url, params={"test_version": test_version.id}, extra_environ=extra_environ)
-        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.status_code, 202)
+        session = test_suite.get_latest_session()
+        self.assertTrue(response.headers["Location"].endswith(
+            reverse("api_v1_design_rules:session-status", kwargs={"uuid": session.uuid})
+        ))
+
+        response = self.app.get(response.headers["Location"], extra_environ=extra_environ)
+        self.assertEqual(response.json["uuid"], str(session.uuid))
+        self.assertEqual(response.json["status"], "finished")
 
     def test_start_session_design_rule_test_version_does_not_exist(self):
         token = CustomTokenFactory()
@@ -90,3 +103,205 @@ class DesignRuleSessionViewSetTests(WebTest):
             "url": "https://docs.geostandaarden.nl/api/API-Designrules/#api-03-only-apply-default-http-operations",
             "description": "A RESTful API is an application programming interface that supports the default HTTP operations GET, PUT, POST, PATCH and DELETE."
         }])
+
+
+class DesignRuleBatchViewSetTests(WebTest):
+    def setUp(self):
+        token = CustomTokenFactory()
+        self.extra_environ = {
+            'HTTP_AUTHORIZATION': 'Token {}'.format(token.key),
+        }
+        self.test_version = DesignRuleTestVersionFactory()
+        DesignRuleTestOptionFactory(test_version=self.test_version, rule_type=DesignRuleChoices.api_03_20200709)
+
+    def test_view_is_protected(self):
+        self.app.post_json(reverse("api_v1_design_rules:batch-list"), {}, status=401)
+
+    @mock.patch("vng.design_rules.models.execute_batch")
+    def test_start_batch_for_endpoints(self, execute_batch):
+        existing = DesignRuleTestSuiteFactory(api_endpoint="https://maykinmedia.nl/api/v1")
+        DesignRuleTestSuiteFactory(api_endpoint="https://example.com/not-in-batch")
+
+        response = self.app.post_json(reverse("api_v1_design_rules:batch-list"), {
+            "test_version": self.test_version.pk,
+            "api_endpoints": ["https://maykinmedia.nl/api/v1", "https://example.com/api/v1"],
+        }, extra_environ=self.extra_environ)
+
+        self.assertEqual(response.status_code, 202)
+        batch = DesignRuleBatch.objects.get()
+        self.assertTrue(response.headers["Location"].endswith(
+            reverse("api_v1_design_rules:batch-detail", kwargs={"uuid": batch.uuid})
+        ))
+        self.assertEqual(
+            set(batch.sessions.values_list("test_suite__api_endpoint", flat=True)),
+            {"https://maykinmedia.nl/api/v1", "https://example.com/api/v1"}
+        )
+        self.assertTrue(batch.sessions.filter(test_suite=existing).exists())
+        execute_batch.delay.assert_called_once_with(batch.pk)
+
+    @mock.patch("vng.design_rules.models.execute_batch")
+    def test_start_batch_for_all_test_suites(self, execute_batch):
+        DesignRuleTestSuiteFactory(api_endpoint="https://maykinmedia.nl/api/v1")
+        DesignRuleTestSuiteFactory(api_endpoint="https://example.com/api/v1")
+
+        self.app.post_json(reverse("api_v1_design_rules:batch-list"), {
+            "test_version": self.test_version.pk,
+        }, extra_environ=self.extra_environ, status=202)
+
+        self.assertEqual(DesignRuleBatch.objects.get().sessions.count(), 2)
+
+    def test_report(self):
+        batch = DesignRuleBatch.objects.create(test_version=self.test_version, status="finished")
+        passed = DesignRuleSessionFactory(batch=batch, status="finished", percentage_score=100)
+        failed = DesignRuleSessionFactory(batch=batch, status="finished", percentage_score=0)
+        DesignRuleResultFactory(design_rule=failed, rule_type=DesignRuleChoices.api_03_20200709, success=False)
+
+        response = self.app.get(
+            reverse("api_v1_design_rules:batch-detail", kwargs={"uuid": batch.uuid}), extra_environ=self.extra_environ
+        )
+
+        report = response.json["report"]
+        self.assertEqual(report["sessions"], 2)
+        self.assertEqual(report["successful"], 1)
+        self.assertEqual(report["average_score"], "50.00")
+        failures = {result["session"]: result["failed"] for result in report["results"]}
+        self.assertEqual(failures, {str(passed.uuid): [], str(failed.uuid): [DesignRuleChoices.api_03_20200709]})
+
+
+class DesignRuleLintViewTests(WebTest):
+    def setUp(self):
+        token = CustomTokenFactory()
+        self.extra_environ = {
+            'HTTP_AUTHORIZATION': 'Token {}'.format(token.key),
+        }
+        self.test_version = DesignRuleTestVersionFactory()
+        DesignRuleTestOptionFactory(test_version=self.test_version, rule_type=DesignRuleChoices.api_16_20200709)
+        DesignRuleTestOptionFactory(test_version=self.test_version, rule_type=DesignRuleChoices.api_48_20200709)
+        self.url = reverse("api_v1_design_rules:lint")
+
+    def test_view_is_protected(self):
+        self.app.post_json(self.url, {}, status=401)
+
+    def test_lint_json(self):
+        response = self.app.post_json(self.url, {
+            "specification": {"openapi": "2.0.0", "paths": {}},
+        }, extra_environ=self.extra_environ)
+
+        self.assertIsNone(response.json["session"])
+        self.assertEqual(response.json["percentage_score"], "0.00")
+        self.assertEqual([result["success"] for result in response.json["results"]], [False])
+        self.assertEqual(response.json["skipped"], [DesignRuleChoices.api_48_20200709])
+        self.assertFalse(DesignRuleSession.objects.exists())
+
+    def test_lint_uploaded_yaml(self):
+        response = self.app.post(self.url, {
+            "test_version": self.test_version.pk,
+            "save": "true",
+        }, upload_files=[("specification", "openapi.yaml", b"openapi: 3.0.0\npaths: {}\n")], extra_environ=self.extra_environ)
+
+        self.assertEqual(response.json["percentage_score"], "100.00")
+        self.assertEqual(response.json["session"], str(DesignRuleSession.objects.get().uuid))
+
+    def test_invalid_specification(self):
+        response = self.app.post(self.url, {
+            "specification": "<html></html>",
+        }, extra_environ=self.extra_environ, status=400)
+
+        self.assertEqual(response.json, {"specification": ["Enter a valid OpenAPI specification in JSON or YAML format."]})
+
+
+class DesignRuleTrendViewSetTests(WebTest):
+    def setUp(self):
+        token = CustomTokenFactory()
+        self.extra_environ = {
+            'HTTP_AUTHORIZATION': 'Token {}'.format(token.key),
+        }
+        self.test_suite = DesignRuleTestSuiteFactory()
+        self.first = self._session(api_03=False, api_16=True)
+        self.second = self._session(api_03=True, api_16=False)
+
+    def _session(self, api_03, api_16):
+        session = DesignRuleSessionFactory(test_suite=self.test_suite, percentage_score=50)
+        DesignRuleResultFactory(design_rule=session, rule_type=DesignRuleChoices.api_03_20200709, success=api_03)
+        DesignRuleResultFactory(design_rule=session, rule_type=DesignRuleChoices.api_16_20200709, success=api_16)
+        DesignRuleTrend.record(session)
+        return session
+
+    def test_history(self):
+        other_suite = DesignRuleTestSuiteFactory(api_endpoint="https://other.example.com/api/v1")
+        url = reverse("api_v1_design_rules:trend-list")
+
+        response = self.app.get(url, {
+            "test_suites": "{},{}".format(self.test_suite.uuid, other_suite.uuid)
+        }, extra_environ=self.extra_environ)
+
+        self.assertEqual(len(response.json), 1)
+        history = response.json[0]["history"]
+        self.assertEqual([h["session"] for h in history], [str(self.second.uuid), str(self.first.uuid)])
+        self.assertEqual(history[0]["passed"], [DesignRuleChoices.api_03_20200709])
+        self.assertEqual(history[0]["failed"], [DesignRuleChoices.api_16_20200709])
+
+    def test_history_limit(self):
+        url = reverse("api_v1_design_rules:trend-list")
+
+        response = self.app.get(url, {
+            "test_suites": str(self.test_suite.uuid), "limit": 1
+        }, extra_environ=self.extra_environ)
+
+        self.assertEqual([h["session"] for h in response.json[0]["history"]], [str(self.second.uuid)])
+
+        for limit in (0, -1, "nope"):
+            response = self.app.get(url, {
+                "test_suites": str(self.test_suite.uuid), "limit": limit
+            }, extra_environ=self.extra_environ, status=400)
+            self.assertEqual(response.json, {"limit": ["A valid integer is required."]})
+
+    def test_history_many_suites(self):
+        url = reverse("api_v1_design_rules:trend-list")
+
+        with CaptureQueriesContext(connection) as one_suite:
+            self.app.get(url, {"test_suites": str(self.test_suite.uuid)}, extra_environ=self.extra_environ)
+
+        other_suites = [DesignRuleTestSuiteFactory(api_endpoint="https://{}.example.com/api/v1".format(i)) for i in range(3)]
+        for test_suite in other_suites:
+            for i in range(3):
+                DesignRuleTrend.record(DesignRuleSessionFactory(test_suite=test_suite))
+        uuids = [str(test_suite.uuid) for test_suite in reversed(other_suites)] + [str(self.test_suite.uuid)]
+        with CaptureQueriesContext(connection) as many_suites:
+            response = self.app.get(url, {
+                "test_suites": ",".join(uuids), "limit": 2
+            }, extra_environ=self.extra_environ)
+
+        self.assertEqual(len(many_suites), len(one_suite))
+        self.assertEqual([suite["test_suite"] for suite in response.json], uuids)
+        self.assertEqual([len(suite["history"]) for suite in response.json], [2, 2, 2, 2])
+        self.assertEqual(response.json[-1]["history"][0]["session"], str(self.second.uuid))
+
+    def test_diff(self):
+        url = reverse("api_v1_design_rules:trend-diff")
+
+        response = self.app.get(url, {
+            "sessions": "{}:{}".format(self.second.uuid, self.first.uuid)
+        }, extra_environ=self.extra_environ)
+
+        self.assertEqual(response.json, [{
+            "session": str(self.second.uuid),
+            "compared_to": str(self.first.uuid),
+            "score_change": "0.00",
+            "fixed": [DesignRuleChoices.api_03_20200709],
+            "regressed": [DesignRuleChoices.api_16_20200709],
+            "added": [],
+            "removed": [],
+        }])
+
+    def test_diff_latest_sessions(self):
+        url = reverse("api_v1_design_rules:trend-diff")
+
+        response = self.app.get(url, {"test_suites": str(self.test_suite.uuid)}, extra_environ=self.extra_environ)
+
+        self.assertEqual(response.json[0]["session"], str(self.second.uuid))
+
+    def test_invalid_uuid(self):
+        url = reverse("api_v1_design_rules:trend-list")
+
+        self.app.get(url, {"test_suites": "nope"}, extra_environ=self.extra_environ, status=400)
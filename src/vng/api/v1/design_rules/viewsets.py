@@ -1,22 +1,53 @@
+from collections import OrderedDict
+from uuid import UUID
+
+from django.db import connection
+from django.db.models import F, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
 from django.http.response import JsonResponse
 from django.shortcuts import get_object_or_404
 
 from rest_framework import mixins, permissions
 from rest_framework.authentication import SessionAuthentication
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.viewsets import GenericViewSet
 from rest_framework.views import APIView
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 
 from vng.api_authentication.authentication import CustomTokenAuthentication
-from vng.design_rules.models import DesignRuleTestSuite, DesignRuleSession, DesignRuleTestVersion
+from vng.design_rules.models import (
+    DesignRuleBatch, DesignRuleTestSuite, DesignRuleSession, DesignRuleTestVersion, DesignRuleTrend
+)
 from vng.servervalidation.serializers import ServerRunResultShield
 
-from .serializers import DesignRuleSessionSerializer, DesignRuleTestSuiteSerializer, DesignRuleTestVersionSerializer, StartSessionSerializer
+from .serializers import (
+    DesignRuleSessionSerializer, DesignRuleSessionStatusSerializer, DesignRuleTestSuiteSerializer, DesignRuleTestVersionSerializer,
+    StartSessionSerializer, DesignRuleTestSuiteTrendSerializer, DesignRuleTrendDiffSerializer, StartBatchSerializer,
+    DesignRuleBatchSerializer, DesignRuleBatchDetailSerializer, LintSerializer, DesignRuleLintSerializer
+)
+
+
+START_SESSION_DESCRIPTION = (
+    "Start a new session for an existing Design rule Test suite. This will generate new results, without having to add the endpoint(s) again. "
+    "The session is run in the background, poll the URL in the `Location` header until its status is `finished` or `error`."
+)
 
+START_BATCH_DESCRIPTION = (
+    "Start a session for every given endpoint, or for all the Design rule Test suites when no endpoints are given. "
+    "The sessions are run in the background, poll the URL in the `Location` header for the report of the batch."
+)
 
-START_SESSION_DESCRIPTION = "Start a new session for an existing Design rule Test suite. This will generate new results, without having to add the endpoint(s) again."
+LINT_DESCRIPTION = (
+    "Run the design rules that only need the OpenAPI specification, without contacting the API. "
+    "The specification is given as an uploaded file, as pasted JSON or YAML or as a JSON object. "
+    "Nothing is stored unless `save` is given. "
+    "Rules which also check how the API serves its specification are skipped and listed in `skipped`, "
+    "e.g. API-51 checks the location of the specification and its CORS headers."
+)
 
 
 class DesignRuleTestVersionViewSet(mixins.ListModelMixin, GenericViewSet):
@@ -46,16 +77,18 @@ class DesignRuleTestSuiteViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMi
     serializer_class = DesignRuleTestSuiteSerializer
     lookup_field = 'uuid'
 
-    @extend_schema(description=START_SESSION_DESCRIPTION, request=StartSessionSerializer, responses={201: DesignRuleSessionSerializer})
+    @extend_schema(description=START_SESSION_DESCRIPTION, request=StartSessionSerializer, responses={202: DesignRuleSessionSerializer})
     @action(detail=True, methods=['post'], description="Start a new session for the test suite")
     def start_session(self, request, uuid=None):
         serializer = StartSessionSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         obj = self.get_object()
-        obj.start_session(serializer.data.get("test_version"), serializer.data.get("specification_url", ""))
+        session = obj.start_session(serializer.data.get("test_version"), serializer.data.get("specification_url", ""))
+        session.refresh_from_db()
 
-        serializer = DesignRuleSessionSerializer(instance=obj.get_latest_session())
-        return Response(serializer.data, status=201)
+        serializer = DesignRuleSessionSerializer(instance=session)
+        location = reverse("api_v1_design_rules:session-status", kwargs={"uuid": session.uuid}, request=request)
+        return Response(serializer.data, status=202, headers={"Location": location})
 
 
 class DesignRuleSessionViewSet(mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericViewSet):
@@ -71,6 +104,194 @@ class DesignRuleSessionViewSet(mixins.RetrieveModelMixin, mixins.ListModelMixin,
     serializer_class = DesignRuleSessionSerializer
     lookup_field = 'uuid'
 
+    @extend_schema(description="Get the progress of a session, without its results.", responses={200: DesignRuleSessionStatusSerializer})
+    @action(detail=True, methods=['get'], description="Get the progress of a session")
+    def status(self, request, uuid=None):
+        serializer = DesignRuleSessionStatusSerializer(instance=self.get_object())
+        return Response(serializer.data)
+
+
+class DesignRuleBatchViewSet(mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericViewSet):
+    """
+    list:
+    Get all the Design rule batches, newest first.
+    read:
+    Get a single Design rule batch with the report of its sessions.
+    create:
+    Start a Design rule session for many Design rule Test suites at once.
+    """
+    authentication_classes = (CustomTokenAuthentication, SessionAuthentication)
+    permission_classes = (permissions.IsAuthenticated, )
+    queryset = DesignRuleBatch.objects.select_related("test_version")
+    lookup_field = 'uuid'
+
+    def get_serializer_class(self):
+        if self.action == "retrieve":
+            return DesignRuleBatchDetailSerializer
+        return DesignRuleBatchSerializer
+
+    @extend_schema(description=START_BATCH_DESCRIPTION, request=StartBatchSerializer, responses={202: DesignRuleBatchSerializer})
+    def create(self, request):
+        serializer = StartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        api_endpoints = serializer.validated_data.get("api_endpoints")
+        if api_endpoints:
+            test_suites = [
+                DesignRuleTestSuite.objects.get_or_create(api_endpoint=api_endpoint)[0]
+                for api_endpoint in dict.fromkeys(api_endpoints)
+            ]
+        else:
+            test_suites = DesignRuleTestSuite.objects.all()
+        batch = DesignRuleBatch.start(serializer.validated_data["test_version"], test_suites)
+        batch.refresh_from_db()
+
+        location = reverse("api_v1_design_rules:batch-detail", kwargs={"uuid": batch.uuid}, request=request)
+        return Response(DesignRuleBatchSerializer(instance=batch).data, status=202, headers={"Location": location})
+
+
+def _uuid_list(value, name):
+    try:
+        return [UUID(item) for item in value.split(",") if item]
+    except ValueError:
+        raise ValidationError({name: "Enter a comma separated list of valid UUIDs."})
+
+
+def _diff(trend, compared_to):
+    passed, before = trend.get_passed(), compared_to.get_passed()
+    return {
+        "session": trend.session.uuid,
+        "compared_to": compared_to.session.uuid,
+        "score_change": trend.percentage_score - compared_to.percentage_score,
+        "fixed": [r for r, success in passed.items() if success and before.get(r) is False],
+        "regressed": [r for r, success in passed.items() if not success and before.get(r) is True],
+        "added": [r for r in passed if r not in before],
+        "removed": [r for r in before if r not in passed],
+    }
+
+
+class DesignRuleTrendViewSet(GenericViewSet):
+    """
+    list:
+    Get the score history of one or more Design rule Test suites, newest session first.
+    diff:
+    Get the design rules that changed between pairs of sessions.
+    """
+    authentication_classes = (CustomTokenAuthentication, SessionAuthentication)
+    permission_classes = (permissions.IsAuthenticated, )
+    queryset = DesignRuleTrend.objects.select_related("session")
+    serializer_class = DesignRuleTestSuiteTrendSerializer
+
+    def get_latest(self, test_suites, limit):
+        """
+        Return the test suites with their latest `limit` trends, newest first,
+        in the given order. The trends of all suites are read in one query,
+        numbered per suite by a window function.
+        """
+        ranked = DesignRuleTrend.objects.filter(test_suite__uuid__in=test_suites).annotate(
+            trend_rank=Window(RowNumber(), partition_by=F("test_suite"), order_by=F("started_at").desc())
+        ).order_by().values("pk", "trend_rank")
+        # A window function cannot be filtered on in the ORM, so the ranked trends are a subquery
+        sql, params = ranked.query.sql_with_params()
+        latest_pks = RawSQL(
+            "SELECT ranked.{} FROM ({}) ranked WHERE ranked.trend_rank <= %s".format(
+                connection.ops.quote_name(DesignRuleTrend._meta.pk.column), sql
+            ),
+            params + (limit, )
+        )
+
+        trends = OrderedDict()
+        for trend in self.get_queryset().filter(pk__in=latest_pks).select_related("test_suite").order_by("-started_at"):
+            trends.setdefault(trend.test_suite.uuid, []).append(trend)
+        return OrderedDict(
+            (trends[uuid][0].test_suite, trends[uuid]) for uuid in dict.fromkeys(test_suites) if uuid in trends
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("test_suites", str, description="Comma separated UUIDs of the test suites"),
+            OpenApiParameter("limit", int, description="The maximum number of sessions per test suite, 30 by default"),
+        ],
+        responses={200: DesignRuleTestSuiteTrendSerializer(many=True)}
+    )
+    def list(self, request):
+        test_suites = _uuid_list(request.query_params.get("test_suites", ""), "test_suites")
+        try:
+            limit = int(request.query_params.get("limit", 30))
+        except ValueError:
+            raise ValidationError({"limit": "A valid integer is required."})
+        if limit <= 0:
+            raise ValidationError({"limit": "A valid integer is required."})
+
+        history = [
+            {"test_suite": suite.uuid, "api_endpoint": suite.api_endpoint, "history": trends}
+            for suite, trends in self.get_latest(test_suites, limit).items()
+        ]
+        serializer = self.get_serializer(history, many=True)
+        return Response(serializer.data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "sessions", str,
+                description="Comma separated pairs of session UUIDs to compare, as `<session>:<earlier session>`"
+            ),
+            OpenApiParameter(
+                "test_suites", str,
+                description="Comma separated UUIDs of test suites, their latest session is compared to the one before"
+            ),
+        ],
+        responses={200: DesignRuleTrendDiffSerializer(many=True)}
+    )
+    @action(detail=False, methods=["get"], description="Compare the results of sessions")
+    def diff(self, request):
+        pairs = []
+        for pair in request.query_params.get("sessions", "").split(","):
+            if pair:
+                uuids = _uuid_list(pair.replace(":", ","), "sessions")
+                if len(uuids) != 2:
+                    raise ValidationError({"sessions": "Enter pairs of session UUIDs, as `<session>:<earlier session>`."})
+                pairs.append(uuids)
+        test_suites = _uuid_list(request.query_params.get("test_suites", ""), "test_suites")
+
+        trends = {
+            trend.session.uuid: trend
+            for trend in self.get_queryset().filter(session__uuid__in=[uuid for pair in pairs for uuid in pair])
+        }
+        diffs = [_diff(trends[a], trends[b]) for a, b in pairs if a in trends and b in trends]
+        diffs += [
+            _diff(*suite_trends) for suite_trends in self.get_latest(test_suites, 2).values() if len(suite_trends) > 1
+        ]
+
+        return Response(DesignRuleTrendDiffSerializer(diffs, many=True).data)
+
+
+class DesignRuleLintView(APIView):
+    authentication_classes = (CustomTokenAuthentication, SessionAuthentication)
+    permission_classes = (permissions.IsAuthenticated, )
+
+    @extend_schema(description=LINT_DESCRIPTION, request=LintSerializer, responses={200: DesignRuleLintSerializer})
+    def post(self, request):
+        serializer = LintSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        test_version = serializer.validated_data.get("test_version")
+        if test_version is None:
+            test_version = DesignRuleTestVersion.objects.filter(is_active=True).order_by("-pk").first()
+            if test_version is None:
+                raise ValidationError({"test_version": "There is no active test version."})
+        spec, is_json = serializer.validated_data["specification"]
+
+        session, results, skipped = DesignRuleSession.lint(
+            test_version, spec, is_json, serializer.validated_data.get("api_endpoint"),
+            save=serializer.validated_data["save"]
+        )
+        return Response(DesignRuleLintSerializer({
+            "session": session.uuid if session.pk else None,
+            "test_version": test_version.version,
+            "percentage_score": session.percentage_score,
+            "results": results,
+            "skipped": skipped,
+        }).data)
+
 
 class DesignRuleSessionShieldView(APIView):
     queryset = DesignRuleSession.objects.all()
@@ -8,5 +8,9 @@ app_name = apps.AppConfig.__name__
 router = routers.DefaultRouter(trailing_slash=False)
 router.register('provider-run', api_views.ServerRunViewSet, base_name='api_server-run')
 router.register('postman-test', api_views.PostmanTestViewset, base_name='api_postman-test')
+router.register(
+    r'provider-run/(?P<uuid>[^/.]+)/result/(?P<test_result_pk>[0-9]+)/execution',
+    api_views.PostmanExecutionViewSet, base_name='api_postman-execution'
+)
 
 urlpatterns = router.urls
@@ -2,7 +2,7 @@ from rest_framework import serializers
 from django.conf import settings
 from subdomains.utils import reverse as reverse_sub
 
-from vng.testsession.models import SessionType, ExposedUrl, Session, ScenarioCase
+from vng.testsession.models import SessionType, ExposedUrl, Session, ScenarioCase, SessionLog
 
 
 class SessionTypesSerializer(serializers.ModelSerializer):
@@ -59,7 +59,9 @@ class SessionStatusSerializer(serializers.ModelSerializer):
             'stopped',
             'status',
             'deploy_status',
-            'deploy_percentage'
+            'deploy_percentage',
+            'suspended',
+            'last_activity'
         ]
 
 
@@ -93,3 +95,10 @@ class ScenarioCaseSerializer(serializers.ModelSerializer):
     class Meta:
         model = ScenarioCase
         fields = ['url', 'http_method', 'collection']
+
+
+class SessionLogSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = SessionLog
+        fields = ['uuid', 'date', 'method', 'url', 'path', 'response_status']
@@ -3,7 +3,10 @@ from rest_framework import routers
 from django.urls import path
 
 from vng.testsession import apps
-from .views import SessionViewSet, SessionTypesViewSet, ExposedUrlView, SessionViewStatusSet, ResultSessionView, ResultTestsessionViewShield, StopSessionView
+from .views import (
+    SessionViewSet, SessionTypesViewSet, ExposedUrlView, SessionViewStatusSet, ResultSessionView,
+    ResultTestsessionViewShield, StopSessionView, SessionLogListView
+)
 
 
 app_name = apps.AppConfig.__name__
@@ -20,4 +23,5 @@ urlpatterns = router.urls + [
     path('testsession-run-shield/<uuid:uuid>/', ResultTestsessionViewShield.as_view(), name='testsession-shield'),
     path('testsessions/<uuid:uuid>/stop', StopSessionView.as_view(), name='stop_session'),
     path('testsessions/<uuid:uuid>/result', ResultSessionView.as_view(), name='result_session'),
+    path('testsessions/<uuid:uuid>/logs', SessionLogListView.as_view(), name='session_logs'),
 ]
@@ -1,12 +1,15 @@
 import json
 import re
 import logging
+import time
 from urllib import parse
 
 from subdomains.utils import reverse as reverse_sub
+from django.conf import settings
 from django.shortcuts import get_object_or_404
 from django.views import View
 from django.utils import timezone
+from django.db import IntegrityError, transaction
 from django.db.models import Count
 from django.core.exceptions import PermissionDenied
 from django.http import (
@@ -14,15 +17,18 @@ from django.http import (
 )
 
 import requests
-from rest_framework import generics, permissions, viewsets, views, mixins
+from rest_framework import generics, permissions, status, viewsets, views, mixins
 from rest_framework.authentication import (
     SessionAuthentication
 )
-from drf_spectacular.utils import extend_schema
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from drf_spectacular.utils import extend_schema, OpenApiParameter
 
 from vng.testsession.models import (
     ScenarioCase, Session, SessionLog, SessionType, ExposedUrl, Report,
-    QueryParamsScenario, InjectHeader
+    InjectHeader
 )
 
 from vng.servervalidation.serializers import ServerRunResultShield
@@ -32,11 +38,13 @@ from vng.utils.views import CSRFExemptMixin
 from vng.testsession.permission import IsOwner
 from .serializers import (
     SessionSerializer, SessionTypesSerializer, ExposedUrlSerializer, ScenarioCaseSerializer,
-    SessionStatusSerializer
+    SessionStatusSerializer, SessionLogSerializer
 )
-from vng.testsession.views import bootstrap_session
-from vng.testsession.task import run_tests, stop_session
+from vng.testsession.activity import tracker
+from vng.testsession.task import bootstrap_session, resume_session, run_tests, stop_session
 from vng.utils.auth import get_jwt
+from vng.utils.instrumentation import PROXY, timer
+from vng.utils.pagination import KeysetPagination
 
 from vng.api_authentication.authentication import CustomTokenAuthentication
 
@@ -87,19 +95,73 @@ class SessionViewSet(
     def get_queryset(self):
         return Session.objects.all().prefetch_related('exposedurl_set').filter(user=self.request.user)
 
-    def perform_create(self, serializer):
-        session = serializer.save(
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'Idempotency-Key', str, OpenApiParameter.HEADER,
+                description='Retried calls with the same key return the session created by the first call'
+            ),
+            OpenApiParameter(
+                'wait', int,
+                description='Seconds to wait for the session to be running, at most {}'.format(settings.SESSION_CREATE_MAX_WAIT)
+            ),
+        ],
+        responses={201: SessionSerializer, 202: SessionSerializer}
+    )
+    def create(self, request, *args, **kwargs):
+        """
+        The session is deployed in the background, poll the URL in the `Location`
+        header until its status is `running`
+        """
+        try:
+            wait = min(int(request.query_params.get('wait', 0)), settings.SESSION_CREATE_MAX_WAIT)
+        except ValueError:
+            raise ValidationError({'wait': 'A valid integer is required.'})
+        idempotency_key = request.META.get('HTTP_IDEMPOTENCY_KEY', '')[:100]
+        session = None
+        if idempotency_key:
+            session = Session.objects.filter(user=request.user, idempotency_key=idempotency_key).first()
+        if session is None:
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            try:
+                with transaction.atomic():
+                    self.perform_create(serializer, idempotency_key=idempotency_key)
+            except IntegrityError:
+                if not idempotency_key:
+                    raise
+                # A concurrent call with the same key created the session first
+                session = Session.objects.get(user=request.user, idempotency_key=idempotency_key)
+            else:
+                session = serializer.instance
+                bootstrap_session.delay(session.uuid)
+
+        deadline = time.monotonic() + wait
+        session.refresh_from_db()
+        while self._is_starting(session) and time.monotonic() < deadline:
+            time.sleep(1)
+            session.refresh_from_db()
+
+        location = reverse('apiv1session:test_session-status-detail', kwargs={'uuid': session.uuid}, request=request)
+        return Response(
+            self.get_serializer(session).data,
+            status=status.HTTP_202_ACCEPTED if self._is_starting(session) else status.HTTP_201_CREATED,
+            headers={'Location': location}
+        )
+
+    @staticmethod
+    def _is_starting(session):
+        return session.status in (choices.SessionStatusChoices.starting, choices.SessionStatusChoices.queued)
+
+    def perform_create(self, serializer, idempotency_key=''):
+        serializer.save(
             user=self.request.user,
             pk=None,
             status=choices.StatusChoices.starting,
             name=Session.assign_name(self.request.user.id),
-            started=timezone.now()
+            started=timezone.now(),
+            idempotency_key=idempotency_key
         )
-        try:
-            bootstrap_session(session.uuid)
-        except Exception as e:
-            logger.exception(e)
-            session.delete()
 
 
 class StopSessionView(generics.ListAPIView):
@@ -148,7 +210,7 @@ class ResultSessionView(views.APIView):
         if session.user != request.user:
             raise PermissionDenied
         scenario_cases = session.session_type.scenario_cases
-        report = list(Report.objects.filter(session_log__session=session))
+        report = list(Report.objects.filter(session_log__session=session).select_related('scenario_case'))
 
         def check(scenario_cases, report):
             if len(report) == 0:
@@ -170,7 +232,7 @@ class ResultSessionView(views.APIView):
         for case in scenario_cases:
             is_in = False
             for rp in report:
-                if rp.scenario_case == case:
+                if rp.scenario_case_id == case.pk:
                     is_in = True
                     break
             if not is_in:
@@ -189,10 +251,69 @@ class ResultSessionView(views.APIView):
         return response
 
     def get_object(self):
-        self.session = get_object_or_404(Session, uuid=self.kwargs['uuid'])
+        self.session = get_object_or_404(
+            Session.objects.select_related('session_type__api'), uuid=self.kwargs['uuid']
+        )
         return self.session
 
 
+class SessionLogListView(generics.ListAPIView):
+    """
+    Session logs
+
+    Return the calls made to a session, oldest first. Follow the `next` and `previous` links to page through them.
+    """
+    authentication_classes = (CustomTokenAuthentication, SessionAuthentication)
+    permission_classes = (permissions.IsAuthenticated,)
+    serializer_class = SessionLogSerializer
+    pagination_class = KeysetPagination
+
+    @extend_schema(parameters=[
+        OpenApiParameter('after', str, description='Cursor of the next page'),
+        OpenApiParameter('before', str, description='Cursor of the previous page'),
+        OpenApiParameter('page_size', int, description='Number of logs per page, at most 1000'),
+        OpenApiParameter('status_from', int, description='Lowest HTTP status code of the response'),
+        OpenApiParameter('status_to', int, description='Highest HTTP status code of the response'),
+        OpenApiParameter('method', str, description='HTTP method of the request'),
+        OpenApiParameter('path', str, description='Start of the path of the URL of the request'),
+        OpenApiParameter('scenario_case', int, description='ID of the scenario case matched by the call'),
+    ])
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_int_param(self, name):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({name: 'A whole number is required'})
+
+    def get_queryset(self):
+        session = get_object_or_404(Session, uuid=self.kwargs['uuid'])
+        if session.user != self.request.user:
+            raise PermissionDenied
+        # The request and response bodies are only needed for the details of a call
+        queryset = SessionLog.objects.filter(session=session).defer('request', 'response')
+
+        params = self.request.query_params
+        status_from = self.get_int_param('status_from')
+        if status_from is not None:
+            queryset = queryset.filter(response_status__gte=status_from)
+        status_to = self.get_int_param('status_to')
+        if status_to is not None:
+            queryset = queryset.filter(response_status__lte=status_to)
+        if params.get('method'):
+            queryset = queryset.filter(method=params['method'].upper())
+        if params.get('path'):
+            queryset = queryset.filter(path__startswith=params['path'])
+        scenario_case = self.get_int_param('scenario_case')
+        if scenario_case is not None:
+            queryset = queryset.filter(report__scenario_case=scenario_case)
+        return queryset
+
+
 class SessionTypesViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
     """
     Session types
@@ -229,7 +350,9 @@ class RunTest(CSRFExemptMixin, View):
     error_codes = [(400, 599)]  # boundaries considered as errors
 
     def get_queryset(self):
-        return get_object_or_404(ExposedUrl, subdomain=self.request.subdomain).session
+        return get_object_or_404(
+            ExposedUrl.objects.select_related('session__session_type'), subdomain=self.request.subdomain
+        ).session
 
     def match_url(self, url, compare, query_params):
         '''
@@ -291,14 +414,15 @@ class RunTest(CSRFExemptMixin, View):
         logger.info(url)
         logger.info(relative_url)
 
-        exposed = ExposedUrl.objects.get(subdomain=url, session=session)
+        exposed = ExposedUrl.objects.select_related('vng_endpoint__scenario_collection').get(subdomain=url, session=session)
         endpoint = exposed.vng_endpoint
         if endpoint.scenario_collection:
             scenario_cases = endpoint.scenario_collection.scenariocase_set.filter(http_method__iexact=request_method_name)
-            ordered_scenario_cases = scenario_cases.annotate(count=Count('queryparamsscenario')).order_by('-count')
+            ordered_scenario_cases = scenario_cases.annotate(count=Count('queryparamsscenario')).order_by('-count') \
+                .prefetch_related('queryparamsscenario_set')
             for case in ordered_scenario_cases:
                 logger.info(case)
-                if self.match_url(request.build_absolute_uri(), case.url, QueryParamsScenario.objects.filter(scenario_case=case)):
+                if self.match_url(request.build_absolute_uri(), case.url, case.queryparamsscenario_set.all()):
                     pre_exist = Report.objects.filter(scenario_case=case).filter(session_log__session=session)
                     if len(pre_exist) == 0:
                         report = Report(scenario_case=case, session_log=session_log)
@@ -433,46 +557,72 @@ class RunTest(CSRFExemptMixin, View):
         return request_url
 
     def build_method(self, request_method_name, request, body=False):
-        self.session = self.get_queryset()
-        eu = get_object_or_404(ExposedUrl, session=self.session, subdomain=request.subdomain)
-        request_header = self.get_http_header(request, eu.vng_endpoint, self.session)
-        session_log, session = self.build_session_log(request, request_header)
-        if session.is_stopped():
-            raise Http404()
-        endpoints = ExposedUrl.objects.filter(session=session)
+        with timer(PROXY, 'lookup'):
+            self.session = self.get_queryset()
+            eu = get_object_or_404(
+                ExposedUrl.objects.select_related('vng_endpoint'), session=self.session, subdomain=request.subdomain
+            )
+            request_header = self.get_http_header(request, eu.vng_endpoint, self.session)
+            session_log, session = self.build_session_log(request, request_header)
+            if session.is_stopped():
+                raise Http404()
+            tracker.record(session)
+            endpoints = ExposedUrl.objects.filter(session=session).select_related('vng_endpoint')
+        resuming = session.suspended
+        if resuming:
+            resume_session(session)
         arguments = request.META['QUERY_STRING']
 
         request_url = self.build_url(eu, arguments)
         logger.info('Requesting the url:{}'.format(request_url))
         method = getattr(requests, request_method_name)
+        if body:
+            with timer(PROXY, 'rewrite'):
+                rewritten_body = self.rewrite_request_body(request, endpoints)
+            logger.info("Request body after rewrite: %s", rewritten_body)
 
         def make_call():
             if body:
-                rewritten_body = self.rewrite_request_body(request, endpoints)
-                logger.info("Request body after rewrite: %s", rewritten_body)
                 response = method(request_url, data=rewritten_body, headers=request_header, allow_redirects=False)
             else:
                 response = method(request_url, headers=request_header, allow_redirects=False)
             return response
-        try:
-            response = make_call()
-        except Exception as e:
+
+        def make_call_with_retry():
+            # The web server of a resumed session may still be booting, hold the call for a while
+            deadline = time.monotonic() + (settings.SESSION_RESUME_TIMEOUT if resuming else 0)
+            while True:
+                try:
+                    return make_call()
+                except requests.ConnectionError:
+                    if time.monotonic() >= deadline:
+                        raise
+                    time.sleep(2)
+        with timer(PROXY, 'upstream'):
             try:
-                request_header['Host'] = '{}:{}'.format(eu.docker_url, eu.port)
-                response = make_call()
+                response = make_call_with_retry()
             except Exception as e:
-                logger.exception(e)
-                raise Http404()
-
-        self.add_response(response, session_log, request_url, request)
-
-        self.save_call(request, request_method_name, request.subdomain,
-                       self.kwargs['relative_url'], session, response.status_code, session_log)
-        reply = HttpResponse(self.parse_response(response, request, eu.vng_endpoint.url, endpoints), status=response.status_code)
-        white_headers = ['Content-type', 'location']
-        for h in white_headers:
-            if h in response.headers:
-                reply[h] = self.parse_response_text(response.headers[h], endpoints)
+                try:
+                    request_header['Host'] = '{}:{}'.format(eu.docker_url, eu.port)
+                    response = make_call()
+                except Exception as e:
+                    logger.exception(e)
+                    raise Http404()
+
+        with timer(PROXY, 'log'):
+            self.add_response(response, session_log, request_url, request)
+
+        with timer(PROXY, 'matching'):
+            self.save_call(request, request_method_name, request.subdomain,
+                           self.kwargs['relative_url'], session, response.status_code, session_log)
+        with timer(PROXY, 'response'):
+            reply = HttpResponse(
+                self.parse_response(response, request, eu.vng_endpoint.url, endpoints), status=response.status_code
+            )
+            white_headers = ['Content-type', 'location']
+            for h in white_headers:
+                if h in response.headers:
+                    reply[h] = self.parse_response_text(response.headers[h], endpoints)
 
         return reply
 
@@ -501,7 +651,9 @@ class RunTest(CSRFExemptMixin, View):
 
     def build_session_log(self, request, header):
         session = self.session
-        session_log = SessionLog(session=session)
+        session_log = SessionLog(
+            session=session, method=request.method, url=request.build_absolute_uri(), path=request.path
+        )
         if 'host' in header:
             if type(header['host']) != str:
                 header['host'] = header['host'].decode('utf-8')
@@ -539,7 +691,7 @@ class ResultTestsessionViewShield(views.APIView):
 
     @extend_schema(responses={200: ServerRunResultShield})
     def get(self, request, uuid=None):
-        session = get_object_or_404(Session, uuid=uuid)
+        session = get_object_or_404(Session.objects.select_related('session_type'), uuid=uuid)
         report = list(Report.objects.filter(session_log__session=session))
         report_ordered = []
         is_error = False
@@ -552,7 +704,7 @@ class ResultTestsessionViewShield(views.APIView):
             for rp in report:
                 if rp.result == choices.HTTPCallChoices.failed:
                     is_error = True
-                if rp.scenario_case == case and rp.result != choices.HTTPCallChoices.not_called:
+                if rp.scenario_case_id == case.pk and rp.result != choices.HTTPCallChoices.not_called:
                     report_ordered.append(rp)
                     missing = True
                     break
@@ -127,6 +127,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'vng.utils.middleware.APIVersionHeaderMiddleware',
+    'vng.utils.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'vng.urls'
@@ -341,6 +342,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        'performance': {
+            'handlers': ['performance'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     }
 }
 
@@ -373,6 +379,85 @@ ENVIRONMENT = None
 SHOW_ALERT = True
 
 RUN_KUBERNETES_CMD = False
+# Apply the Kubernetes manifests with a server-side dry run only
+KUBERNETES_DRY_RUN = False
+# How the proxy reaches the sessions: 'loadbalancer' exposes every session with its own
+# external IP, 'cluster' uses a ClusterIP service reached through the cluster DNS. The
+# cluster DNS names only resolve in a pod, so 'cluster' requires this application (web and
+# Celery) to run inside the cluster and is refused otherwise. The VM deployment of the
+# ansible playbooks runs outside the cluster and must keep 'loadbalancer'.
+KUBERNETES_ROUTING = 'loadbalancer'
+# Namespace of the kubectl context, used to build the DNS names of the services
+KUBERNETES_NAMESPACE = 'default'
+# Resources of the cluster available to the test sessions, used to admit new sessions
+KUBERNETES_CAPACITY = {
+    'cpu': 4.0,
+    # in Mebibytes
+    'memory': 16 * 1024,
+    'load_balancers': 8,
+}
+# Running sessions without any call for this many minutes can be evicted for queued ones
+SESSION_IDLE_MINUTES = 120
+# Running sessions without any call for this many minutes are scaled down until the next call
+SESSION_SUSPEND_MINUTES = 30
+# Seconds a call to a suspended session is held while the deployment is scaled back up
+SESSION_RESUME_TIMEOUT = 90
+# Seconds between two writes of the last activity of the sessions, per process
+SESSION_ACTIVITY_FLUSH_SECONDS = 60
+# Maximum seconds the API holds a session creation call with `?wait=` until the session is running
+SESSION_CREATE_MAX_WAIT = 60
+# Seconds a session deployment is locked against duplicate deliveries of its task
+SESSION_BOOTSTRAP_LOCK_SECONDS = 30 * 60
+
+# Concurrent HTTP probes made by the design rules
+DESIGN_RULES_PROBE_WORKERS = 8
+DESIGN_RULES_PROBE_PER_HOST = 4
+# Requests per second, per host
+DESIGN_RULES_PROBE_RATE = 10
+# Seconds after which the remaining probes of a rule are skipped
+DESIGN_RULES_PROBE_DEADLINE = 300
+# Design rules making network calls which run at the same time
+DESIGN_RULES_NETWORK_WORKERS = 4
+
+# Downloaded API specifications, revalidated on every use
+SPEC_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'specs')
+# Seconds after which an unused specification is removed from the cache
+SPEC_CACHE_MAX_AGE = 30 * 24 * 60 * 60
+# Bytes of specifications kept in the cache, the least recently used are removed first
+SPEC_CACHE_MAX_BYTES = 500 * 1024 * 1024
+
+# Rendered PDF reports, outside MEDIA_ROOT as some reports are only shown to their owner
+PDF_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'pdf')
+# Bump when the PDF templates change, so the stored reports are rendered again
+PDF_TEMPLATE_VERSION = 1
+# Seconds a report render is locked against concurrent requests for the same report
+PDF_RENDER_LOCK_SECONDS = 10 * 60
+# Seconds a failed render is remembered, the report is rendered again afterwards
+PDF_FAILURE_SECONDS = 10 * 60
+# Times the waiting page reloads itself before it asks to try again later
+PDF_MAX_REFRESHES = 60
+# Seconds after which an unused PDF report is removed
+PDF_CACHE_MAX_AGE = 30 * 24 * 60 * 60
+# Bytes of PDF reports kept, the least recently used are removed first
+PDF_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# Provider runs that can be started, or whose status can be read, in one API call
+SERVER_RUN_BULK_MAX = 100
+
+# Count the timings of the hot paths in the cache for /metrics
+METRICS_ENABLED = True
+# Seconds every process adds up its timings before it adds them to the counters in the cache
+METRICS_FLUSH_SECONDS = 10
+# Bearer token that gives access to /metrics besides staff users, e.g. for Prometheus
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+# Profiles of the requests of staff users sending the X-Profile header
+PROFILE_DIR = os.path.join(LOGGING_DIR, 'profiles')
+# Seconds between the samples of the sampling profiler
+PROFILE_INTERVAL = 0.005
+# Seconds after which a profile is removed
+PROFILE_MAX_AGE = 7 * 24 * 60 * 60
+# Bytes of profiles kept, the oldest are removed first
+PROFILE_MAX_BYTES = 200 * 1024 * 1024
 
 #
 # Library settings
@@ -412,10 +497,34 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'vng.testsession.task.purge_sessions',
         'schedule': crontab(hour=0, minute=0),
     },
+    'session-queue': {
+        'task': 'vng.testsession.task.process_session_queue',
+        'schedule': crontab(minute='*'),
+    },
+    'suspend-idle-sessions': {
+        'task': 'vng.testsession.task.suspend_idle_sessions',
+        'schedule': crontab(minute='*/5'),
+    },
+    'refresh-session-images': {
+        'task': 'vng.testsession.task.refresh_session_images',
+        'schedule': crontab(minute=30),
+    },
+    'prune-config-maps': {
+        'task': 'vng.testsession.task.prune_config_maps',
+        'schedule': crontab(minute=45),
+    },
     'scheduled-test-provider': {
         'task': 'vng.servervalidation.task.execute_test_scheduled',
         'schedule': crontab(hour=0, minute=0),
     },
+    'scheduled-design-rules': {
+        'task': 'vng.design_rules.tasks.base.run_scheduled_design_rules',
+        'schedule': crontab(hour=2, minute=0),
+    },
+    'prune-caches': {
+        'task': 'vng.utils.tasks.prune_caches',
+        'schedule': crontab(hour=3, minute=0),
+    },
 }
 
 # Elastic APM
@@ -3,8 +3,8 @@ from django.contrib import admin
 from ordered_model.admin import OrderedTabularInline, OrderedInlineModelAdminMixin
 
 from .models import (
-    DesignRuleSession, DesignRuleResult, DesignRuleTestSuite,
-    DesignRuleTestVersion, DesignRuleTestOption
+    DesignRuleBatch, DesignRuleSession, DesignRuleResult, DesignRuleTestSuite,
+    DesignRuleTestVersion, DesignRuleTestOption, DesignRuleTrend, Specification
 )
 
 
@@ -18,6 +18,23 @@ class DesignRuleSessionAdmin(admin.ModelAdmin):
     list_display = ('uuid', 'test_suite', 'started_at')
 
 
+@admin.register(DesignRuleBatch)
+class DesignRuleBatchAdmin(admin.ModelAdmin):
+    list_display = ('uuid', 'test_version', 'created_at', 'status')
+    list_filter = ('status', )
+
+
+@admin.register(DesignRuleTrend)
+class DesignRuleTrendAdmin(admin.ModelAdmin):
+    list_display = ('test_suite', 'started_at', 'percentage_score')
+    raw_id_fields = ('session', )
+
+
+@admin.register(Specification)
+class SpecificationAdmin(admin.ModelAdmin):
+    list_display = ('content_hash', 'created_at')
+
+
 @admin.register(DesignRuleResult)
 class DesignRuleResultAdmin(admin.ModelAdmin):
     list_display = ('design_rule', 'rule_type')
@@ -1,4 +1,4 @@
-from djchoices import DjangoChoices
+from djchoices import ChoiceItem, DjangoChoices
 
 from .dr_20200117 import api_09_20200117, api_51_20200117
 from .dr_20200709 import (
@@ -22,3 +22,10 @@ class DesignRuleChoices(DjangoChoices):
     # api_55_20200709 = api_55_20200709
     api_56_20200709 = api_56_20200709
     api_57_20200709 = api_57_20200709
+
+
+class DesignRuleSessionStatus(DjangoChoices):
+    queued = ChoiceItem("queued")
+    running = ChoiceItem("running")
+    finished = ChoiceItem("finished")
+    error = ChoiceItem("error")
@@ -0,0 +1,65 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import DesignRuleSession, DesignRuleTestVersion
+from ...tasks.base import parse_specification
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the design rules that only need the OpenAPI specification, without contacting the API. "
+        "Rules which also check how the API serves its specification, like API-51, are skipped. "
+        "Exits with status 1 when a design rule fails."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("specification", help="Path to the JSON or YAML specification, - for standard input")
+        parser.add_argument(
+            "--test-version", type=int,
+            help="The primary key of the test version, also an inactive one, the latest active test version by default"
+        )
+        parser.add_argument("--api-endpoint", help="Also run the design rules that only check the URL of the endpoint")
+        parser.add_argument("--save", action="store_true", help="Store the session and its results")
+
+    def handle(self, *args, **options):
+        if options["test_version"]:
+            test_version = DesignRuleTestVersion.objects.filter(pk=options["test_version"]).first()
+            if test_version is None:
+                raise CommandError("Test version {} not found".format(options["test_version"]))
+        else:
+            test_version = DesignRuleTestVersion.objects.filter(is_active=True).order_by("-pk").first()
+            if test_version is None:
+                raise CommandError("No active test version found")
+
+        if options["specification"] == "-":
+            content = sys.stdin.buffer.read()
+        else:
+            try:
+                with open(options["specification"], "rb") as f:
+                    content = f.read()
+            except OSError as e:
+                raise CommandError(e)
+        spec, is_json = parse_specification(content)
+        if spec is None:
+            raise CommandError("{} is not a JSON or YAML specification".format(options["specification"]))
+
+        session, results, skipped = DesignRuleSession.lint(
+            test_version, spec, is_json, options["api_endpoint"], save=options["save"]
+        )
+
+        for result in results:
+            if result.success:
+                self.stdout.write(self.style.SUCCESS("PASS {}".format(result.get_rule_type_display())))
+            else:
+                self.stdout.write(self.style.ERROR("FAIL {}".format(result.get_rule_type_display())))
+                for error in result.errors or []:
+                    self.stdout.write("     {}".format(error))
+        for rule_type in skipped:
+            self.stdout.write("SKIP {}".format(rule_type))
+        self.stdout.write("Score: {}%".format(round(session.percentage_score, 2)))
+        if session.pk:
+            self.stdout.write("Session: {}".format(session.uuid))
+
+        if not all(result.success for result in results):
+            sys.exit(1)
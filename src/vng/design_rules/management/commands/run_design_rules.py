@@ -0,0 +1,72 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from ...choices import DesignRuleSessionStatus
+from ...models import DesignRuleBatch, DesignRuleTestSuite, DesignRuleTestVersion
+
+
+class Command(BaseCommand):
+    help = "Run the design rules for many API endpoints and report the outcome"
+
+    def add_arguments(self, parser):
+        parser.add_argument("api_endpoints", nargs="*", help="The API endpoints to test")
+        parser.add_argument("--all", action="store_true", help="Test all the registered test suites")
+        parser.add_argument(
+            "--test-version", type=int,
+            help="The primary key of the test version, also an inactive one, the latest active test version by default"
+        )
+        parser.add_argument("--output", help="Write the report as JSON to this file instead of the console")
+        parser.add_argument("--no-wait", action="store_true", help="Do not wait for the sessions to finish")
+        parser.add_argument("--poll-interval", type=int, default=5, help="Seconds between the status checks")
+        parser.add_argument(
+            "--timeout", type=int, default=3600,
+            help="Seconds to wait for the sessions to finish before giving up, 0 to wait without limit"
+        )
+
+    def handle(self, *args, **options):
+        if bool(options["api_endpoints"]) == options["all"]:
+            raise CommandError("Give either API endpoints or --all")
+
+        if options["test_version"]:
+            test_version = DesignRuleTestVersion.objects.filter(pk=options["test_version"]).first()
+            if test_version is None:
+                raise CommandError("Test version {} not found".format(options["test_version"]))
+        else:
+            test_version = DesignRuleTestVersion.objects.filter(is_active=True).order_by("-pk").first()
+            if test_version is None:
+                raise CommandError("No active test version found")
+
+        if options["all"]:
+            test_suites = DesignRuleTestSuite.objects.all()
+        else:
+            test_suites = [
+                DesignRuleTestSuite.objects.get_or_create(api_endpoint=api_endpoint)[0]
+                for api_endpoint in dict.fromkeys(options["api_endpoints"])
+            ]
+
+        batch = DesignRuleBatch.start(test_version, test_suites)
+        self.stdout.write("Started batch {}".format(batch.uuid))
+        if options["no_wait"]:
+            return
+
+        deadline = time.monotonic() + options["timeout"] if options["timeout"] else None
+        batch.refresh_from_db()
+        while batch.status not in (DesignRuleSessionStatus.finished, DesignRuleSessionStatus.error):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise CommandError(
+                    "Batch {} did not finish within {} seconds, it keeps running in the background".format(
+                        batch.uuid, options["timeout"]
+                    )
+                )
+            time.sleep(options["poll_interval"])
+            batch.refresh_from_db()
+
+        report = json.dumps(batch.get_report(), cls=DjangoJSONEncoder, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(report)
+        else:
+            self.stdout.write(report)
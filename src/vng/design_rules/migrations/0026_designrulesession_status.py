@@ -0,0 +1,39 @@
+# Generated by Django 2.2.13 on 2026-10-19 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('design_rules', '0025_auto_20210122_1421'),
+    ]
+
+    operations = [
+        # The existing sessions were run synchronously, they are all finished
+        migrations.AddField(
+            model_name='designrulesession',
+            name='status',
+            field=models.CharField(choices=[('queued', 'queued'), ('running', 'running'), ('finished', 'finished'), ('error', 'error')], default='finished', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='designrulesession',
+            name='status',
+            field=models.CharField(choices=[('queued', 'queued'), ('running', 'running'), ('finished', 'finished'), ('error', 'error')], default='queued', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='designrulesession',
+            name='progress',
+            field=models.PositiveSmallIntegerField(default=100, help_text='Percentage of the design rules that have been run'),
+        ),
+        migrations.AlterField(
+            model_name='designrulesession',
+            name='progress',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Percentage of the design rules that have been run'),
+        ),
+        migrations.AddField(
+            model_name='designrulesession',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.13 on 2026-10-19 14:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('design_rules', '0026_designrulesession_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Specification',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('content', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='designrulesession',
+            name='specification',
+            field=models.ForeignKey(blank=True, help_text='The downloaded api spec, shared with the sessions that downloaded the same spec', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sessions', to='design_rules.Specification'),
+        ),
+    ]
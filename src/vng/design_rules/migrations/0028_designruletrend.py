@@ -0,0 +1,61 @@
+# Generated by Django 2.2.13 on 2026-10-19 15:40
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def record_finished_sessions(apps, schema_editor):
+    DesignRuleSession = apps.get_model('design_rules', 'DesignRuleSession')
+    DesignRuleTrend = apps.get_model('design_rules', 'DesignRuleTrend')
+
+    trends = []
+    sessions = DesignRuleSession.objects.filter(
+        status='finished', test_suite__isnull=False
+    ).prefetch_related('results')
+    for session in sessions:
+        results = sorted((r.rule_type, r.success) for r in session.results.all())
+        bitmap = sum(1 << i for i, (__, success) in enumerate(results) if success)
+        trends.append(DesignRuleTrend(
+            session=session,
+            test_suite_id=session.test_suite_id,
+            test_version_id=session.test_version_id,
+            started_at=session.started_at,
+            duration=session.finished_at - session.started_at if session.finished_at else None,
+            percentage_score=session.percentage_score,
+            rule_types=[rule_type for rule_type, __ in results],
+            passed=bitmap.to_bytes((len(results) + 7) // 8, 'little'),
+        ))
+    DesignRuleTrend.objects.bulk_create(trends, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('design_rules', '0027_specification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DesignRuleTrend',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('duration', models.DurationField(blank=True, help_text='The time it took to run the design rules', null=True)),
+                ('percentage_score', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('rule_types', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=50), default=list, help_text='The design rules that were run', size=None)),
+                ('passed', models.BinaryField(default=b'', help_text='Bitmap of the design rules that passed, in the order of the rule types')),
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='trend', to='design_rules.DesignRuleSession')),
+                ('test_suite', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trend', to='design_rules.DesignRuleTestSuite')),
+                ('test_version', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='design_rules.DesignRuleTestVersion')),
+            ],
+            options={
+                'ordering': ('test_suite', '-started_at'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='designruletrend',
+            index=models.Index(fields=['test_suite', 'started_at'], name='designrule_trend_suite_idx'),
+        ),
+        migrations.RunPython(record_finished_sessions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 2.2.13 on 2026-10-19 16:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('design_rules', '0028_designruletrend'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DesignRuleBatch',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uuid', models.UUIDField(default=uuid.uuid4)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('queued', 'queued'), ('running', 'running'), ('finished', 'finished'), ('error', 'error')], default='queued', max_length=20)),
+                ('test_version', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='design_rules.DesignRuleTestVersion')),
+            ],
+            options={
+                'ordering': ('-created_at',),
+            },
+        ),
+        migrations.AddField(
+            model_name='designrulesession',
+            name='batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sessions', to='design_rules.DesignRuleBatch'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.13 on 2026-10-19 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('design_rules', '0029_designrulebatch'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='designruleresult',
+            index=models.Index(fields=['design_rule', 'rule_type'], name='designruleresult_rule_type'),
+        ),
+    ]
@@ -3,12 +3,13 @@ from uuid import uuid4
 
 from django.contrib.postgres.fields import ArrayField
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
 from ordered_model.models import OrderedModel
 
-from .choices import DesignRuleChoices
-from .tasks.base import run_tests
+from .choices import DesignRuleChoices, DesignRuleSessionStatus
+from .tasks.base import execute_batch, execute_session, run_offline_tests, run_tests
 
 
 class DesignRuleTestVersion(models.Model):
@@ -37,7 +38,7 @@ class DesignRuleTestSuite(models.Model):
 
     def start_session(self, test_version, specification_url=""):
         session = self.sessions.create(test_version=test_version, specification_url=specification_url)
-        session.start_tests(self.api_endpoint, specification_url)
+        execute_session.delay(session.pk)
         return session
 
     def get_latest_session(self):
@@ -58,24 +59,121 @@ class DesignRuleTestSuite(models.Model):
         return Decimal("0.00")
 
 
+class Specification(models.Model):
+    """
+    A downloaded api spec, stored once for all the sessions which retrieved the same content
+    """
+    content_hash = models.CharField(max_length=64, unique=True)
+    content = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.content_hash
+
+    @classmethod
+    def store(cls, response):
+        specification, __ = cls.objects.get_or_create(
+            content_hash=response.content_hash, defaults={"content": response.text}
+        )
+        return specification
+
+
+class DesignRuleBatch(models.Model):
+    """
+    Design rule sessions for many test suites, started at once
+    """
+    uuid = models.UUIDField(default=uuid4)
+    test_version = models.ForeignKey(DesignRuleTestVersion, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=20, default=DesignRuleSessionStatus.queued, choices=DesignRuleSessionStatus.choices)
+
+    class Meta:
+        ordering = ("-created_at", )
+
+    @classmethod
+    def start(cls, test_version, test_suites):
+        """
+        Create a session for every test suite and run them in the background
+        """
+        batch = cls.objects.create(test_version=test_version)
+        # Returns the primary keys on PostgreSQL
+        DesignRuleSession.objects.bulk_create([
+            DesignRuleSession(test_suite=test_suite, test_version=test_version, batch=batch)
+            for test_suite in test_suites
+        ])
+        execute_batch.delay(batch.pk)
+        return batch
+
+    def get_report(self):
+        """
+        Return the consolidated outcome of the sessions of the batch
+        """
+        sessions = list(self.sessions.select_related("test_suite").prefetch_related("results"))
+        finished = [session for session in sessions if session.status == DesignRuleSessionStatus.finished]
+        return {
+            "sessions": len(sessions),
+            "finished": len(finished),
+            "errors": len([session for session in sessions if session.status == DesignRuleSessionStatus.error]),
+            "successful": len([session for session in finished if session.percentage_score == 100]),
+            "average_score": (
+                round(sum(session.percentage_score for session in finished) / len(finished), 2) if finished else None
+            ),
+            "results": [{
+                "session": session.uuid,
+                "api_endpoint": session.test_suite.api_endpoint,
+                "status": session.status,
+                "percentage_score": session.percentage_score,
+                "failed": [result.rule_type for result in session.results.all() if not result.success],
+            } for session in sessions],
+        }
+
+
 class DesignRuleSession(models.Model):
     uuid = models.UUIDField(default=uuid4)
     test_suite = models.ForeignKey(DesignRuleTestSuite, on_delete=models.CASCADE, related_name="sessions", null=True)
     started_at = models.DateTimeField(auto_now_add=True)
     json_result = models.TextField(blank=True, null=True, default=None, help_text=_("This is the downloaded api spec"))
+    specification = models.ForeignKey(
+        Specification, null=True, blank=True, on_delete=models.SET_NULL, related_name="sessions",
+        help_text=_("The downloaded api spec, shared with the sessions that downloaded the same spec")
+    )
     percentage_score = models.DecimalField(default=0, decimal_places=2, max_digits=5)
     test_version = models.ForeignKey(DesignRuleTestVersion, null=True, on_delete=models.CASCADE)
     # Optional URL to the OpenAPI specification file.
     # Only necessary if it is not located at the default location relative to the api_endpoint.
     # This is saved here since this is a workaround to be able to test certain API's
     specification_url = models.URLField(blank=True)
+    status = models.CharField(max_length=20, default=DesignRuleSessionStatus.queued, choices=DesignRuleSessionStatus.choices)
+    progress = models.PositiveSmallIntegerField(default=0, help_text=_("Percentage of the design rules that have been run"))
+    finished_at = models.DateTimeField(null=True, blank=True)
+    batch = models.ForeignKey(DesignRuleBatch, null=True, blank=True, on_delete=models.SET_NULL, related_name="sessions")
 
     class Meta:
         ordering = ("-started_at", )
 
+    @classmethod
+    def lint(cls, test_version, spec, is_json, api_endpoint=None, save=False):
+        """
+        Run the design rules that only need the specification. Returns the
+        session and its results, which are only saved when asked for.
+        """
+        session = cls(test_version=test_version, status=DesignRuleSessionStatus.finished, progress=100)
+        results, skipped = run_offline_tests(session, spec, is_json, api_endpoint)
+        if save:
+            session.finished_at = timezone.now()
+            session.save()
+            for result in results:
+                result.design_rule = session
+            DesignRuleResult.objects.bulk_create(results)
+        return session, results, skipped
+
     def start_tests(self, api_endpoint, specification_url=""):
         run_tests(self, api_endpoint, specification_url)
 
+    def is_finished(self):
+        return self.status in (DesignRuleSessionStatus.finished, DesignRuleSessionStatus.error)
+
     def successful(self):
         if self.results.exists():
             list_successes = self.results.values_list("success", flat=True)
@@ -97,6 +195,9 @@ class DesignRuleResult(models.Model):
 
     class Meta:
         ordering = ('design_rule', )
+        indexes = [
+            models.Index(fields=['design_rule', 'rule_type'], name='designruleresult_rule_type'),
+        ]
 
     def get_errors(self):
         if self.errors:
@@ -115,3 +216,50 @@ class DesignRuleResult(models.Model):
     def get_description(self):
         choice = DesignRuleChoices.get_choice(self.rule_type)
         return choice.description
+
+
+class DesignRuleTrend(models.Model):
+    """
+    Compact summary of a finished session for the score history of the test suites.
+    The rows are only added, never updated.
+    """
+    session = models.OneToOneField(DesignRuleSession, on_delete=models.CASCADE, related_name="trend")
+    test_suite = models.ForeignKey(DesignRuleTestSuite, on_delete=models.CASCADE, related_name="trend")
+    test_version = models.ForeignKey(DesignRuleTestVersion, null=True, on_delete=models.SET_NULL)
+    started_at = models.DateTimeField()
+    duration = models.DurationField(null=True, blank=True, help_text=_("The time it took to run the design rules"))
+    percentage_score = models.DecimalField(default=0, decimal_places=2, max_digits=5)
+    rule_types = ArrayField(models.CharField(max_length=50), default=list, help_text=_("The design rules that were run"))
+    passed = models.BinaryField(default=b"", help_text=_("Bitmap of the design rules that passed, in the order of the rule types"))
+
+    class Meta:
+        ordering = ("test_suite", "-started_at")
+        indexes = [
+            models.Index(fields=["test_suite", "started_at"], name="designrule_trend_suite_idx"),
+        ]
+
+    @staticmethod
+    def encode_passed(passed):
+        bitmap = sum(1 << i for i, success in enumerate(passed) if success)
+        return bitmap.to_bytes((len(passed) + 7) // 8, "little")
+
+    def get_passed(self):
+        """
+        Return the success of every rule type that was run
+        """
+        bitmap = int.from_bytes(bytes(self.passed), "little")
+        return {rule_type: bool(bitmap >> i & 1) for i, rule_type in enumerate(self.rule_types)}
+
+    @classmethod
+    def record(cls, session):
+        results = list(session.results.order_by("rule_type").values_list("rule_type", "success"))
+        trend, __ = cls.objects.get_or_create(session=session, defaults={
+            "test_suite": session.test_suite,
+            "test_version": session.test_version,
+            "started_at": session.started_at,
+            "duration": session.finished_at - session.started_at if session.finished_at else None,
+            "percentage_score": session.percentage_score,
+            "rule_types": [rule_type for rule_type, __ in results],
+            "passed": cls.encode_passed([success for __, success in results]),
+        })
+        return trend
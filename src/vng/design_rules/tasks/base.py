@@ -1,36 +1,33 @@
+from collections import OrderedDict
 from json import JSONDecodeError
 from decimal import Decimal
+from urllib.parse import urlparse
 
-import requests
-import yaml
+from celery import chain, chord, group
 from celery.utils.log import get_task_logger
-from requests.exceptions import SSLError
+from django.utils import timezone
+from yaml import YAMLError
 from yaml.parser import ParserError
 from yaml.scanner import ScannerError
 from yaml.reader import ReaderError
 
-from ..choices import DesignRuleChoices
-from .dr_20200117 import run_20200117_api_09, run_20200117_api_51
-from .dr_20200709 import (
-    run_20200709_api_03, run_20200709_api_16, run_20200709_api_20, run_20200709_api_48,
-    run_20200709_api_51, run_20200709_api_56, run_20200709_api_57
-)
+from ...celery.celery import app
+from ...utils.instrumentation import DESIGN_RULES, timer
+from ...utils.oas import RefResolutionError, RefResolver, SpecModel, load_json, load_yaml
+from ...utils.specs import fetch_specs
+from ..choices import DesignRuleSessionStatus
+from . import registry
 
 logger = get_task_logger(__name__)
 
 
-def _get_endpoint(enpoint):
-    try:
-        response = requests.get(enpoint, verify=False, timeout=60)
-    except SSLError:
-        response = None
-    except Exception:
-        response = None
-    return response
-
-
 def _get_response(session, json_endpoint, yaml_endpoint, is_json):
-    response = _get_endpoint(json_endpoint)
+    # The JSON and YAML candidates are fetched at the same time
+    endpoints = [json_endpoint] if json_endpoint == yaml_endpoint else [json_endpoint, yaml_endpoint]
+    with timer(DESIGN_RULES, 'fetch'):
+        responses = fetch_specs(endpoints, verify=False)
+
+    response = responses[0]
     print("json_endpoint", json_endpoint, response)
     if response and response.ok:
         try:
@@ -40,11 +37,11 @@ def _get_response(session, json_endpoint, yaml_endpoint, is_json):
             pass
 
     if not session.json_result:
-        response = _get_endpoint(yaml_endpoint)
+        response = responses[-1]
         print("yaml_endpoint", yaml_endpoint, response)
         if response and response.ok:
             try:
-                yaml_dict = yaml.safe_load(response.text)
+                yaml_dict = load_yaml(response.text)
                 if isinstance(yaml_dict, dict):
                     session.json_result = yaml_dict
             except ScannerError:
@@ -59,7 +56,15 @@ def _get_response(session, json_endpoint, yaml_endpoint, is_json):
     return session, response, is_json
 
 
+def _set_progress(session, done, total):
+    session.progress = int(100 * done / total)
+    if session.pk:
+        type(session).objects.filter(pk=session.pk).update(progress=session.progress)
+
+
 def run_tests(session, api_endpoint, specification_url=""):
+    from ..models import DesignRuleResult, Specification
+
     json_endpoint = "{}/openapi.json".format(api_endpoint)
     yaml_endpoint = "{}/openapi.yaml".format(api_endpoint)
     is_json = False
@@ -77,45 +82,151 @@ def run_tests(session, api_endpoint, specification_url=""):
         correct_location = False
         session, response, is_json = _get_response(session, api_endpoint, api_endpoint, is_json)
 
-    success_count = 0
-    for test_option in session.test_version.test_rules.all():
-        if test_option.rule_type == DesignRuleChoices.api_03_20200709:
-            result = run_20200709_api_03(session=session)
-            if result.success:
-                success_count += 1
-        if test_option.rule_type == DesignRuleChoices.api_09_20200117:
-            result = run_20200117_api_09(session=session)
-            if result.success:
-                success_count += 1
-        if test_option.rule_type == DesignRuleChoices.api_16_20200709:
-            result = run_20200709_api_16(session=session)
-            if result.success:
-                success_count += 1
-        if test_option.rule_type == DesignRuleChoices.api_20_20200709:
-            result = run_20200709_api_20(session=session, api_endpoint=api_endpoint)
-            if result.success:
-                success_count += 1
-        if test_option.rule_type == DesignRuleChoices.api_48_20200709:
-            result = run_20200709_api_48(session=session, api_endpoint=api_endpoint)
-            if result.success:
-                success_count += 1
-        if test_option.rule_type == DesignRuleChoices.api_51_20200117:
-            result = run_20200117_api_51(session=session, api_endpoint=api_endpoint, is_json=is_json)
-            if result.success:
-                success_count += 1
-        if test_option.rule_type == DesignRuleChoices.api_51_20200709:
-            result = run_20200709_api_51(session=session, response=response, correct_location=correct_location, is_json=is_json)
-            if result.success:
-                success_count += 1
-        if test_option.rule_type == DesignRuleChoices.api_56_20200709:
-            result = run_20200709_api_56(session=session)
-            if result.success:
-                success_count += 1
-        if test_option.rule_type == DesignRuleChoices.api_57_20200709:
-            result = run_20200709_api_57(session=session, response=response)
-            if result.success:
-                success_count += 1
-
-    max_score = Decimal(session.test_version.test_rules.count())
+    if session.json_result:
+        session.specification = Specification.store(response)
+
+    context = {
+        registry.SPEC: SpecModel(session.json_result, base_url=response.url if response else None),
+        registry.API_ENDPOINT: api_endpoint,
+        registry.RESPONSE: response,
+        registry.CORRECT_LOCATION: correct_location,
+        registry.IS_JSON: is_json,
+    }
+
+    # We do not want double results for the same design rule
+    rule_types = list(session.test_version.test_rules.values_list("rule_type", flat=True))
+    existing = {result.rule_type: result for result in session.results.filter(rule_type__in=rule_types)}
+    rules = [rule for rule in registry.get_rules(rule_types) if rule.rule_type not in existing]
+
+    total = len(rules)
+    done = []
+
+    def on_result(rule, result):
+        done.append(rule)
+        _set_progress(session, len(done), total)
+
+    _set_progress(session, 0, max(total, 1))
+    with timer(DESIGN_RULES, 'rules'):
+        results = registry.execute(session, rules, context, on_result=on_result)
+    DesignRuleResult.objects.bulk_create(results)
+
+    success_count = len([result for result in list(existing.values()) + results if result.success])
+    max_score = Decimal(len(rule_types))
     session.percentage_score = Decimal(100) / max_score * success_count
+    # The spec itself is stored once in `specification`, not again for every session
+    session.save(update_fields=["percentage_score", "specification"])
+
+
+def parse_specification(content):
+    """
+    Return the parsed specification and whether it is JSON, None when the
+    content is neither a JSON nor a YAML object
+    """
+    try:
+        spec = load_json(content)
+        return (spec, True) if isinstance(spec, dict) else (None, False)
+    except ValueError:
+        pass
+    try:
+        spec = load_yaml(content)
+    except YAMLError:
+        return None, False
+    return (spec, False) if isinstance(spec, dict) else (None, False)
+
+
+def _no_fetch(url):
+    raise RefResolutionError("{} is not fetched when linting a specification".format(url))
+
+
+def run_offline_tests(session, spec, is_json, api_endpoint=None):
+    """
+    Run the design rules of the session that only need the specification,
+    without network access and without saving anything. Returns the unsaved
+    results and the rule types that were skipped because they need the API.
+    """
+    context = {
+        # Remote references are left unresolved instead of fetched
+        registry.SPEC: SpecModel(spec, resolver=RefResolver(spec, fetch=_no_fetch)),
+        registry.IS_JSON: is_json,
+    }
+    if api_endpoint:
+        context[registry.API_ENDPOINT] = api_endpoint
+
+    rule_types = list(session.test_version.test_rules.values_list("rule_type", flat=True))
+    rules = [rule for rule in registry.get_rules(rule_types) if rule.is_offline(context)]
+    offline = {rule.rule_type for rule in rules}
+    results = registry.execute(session, rules, context)
+
+    success_count = len([result for result in results if result.success])
+    session.percentage_score = Decimal(100) / len(rules) * success_count if rules else Decimal(0)
+    return results, [rule_type for rule_type in rule_types if rule_type not in offline]
+
+
+@app.task
+def execute_session(session_pk):
+    """
+    Run the design rules of a session outside of the request/response cycle
+    """
+    from ..models import DesignRuleSession, DesignRuleTrend
+
+    session = DesignRuleSession.objects.select_related("test_suite", "test_version").get(pk=session_pk)
+    session.status = DesignRuleSessionStatus.running
     session.save()
+    try:
+        session.start_tests(session.test_suite.api_endpoint, session.specification_url)
+    except Exception as e:
+        logger.exception(e)
+        DesignRuleSession.objects.filter(pk=session_pk).update(
+            status=DesignRuleSessionStatus.error, finished_at=timezone.now()
+        )
+        return
+    session.status = DesignRuleSessionStatus.finished
+    session.progress = 100
+    session.finished_at = timezone.now()
+    session.save(update_fields=["status", "progress", "finished_at"])
+    DesignRuleTrend.record(session)
+
+
+@app.task
+def execute_batch(batch_pk):
+    """
+    Run the sessions of a batch. The sessions of the same host run one after
+    the other, those of different hosts in parallel over the workers.
+    """
+    from ..models import DesignRuleBatch
+
+    batch = DesignRuleBatch.objects.get(pk=batch_pk)
+    DesignRuleBatch.objects.filter(pk=batch_pk).update(status=DesignRuleSessionStatus.running)
+
+    per_host = OrderedDict()
+    for session in batch.sessions.select_related("test_suite").order_by("pk"):
+        host = urlparse(session.test_suite.api_endpoint).netloc
+        per_host.setdefault(host, []).append(execute_session.si(session.pk))
+
+    if not per_host:
+        finish_batch(batch_pk)
+        return
+    chord(group([chain(signatures) for signatures in per_host.values()]), finish_batch.si(batch_pk))()
+
+
+@app.task
+def finish_batch(batch_pk):
+    from ..models import DesignRuleBatch
+
+    DesignRuleBatch.objects.filter(pk=batch_pk).update(
+        status=DesignRuleSessionStatus.finished, finished_at=timezone.now()
+    )
+
+
+@app.task
+def run_scheduled_design_rules():
+    """
+    Run the latest active test version against all the test suites
+    """
+    from ..models import DesignRuleBatch, DesignRuleTestSuite, DesignRuleTestVersion
+
+    test_version = DesignRuleTestVersion.objects.filter(is_active=True).order_by("-pk").first()
+    if test_version is None:
+        logger.info("No active design rule test version, the scheduled run is skipped")
+        return
+    DesignRuleBatch.start(test_version, DesignRuleTestSuite.objects.all())
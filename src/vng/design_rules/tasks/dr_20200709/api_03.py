@@ -1,35 +1,30 @@
 from django.utils.translation import ugettext_lazy as _
 
 from ...choices import DesignRuleChoices
+from ..registry import register, legacy_runner, SPEC
 
 VALID_METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE"]
 SKIPPED_METHODS = ["PARAMETERS", "SUMMARY", "DESCRIPTION", "$REF", "SERVERS"]
 
 
-def run_20200709_api_03(session):
+@register(DesignRuleChoices.api_03_20200709, inputs=(SPEC, ))
+def check_20200709_api_03(session, spec):
     """
     https://publicatie.centrumvoorstandaarden.nl/api/adr/#api-03
     """
     from ...models import DesignRuleResult
 
-    # We do not want double results for the same design rule
-    base_qs = session.results.filter(rule_type=DesignRuleChoices.api_03_20200709)
-    if base_qs.exists():
-        return base_qs.first()
-
     result = DesignRuleResult(design_rule=session, rule_type=DesignRuleChoices.api_03_20200709)
 
     # Only execute when there is a JSON response
-    if not session.json_result:
+    if not spec:
         result.success = False
         result.errors = [_("The API did not give a valid JSON output.")]
-        result.save()
         return result
 
-    paths = session.json_result.get("paths", {})
     methods_found = False
     errors = []
-    for path, methods in paths.items():
+    for path, methods in spec.paths.items():
         for method, _options in methods.items():
             methods_found = True
             if method.upper() not in VALID_METHODS and method.upper() not in SKIPPED_METHODS:
@@ -43,5 +38,7 @@ def run_20200709_api_03(session):
         result.errors = errors
     else:
         result.success = True
-    result.save()
     return result
+
+
+run_20200709_api_03 = legacy_runner(check_20200709_api_03)
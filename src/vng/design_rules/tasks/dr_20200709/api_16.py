@@ -1,33 +1,28 @@
 from django.utils.translation import ugettext_lazy as _
 
 from ...choices import DesignRuleChoices
+from ..registry import register, legacy_runner, SPEC
 
 
-def run_20200709_api_16(session):
+@register(DesignRuleChoices.api_16_20200709, inputs=(SPEC, ))
+def check_20200709_api_16(session, spec):
     """
     https://publicatie.centrumvoorstandaarden.nl/api/adr/#api-16
     """
     from ...models import DesignRuleResult
 
-    # We do not want double results for the same design rule
-    base_qs = session.results.filter(rule_type=DesignRuleChoices.api_16_20200709)
-    if base_qs.exists():
-        return base_qs.first()
-
     result = DesignRuleResult(design_rule=session, rule_type=DesignRuleChoices.api_16_20200709)
 
     # Only execute when there is a JSON response
-    if not session.json_result:
+    if not spec:
         result.success = False
         result.errors = [_("The API did not give a valid JSON output.")]
-        result.save()
         return result
 
-    version = session.json_result.get("openapi", session.json_result.get("swagger"))
+    version = spec.version
     if not version:
         result.success = False
         result.errors = [_("There is no openapi version found.")]
-        result.save()
         return result
 
     try:
@@ -44,6 +39,7 @@ def run_20200709_api_16(session):
     except Exception as e:
         result.success = False
         result.errors = [_("{} is not a valid OAS api version.").format(version)]
-    finally:
-        result.save()
-        return result
+    return result
+
+
+run_20200709_api_16 = legacy_runner(check_20200709_api_16)
@@ -1,56 +1,53 @@
 from django.utils.translation import ugettext_lazy as _
 
-import requests
-
 from ...choices import DesignRuleChoices
+from ..registry import register, legacy_runner, API_ENDPOINT, SPEC
+from ..probing import Prober
 
 VALID_METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE"]
 SKIPPED_METHODS = ["PARAMETERS"]
+PROBED_METHODS = ["get", "post", "put", "delete"]
 
 
-def run_20200709_api_48(session, api_endpoint):
+@register(DesignRuleChoices.api_48_20200709, inputs=(SPEC, API_ENDPOINT), network=True)
+def check_20200709_api_48(session, spec, api_endpoint):
     """
     https://publicatie.centrumvoorstandaarden.nl/api/adr/#api-48
     """
     from ...models import DesignRuleResult
 
-    # We do not want double results for the same design rule
-    base_qs = session.results.filter(rule_type=DesignRuleChoices.api_48_20200709)
-    if base_qs.exists():
-        return base_qs.first()
-
     result = DesignRuleResult(design_rule=session, rule_type=DesignRuleChoices.api_48_20200709)
 
     # Only execute when there is a JSON response
-    if not session.json_result:
+    if not spec:
         result.success = False
         result.errors = [_("The API did not give a valid JSON output.")]
-        result.save()
         return result
 
-    paths = session.json_result.get("paths", {})
     paths_found = False
     errors = []
-    for path, _methods in paths.items():
+    checks = []
+    for path, _methods in spec.paths.items():
         paths_found = True
         if path.endswith('/'):
-            errors.append(_("Path: {} ends with a slash").format(path))
+            checks.append((path, None))
         else:
-            for method, _oparations in _methods.items():
-                # print(method)
-                if method == "get":
-                    response = requests.get("{}{}/".format(api_endpoint, path), verify=False, timeout=60)
-                elif method == "post":
-                    response = requests.post("{}{}/".format(api_endpoint, path), verify=False, timeout=60)
-                elif method == "put":
-                    response = requests.put("{}{}/".format(api_endpoint, path), verify=False, timeout=60)
-                elif method == "delete":
-                    response = requests.delete("{}{}/".format(api_endpoint, path), verify=False, timeout=60)
-                else:
-                    response = None
+            for method in _methods:
+                if method in PROBED_METHODS:
+                    checks.append((path, method))
 
-                if response and response.status_code != 404:
-                    errors.append(_("Path: {}/ with a slash at the end did not result in a 404. it resulted in a {}").format(path, response.status_code))
+    prober = Prober()
+    responses = iter(prober.run([
+        (method, "{}{}/".format(api_endpoint, path)) for path, method in checks if method is not None
+    ]))
+    # Walk the checks again so the errors keep the order of the paths in the spec
+    for path, method in checks:
+        if method is None:
+            errors.append(_("Path: {} ends with a slash").format(path))
+            continue
+        response = next(responses)
+        if response and response.status_code != 404:
+            errors.append(_("Path: {}/ with a slash at the end did not result in a 404. it resulted in a {}").format(path, response.status_code))
 
     if not paths_found:
         result.success = False
@@ -60,5 +57,9 @@ def run_20200709_api_48(session, api_endpoint):
         result.errors = errors
     else:
         result.success = True
-    result.save()
+    if prober.skipped:
+        result.warnings = [_("{} paths were not checked, the time limit for this rule was reached").format(prober.skipped)]
     return result
+
+
+run_20200709_api_48 = legacy_runner(check_20200709_api_48)
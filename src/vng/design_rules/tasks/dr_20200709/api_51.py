@@ -3,29 +3,28 @@ from urllib.parse import urlparse
 from django.utils.translation import ugettext_lazy as _
 
 from ...choices import DesignRuleChoices
+from ..registry import register, legacy_runner, RESPONSE, CORRECT_LOCATION, IS_JSON, SPEC
 
 VALID_METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE"]
 SKIPPED_METHODS = ["PARAMETERS"]
 
 
-def run_20200709_api_51(session, response, correct_location=False, is_json=False):
+@register(DesignRuleChoices.api_51_20200709, inputs=(SPEC, RESPONSE, CORRECT_LOCATION, IS_JSON))
+def check_20200709_api_51(session, spec, response, correct_location=False, is_json=False):
     """
     https://publicatie.centrumvoorstandaarden.nl/api/adr/#api-51
+
+    Besides the specification this checks where and how the API serves it, so
+    the rule is skipped when a specification is linted without the API.
     """
     from ...models import DesignRuleResult
 
-    # We do not want double results for the same design rule
-    base_qs = session.results.filter(rule_type=DesignRuleChoices.api_51_20200709)
-    if base_qs.exists():
-        return base_qs.first()
-
     result = DesignRuleResult(design_rule=session, rule_type=DesignRuleChoices.api_51_20200709)
 
     # Only execute when there is a JSON response
-    if not session.json_result:
+    if not spec:
         result.success = False
         result.errors = [_("The API did not give a valid JSON output.")]
-        result.save()
         return result
 
     errors = []
@@ -48,5 +47,7 @@ def run_20200709_api_51(session, response, correct_location=False, is_json=False
         result.success = False
         result.errors = errors
 
-    result.save()
     return result
+
+
+run_20200709_api_51 = legacy_runner(check_20200709_api_51)
@@ -5,19 +5,16 @@ import semver
 from django.utils.translation import ugettext_lazy as _
 
 from ...choices import DesignRuleChoices
+from ..registry import register, legacy_runner, RESPONSE
 
 
-def run_20200709_api_57(session, response):
+@register(DesignRuleChoices.api_57_20200709, inputs=(RESPONSE, ))
+def check_20200709_api_57(session, response):
     """
     https://publicatie.centrumvoorstandaarden.nl/api/adr/#api-57
     """
     from ...models import DesignRuleResult
 
-    # We do not want double results for the same design rule
-    base_qs = session.results.filter(rule_type=DesignRuleChoices.api_57_20200709)
-    if base_qs.exists():
-        return base_qs.first()
-
     result = DesignRuleResult(design_rule=session, rule_type=DesignRuleChoices.api_57_20200709)
 
     if not response:
@@ -28,5 +25,7 @@ def run_20200709_api_57(session, response):
         result.errors = [_("The headers is missing. Make sure that the 'API-Version' is given.")]
     else:
         result.success = True
-    result.save()
     return result
+
+
+run_20200709_api_57 = legacy_runner(check_20200709_api_57)
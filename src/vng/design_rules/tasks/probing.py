@@ -0,0 +1,89 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+from celery.utils.log import get_task_logger
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = get_task_logger(__name__)
+
+
+class HostLimiter:
+    """
+    Bound the number of concurrent requests and the request rate per host
+    """
+
+    def __init__(self, concurrency, rate):
+        self.concurrency = concurrency
+        self.interval = 1 / rate if rate else 0
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_slot = {}
+
+    @contextmanager
+    def slot(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.Semaphore(self.concurrency)
+            semaphore = self._semaphores[host]
+        with semaphore:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_slot.get(host, now))
+                self._next_slot[host] = start + self.interval
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+
+class Prober:
+    """
+    Run HTTP requests concurrently over a shared keep-alive session.
+    The requests not started before the deadline are skipped.
+    """
+
+    def __init__(self, workers=None, per_host=None, rate=None, deadline=None, timeout=60):
+        self.workers = workers or settings.DESIGN_RULES_PROBE_WORKERS
+        self.limiter = HostLimiter(
+            per_host or settings.DESIGN_RULES_PROBE_PER_HOST,
+            rate or settings.DESIGN_RULES_PROBE_RATE
+        )
+        self.deadline = time.monotonic() + (deadline or settings.DESIGN_RULES_PROBE_DEADLINE)
+        self.timeout = timeout
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _request(self, method, url):
+        with self.limiter.slot(url):
+            remaining = self.deadline - time.monotonic()
+            if remaining <= 0:
+                with self._lock:
+                    self.skipped += 1
+                return None
+            try:
+                return self.session.request(method, url, verify=False, timeout=min(self.timeout, remaining))
+            except requests.RequestException as e:
+                logger.info("Probe %s %s failed: %s", method.upper(), url, e)
+                return None
+
+    def run(self, probes):
+        """
+        Return the responses of the (method, url) probes in the same order, None
+        for the probes that failed or were skipped
+        """
+        if not probes:
+            return []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self._request, method, url) for method, url in probes]
+            responses = [future.result() for future in futures]
+        self.session.close()
+        return responses
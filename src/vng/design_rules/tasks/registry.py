@@ -0,0 +1,134 @@
+"""
+Registry of the design rules.
+
+A rule is a `check` function returning an unsaved `DesignRuleResult`. It declares
+the inputs it needs besides the session and whether it makes network calls itself.
+"""
+import importlib
+import pkgutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+
+from ...utils.oas import SpecModel
+
+# Inputs a rule can ask for, produced once per session by `run_tests`
+SPEC = "spec"
+API_ENDPOINT = "api_endpoint"
+RESPONSE = "response"
+CORRECT_LOCATION = "correct_location"
+IS_JSON = "is_json"
+
+INPUTS = (SPEC, API_ENDPOINT, RESPONSE, CORRECT_LOCATION, IS_JSON)
+
+
+class DesignRule:
+    def __init__(self, rule_type, check, inputs=(), network=False):
+        unknown = set(inputs) - set(INPUTS)
+        if unknown:
+            raise ValueError("Unknown inputs {} for design rule {}".format(unknown, rule_type))
+        self.rule_type = rule_type
+        self.check = check
+        self.inputs = tuple(inputs)
+        self.network = network
+
+    def __repr__(self):
+        return "<DesignRule {}>".format(self.rule_type)
+
+    def is_offline(self, context):
+        """
+        Whether the rule can run on the context without contacting the API
+        """
+        return not self.network and all(name in context for name in self.inputs)
+
+    def run(self, session, context):
+        return self.check(session, **{name: context[name] for name in self.inputs})
+
+
+_registry = {}
+
+
+def register(rule_type, inputs=(), network=False):
+    """
+    Register the decorated function as the check of the design rule
+    """
+    def decorator(check):
+        if rule_type in _registry:
+            raise ValueError("Design rule {} is already registered".format(rule_type))
+        _registry[rule_type] = DesignRule(rule_type, check, inputs=inputs, network=network)
+        check.rule_type = rule_type
+        return check
+    return decorator
+
+
+def legacy_runner(check):
+    """
+    Return a function running the check for a session and saving its result,
+    unless the session already has a result for the rule.
+
+    Only for the `run_<date>_api_<nr>` functions of the rule packages, which
+    are kept for the tests and callers of a single rule. Sessions run their rules
+    through `execute`, which does not query or save per rule.
+    """
+    def run(session, **inputs):
+        # We do not want double results for the same design rule
+        base_qs = session.results.filter(rule_type=check.rule_type)
+        if base_qs.exists():
+            return base_qs.first()
+        if SPEC in _registry[check.rule_type].inputs and SPEC not in inputs:
+            inputs[SPEC] = SpecModel(session.json_result)
+        result = check(session, **inputs)
+        result.save()
+        return result
+    run.__doc__ = check.__doc__
+    return run
+
+
+def autodiscover():
+    """
+    Import every `dr_<date>` package of the tasks, registering their rules
+    """
+    from . import __path__ as tasks_path
+
+    for module in pkgutil.iter_modules(tasks_path):
+        if module.ispkg and module.name.startswith("dr_"):
+            importlib.import_module("{}.{}".format(__package__, module.name))
+
+
+def get_rule(rule_type):
+    autodiscover()
+    return _registry.get(rule_type)
+
+
+def get_rules(rule_types):
+    """
+    Return the registered rules for the given rule types, in the same order
+    """
+    autodiscover()
+    return [_registry[rule_type] for rule_type in rule_types if rule_type in _registry]
+
+
+def execute(session, rules, context, on_result=None):
+    """
+    Run the rules, returns their unsaved results in the order of the rules.
+    Network rules run concurrently in a thread pool while the rules only
+    analysing the specification run in the calling thread. Those rules are
+    CPU bound pure Python, more threads would only contend for the GIL, and
+    they finish while the network rules wait on the API.
+    """
+    results = {}
+    network_rules = [rule for rule in rules if rule.network]
+    spec_rules = [rule for rule in rules if not rule.network]
+
+    def collect(rule, result):
+        results[rule.rule_type] = result
+        if on_result:
+            on_result(rule, result)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(len(network_rules), settings.DESIGN_RULES_NETWORK_WORKERS))) as executor:
+        futures = {executor.submit(rule.run, session, context): rule for rule in network_rules}
+        for rule in spec_rules:
+            collect(rule, rule.run(session, context))
+        for future in as_completed(futures):
+            collect(futures[future], future.result())
+    return [results[rule.rule_type] for rule in rules]
@@ -5,12 +5,15 @@ import json
 from django.test import TestCase
 from django.utils.translation import ugettext_lazy as _
 
+import mock
 import requests_mock
-from vng.design_rules.choices import DesignRuleChoices
-from vng.design_rules.tasks.base import run_tests
+from vng.design_rules.choices import DesignRuleChoices, DesignRuleSessionStatus
+from vng.design_rules.tasks.base import execute_session, parse_specification, run_scheduled_design_rules, run_tests
 
-from ..factories import DesignRuleSessionFactory, DesignRuleTestOptionFactory, DesignRuleTestVersionFactory
-from ...models import DesignRuleResult
+from ..factories import (
+    DesignRuleSessionFactory, DesignRuleTestOptionFactory, DesignRuleTestSuiteFactory, DesignRuleTestVersionFactory
+)
+from ...models import DesignRuleBatch, DesignRuleResult, DesignRuleSession, Specification
 
 
 class BaseAPITests(TestCase):
@@ -127,6 +130,25 @@ class BaseAPITests(TestCase):
         self.assertTrue(session.successful())
         self.assertEqual(session.percentage_score, Decimal("100"))
 
+    def test_specification_stored_once(self):
+        sessions = [
+            DesignRuleSessionFactory(test_suite__api_endpoint="http://localhost:8000/api/v1", test_version=self.test_version)
+            for i in range(2)
+        ]
+
+        with requests_mock.Mocker() as mock:
+            dir_path = os.path.dirname(os.path.realpath(__file__))
+            with open(os.path.join(dir_path, "files", "good.json")) as json_file:
+                mock.get('http://localhost:8000/api/v1/openapi.json', json=json.loads(json_file.read()), headers={"ETag": '"good"'})
+            for session in sessions:
+                run_tests(session, "http://localhost:8000/api/v1")
+
+        self.assertEqual(Specification.objects.count(), 1)
+        for session in sessions:
+            session.refresh_from_db()
+            self.assertEqual(session.specification, Specification.objects.get())
+            self.assertIsNone(session.json_result)
+
     def test_old_api_loading(self):
         session = DesignRuleSessionFactory(test_suite__api_endpoint="http://localhost:8000/api/v1", test_version=self.test_version)
 
@@ -233,3 +255,141 @@ class BaseAPITests(TestCase):
         session.refresh_from_db()
         self.assertFalse(session.successful())
         self.assertEqual(session.percentage_score, Decimal("0"))
+
+
+class LintTests(TestCase):
+    def setUp(self):
+        self.test_version = DesignRuleTestVersionFactory()
+        DesignRuleTestOptionFactory(test_version=self.test_version, rule_type=DesignRuleChoices.api_03_20200709)
+        DesignRuleTestOptionFactory(test_version=self.test_version, rule_type=DesignRuleChoices.api_09_20200117)
+        DesignRuleTestOptionFactory(test_version=self.test_version, rule_type=DesignRuleChoices.api_16_20200709)
+        DesignRuleTestOptionFactory(test_version=self.test_version, rule_type=DesignRuleChoices.api_20_20200709)
+        DesignRuleTestOptionFactory(test_version=self.test_version, rule_type=DesignRuleChoices.api_48_20200709)
+        DesignRuleTestOptionFactory(test_version=self.test_version, rule_type=DesignRuleChoices.api_51_20200117)
+        DesignRuleTestOptionFactory(test_version=self.test_version, rule_type=DesignRuleChoices.api_51_20200709)
+
+    def _read(self, name):
+        dir_path = os.path.dirname(os.path.realpath(__file__))
+        with open(os.path.join(dir_path, "files", name), "rb") as f:
+            return f.read()
+
+    def test_parse_specification(self):
+        self.assertEqual(parse_specification(b'{"openapi": "3.0.0"}'), ({"openapi": "3.0.0"}, True))
+        self.assertEqual(parse_specification("openapi: 3.0.0"), ({"openapi": "3.0.0"}, False))
+        self.assertEqual(parse_specification(self._read("website.html")), (None, False))
+
+    def test_spec_only_rules(self):
+        spec, is_json = parse_specification(self._read("good.json"))
+
+        # Any request fails as no URL is mocked
+        with requests_mock.Mocker():
+            session, results, skipped = DesignRuleSession.lint(self.test_version, spec, is_json)
+
+        self.assertEqual([result.rule_type for result in results], [
+            DesignRuleChoices.api_03_20200709, DesignRuleChoices.api_09_20200117, DesignRuleChoices.api_16_20200709,
+        ])
+        self.assertTrue(all(result.success for result in results))
+        self.assertEqual(skipped, [
+            DesignRuleChoices.api_20_20200709, DesignRuleChoices.api_48_20200709,
+            DesignRuleChoices.api_51_20200117, DesignRuleChoices.api_51_20200709,
+        ])
+        self.assertEqual(session.percentage_score, Decimal("100"))
+        self.assertFalse(DesignRuleSession.objects.exists())
+        self.assertFalse(DesignRuleResult.objects.exists())
+
+    def test_api_endpoint_rules(self):
+        spec, is_json = parse_specification(self._read("good.json"))
+
+        with requests_mock.Mocker():
+            session, results, skipped = DesignRuleSession.lint(
+                self.test_version, spec, is_json, api_endpoint="http://localhost:8000/api/v1"
+            )
+
+        self.assertEqual(len(results), 5)
+        self.assertEqual(skipped, [DesignRuleChoices.api_48_20200709, DesignRuleChoices.api_51_20200709])
+
+    def test_save(self):
+        spec, is_json = parse_specification(self._read("openapi.yaml"))
+
+        session, results, skipped = DesignRuleSession.lint(self.test_version, spec, is_json, save=True)
+
+        session.refresh_from_db()
+        self.assertEqual(session.status, DesignRuleSessionStatus.finished)
+        self.assertIsNone(session.test_suite)
+        self.assertEqual(session.results.count(), 3)
+
+
+class ExecuteSessionTests(TestCase):
+    def test_session_finished(self):
+        test_version = DesignRuleTestVersionFactory()
+        DesignRuleTestOptionFactory(test_version=test_version, rule_type=DesignRuleChoices.api_03_20200709)
+        session = DesignRuleSessionFactory(test_suite__api_endpoint="https://maykinmedia.nl", test_version=test_version)
+        self.assertEqual(session.status, DesignRuleSessionStatus.queued)
+
+        with requests_mock.Mocker() as m:
+            m.get(requests_mock.ANY, status_code=404)
+            execute_session(session.pk)
+
+        session.refresh_from_db()
+        self.assertEqual(session.status, DesignRuleSessionStatus.finished)
+        self.assertEqual(session.progress, 100)
+        self.assertIsNotNone(session.finished_at)
+        self.assertEqual(session.results.count(), 1)
+
+    @mock.patch("vng.design_rules.models.run_tests", side_effect=ValueError)
+    def test_session_error(self, run_tests):
+        session = DesignRuleSessionFactory(test_version=DesignRuleTestVersionFactory())
+
+        execute_session(session.pk)
+
+        session.refresh_from_db()
+        self.assertEqual(session.status, DesignRuleSessionStatus.error)
+        self.assertTrue(session.is_finished())
+
+
+class ExecuteBatchTests(TestCase):
+    def setUp(self):
+        self.test_version = DesignRuleTestVersionFactory()
+        DesignRuleTestOptionFactory(test_version=self.test_version, rule_type=DesignRuleChoices.api_03_20200709)
+        self.test_suites = [
+            DesignRuleTestSuiteFactory(api_endpoint="https://maykinmedia.nl/api/v1"),
+            DesignRuleTestSuiteFactory(api_endpoint="https://maykinmedia.nl/api/v2"),
+            DesignRuleTestSuiteFactory(api_endpoint="https://example.com/api/v1"),
+        ]
+
+    def test_batch_finished(self):
+        with requests_mock.Mocker() as m:
+            m.get(requests_mock.ANY, status_code=404)
+            batch = DesignRuleBatch.start(self.test_version, self.test_suites)
+
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, DesignRuleSessionStatus.finished)
+        self.assertIsNotNone(batch.finished_at)
+        report = batch.get_report()
+        self.assertEqual(report["sessions"], 3)
+        self.assertEqual(report["finished"], 3)
+        self.assertEqual(report["errors"], 0)
+        self.assertEqual(
+            {result["api_endpoint"] for result in report["results"]},
+            {test_suite.api_endpoint for test_suite in self.test_suites}
+        )
+        self.assertTrue(all(result["failed"] == [DesignRuleChoices.api_03_20200709] for result in report["results"]))
+
+    @mock.patch("vng.design_rules.models.run_tests", side_effect=ValueError)
+    def test_failing_session_does_not_stop_the_batch(self, run_tests):
+        batch = DesignRuleBatch.start(self.test_version, self.test_suites)
+
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, DesignRuleSessionStatus.finished)
+        self.assertEqual(batch.get_report()["errors"], 3)
+
+    @mock.patch("vng.design_rules.models.execute_batch")
+    def test_scheduled_run_uses_latest_active_version(self, execute_batch):
+        DesignRuleTestVersionFactory(is_active=False)
+
+        run_scheduled_design_rules()
+
+        batch = DesignRuleBatch.objects.get()
+        self.assertEqual(batch.test_version, self.test_version)
+        self.assertEqual(batch.sessions.count(), 3)
+        execute_batch.delay.assert_called_once_with(batch.pk)
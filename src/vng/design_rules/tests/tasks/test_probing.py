@@ -0,0 +1,38 @@
+from django.test import SimpleTestCase
+
+import requests_mock
+
+from vng.design_rules.tasks.probing import Prober
+
+
+class ProberTests(SimpleTestCase):
+    def test_responses_in_probe_order(self):
+        probes = [("get", "https://maykinmedia.nl/api/v1/{}/".format(i)) for i in range(20)]
+
+        with requests_mock.Mocker() as mock:
+            for i in range(20):
+                mock.get("https://maykinmedia.nl/api/v1/{}/".format(i), status_code=200 + i)
+            responses = Prober(workers=4, per_host=2, rate=1000, deadline=60).run(probes)
+
+        self.assertEqual([r.status_code for r in responses], [200 + i for i in range(20)])
+
+    def test_failed_probe(self):
+        with requests_mock.Mocker() as mock:
+            mock.get("https://maykinmedia.nl/api/v1/", status_code=404)
+            responses = Prober(deadline=60).run([
+                ("get", "https://maykinmedia.nl/api/v1/"),
+                ("post", "https://maykinmedia.nl/api/v1/"),
+            ])
+
+        self.assertEqual(responses[0].status_code, 404)
+        self.assertIsNone(responses[1])
+
+    def test_deadline(self):
+        prober = Prober(deadline=60)
+        prober.deadline = 0
+
+        with requests_mock.Mocker():
+            responses = prober.run([("get", "https://maykinmedia.nl/api/v1/")])
+
+        self.assertEqual(responses, [None])
+        self.assertEqual(prober.skipped, 1)
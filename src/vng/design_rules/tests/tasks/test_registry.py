@@ -0,0 +1,53 @@
+from django.test import SimpleTestCase, override_settings
+
+from vng.design_rules.choices import DesignRuleChoices
+from vng.design_rules.tasks import registry
+
+
+class RegistryTests(SimpleTestCase):
+    def test_all_rules_registered(self):
+        rules = registry.get_rules(DesignRuleChoices.values.keys())
+
+        self.assertEqual({rule.rule_type for rule in rules}, set(DesignRuleChoices.values.keys()))
+
+    def test_rules_keep_order(self):
+        rule_types = [DesignRuleChoices.api_57_20200709, DesignRuleChoices.api_03_20200709]
+
+        self.assertEqual([rule.rule_type for rule in registry.get_rules(rule_types)], rule_types)
+
+    def test_network_rules(self):
+        self.assertTrue(registry.get_rule(DesignRuleChoices.api_48_20200709).network)
+        self.assertFalse(registry.get_rule(DesignRuleChoices.api_03_20200709).network)
+
+    def test_unknown_input(self):
+        with self.assertRaises(ValueError):
+            registry.DesignRule("api_00", lambda session: None, inputs=("unknown", ))
+
+    @override_settings(DESIGN_RULES_NETWORK_WORKERS=2)
+    def test_execute_returns_results_in_rule_order(self):
+        calls = []
+
+        def check(name):
+            def run(session, api_endpoint):
+                calls.append(name)
+                return (name, api_endpoint)
+            return run
+
+        rules = [
+            registry.DesignRule("network_1", check("network_1"), inputs=(registry.API_ENDPOINT, ), network=True),
+            registry.DesignRule("spec", check("spec"), inputs=(registry.API_ENDPOINT, )),
+            registry.DesignRule("network_2", check("network_2"), inputs=(registry.API_ENDPOINT, ), network=True),
+        ]
+        reported = []
+
+        results = registry.execute(
+            None, rules, {registry.API_ENDPOINT: "https://maykinmedia.nl"},
+            on_result=lambda rule, result: reported.append(rule.rule_type)
+        )
+
+        self.assertEqual(results, [
+            ("network_1", "https://maykinmedia.nl"),
+            ("spec", "https://maykinmedia.nl"),
+            ("network_2", "https://maykinmedia.nl"),
+        ])
+        self.assertEqual(sorted(reported), ["network_1", "network_2", "spec"])
@@ -8,7 +8,7 @@ import requests_mock
 
 from .factories import DesignRuleSessionFactory, DesignRuleTestSuiteFactory, DesignRuleResultFactory, DesignRuleTestVersionFactory, DesignRuleTestOptionFactory
 from ..choices import DesignRuleChoices
-from ..models import DesignRuleSession, DesignRuleResult
+from ..models import DesignRuleSession, DesignRuleResult, DesignRuleTrend
 
 
 class DesignRuleTestSuiteTests(TestCase):
@@ -113,3 +113,22 @@ class DesignRuleSessionTests(TestCase):
         session = DesignRuleSessionFactory()
         DesignRuleResultFactory(success=False, design_rule=session)
         self.assertFalse(session.successful())
+
+
+class DesignRuleTrendTests(TestCase):
+    def test_record(self):
+        session = DesignRuleSessionFactory(percentage_score=50)
+        DesignRuleResultFactory(design_rule=session, rule_type=DesignRuleChoices.api_03_20200709, success=True)
+        DesignRuleResultFactory(design_rule=session, rule_type=DesignRuleChoices.api_16_20200709, success=False)
+
+        trend = DesignRuleTrend.record(session)
+
+        trend.refresh_from_db()
+        self.assertEqual(trend.test_suite, session.test_suite)
+        self.assertEqual(trend.percentage_score, Decimal("50"))
+        self.assertEqual(trend.get_passed(), {
+            DesignRuleChoices.api_03_20200709: True,
+            DesignRuleChoices.api_16_20200709: False,
+        })
+        # The trend is only written once
+        self.assertEqual(DesignRuleTrend.record(session), trend)
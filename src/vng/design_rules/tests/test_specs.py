@@ -0,0 +1,190 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from mock import patch
+import requests_mock
+
+from vng.utils.oas import RefResolutionError, RefResolver, SpecModel, load_json, load_yaml
+from vng.utils.specs import SpecCache, fetch_spec, fetch_specs
+
+
+class SpecCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache = SpecCache(self.directory)
+
+    def test_revalidate_with_etag(self):
+        url = "https://maykinmedia.nl/openapi.json"
+        with requests_mock.Mocker() as mock:
+            mock.get(url, json={"openapi": "3.0.0"}, headers={"ETag": '"v1"'})
+            first = fetch_spec(url, cache=self.cache)
+
+            mock.get(url, status_code=304, headers={"ETag": '"v1"', "API-Version": "1.0.0"})
+            second = fetch_spec(url, cache=self.cache)
+
+            self.assertEqual(mock.last_request.headers["If-None-Match"], '"v1"')
+
+        self.assertFalse(first.from_cache)
+        self.assertTrue(second.from_cache)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json(), {"openapi": "3.0.0"})
+        self.assertEqual(second.headers["API-Version"], "1.0.0")
+
+    def test_changed_spec_is_transferred(self):
+        url = "https://maykinmedia.nl/openapi.json"
+        with requests_mock.Mocker() as mock:
+            mock.get(url, json={"openapi": "3.0.0"}, headers={"Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"})
+            fetch_spec(url, cache=self.cache)
+
+            mock.get(url, json={"openapi": "3.0.1"})
+            response = fetch_spec(url, cache=self.cache)
+
+            self.assertIn("If-Modified-Since", mock.last_request.headers)
+
+        self.assertEqual(response.json(), {"openapi": "3.0.1"})
+
+    def test_identical_specs_stored_once(self):
+        with requests_mock.Mocker() as mock:
+            mock.get("https://maykinmedia.nl/openapi.json", json={"openapi": "3.0.0"})
+            mock.get("https://maykinmedia.nl/docs/openapi.json", json={"openapi": "3.0.0"})
+            first, second = fetch_specs(
+                ["https://maykinmedia.nl/openapi.json", "https://maykinmedia.nl/docs/openapi.json"],
+                cache=self.cache
+            )
+
+        self.assertEqual(first.content_hash, second.content_hash)
+        self.assertEqual(
+            self.cache.get("https://maykinmedia.nl/openapi.json")["hash"],
+            self.cache.get("https://maykinmedia.nl/docs/openapi.json")["hash"]
+        )
+
+    def test_unreachable(self):
+        with requests_mock.Mocker():
+            self.assertIsNone(fetch_spec("https://maykinmedia.nl/openapi.json", cache=self.cache))
+
+    def test_unwritable_cache(self):
+        url = "https://maykinmedia.nl/openapi.json"
+        with requests_mock.Mocker() as mock, patch("vng.utils.specs._write", side_effect=OSError):
+            mock.get(url, json={"openapi": "3.0.0"})
+            response = fetch_spec(url, cache=self.cache)
+
+        self.assertEqual(response.json(), {"openapi": "3.0.0"})
+        self.assertIsNone(self.cache.get(url))
+
+    def test_prune(self):
+        with requests_mock.Mocker() as mock:
+            for i in range(3):
+                url = "https://maykinmedia.nl/{}/openapi.json".format(i)
+                mock.get(url, json={"openapi": "3.0.{}".format(i)})
+                fetch_spec(url, cache=self.cache)
+        now = time.time()
+        for i, age in enumerate((40 * 24 * 60 * 60, 60, 0)):
+            url = "https://maykinmedia.nl/{}/openapi.json".format(i)
+            for path in (self.cache._meta_path(url), self.cache._blob_path(self.cache.get(url)["hash"])):
+                os.utime(path, (now - age, now - age))
+        size = os.path.getsize(self.cache._blob_path(self.cache.get("https://maykinmedia.nl/2/openapi.json")["hash"]))
+
+        self.cache.prune(max_age=30 * 24 * 60 * 60, max_bytes=size)
+
+        self.assertIsNone(self.cache.get("https://maykinmedia.nl/0/openapi.json"))
+        self.assertIsNone(self.cache.get("https://maykinmedia.nl/1/openapi.json"))
+        self.assertIsNotNone(self.cache.get("https://maykinmedia.nl/2/openapi.json"))
+
+
+class SpecModelTests(SimpleTestCase):
+    spec = {
+        "openapi": "3.0.0",
+        "paths": {
+            "/zaken": {
+                "parameters": [{"name": "path_level", "in": "query"}],
+                "get": {"parameters": [{"$ref": "#/components/parameters/fields"}]},
+                "post": {},
+            },
+        },
+        "components": {
+            "parameters": {"fields": {"name": "fields", "in": "query"}},
+            "schemas": {"Zaak": {"type": "object"}},
+        },
+    }
+
+    def test_operations(self):
+        spec = SpecModel(self.spec)
+
+        self.assertEqual([(o.path, o.method) for o in spec.operations], [("/zaken", "get"), ("/zaken", "post")])
+        self.assertEqual(spec.operations[0].parameters, [{"name": "fields", "in": "query"}])
+        self.assertEqual(spec.version, "3.0.0")
+        self.assertEqual(list(spec.schemas), ["Zaak"])
+
+    def test_empty_spec(self):
+        self.assertFalse(SpecModel(None))
+        self.assertEqual(SpecModel(None).operations, [])
+
+    def test_load(self):
+        self.assertEqual(load_json(b'{"openapi": "3.0.0"}'), {"openapi": "3.0.0"})
+        self.assertEqual(load_yaml("openapi: 3.0.0"), {"openapi": "3.0.0"})
+
+
+class RefResolverTests(SimpleTestCase):
+    def test_remote_and_relative_refs(self):
+        spec = {
+            "paths": {"/zaken": {"get": {"parameters": [{"$ref": "common.yaml#/parameters/fields"}]}}},
+        }
+        with requests_mock.Mocker() as mock:
+            mock.get(
+                "https://maykinmedia.nl/specs/common.yaml",
+                text="parameters:\n  fields:\n    name: fields\n    in: query\n    schema:\n      $ref: '#/schemas/Fields'\n"
+                     "schemas:\n  Fields:\n    type: array\n"
+            )
+            model = SpecModel(spec, base_url="https://maykinmedia.nl/specs/openapi.yaml")
+
+            self.assertEqual(mock.call_count, 1)
+
+        self.assertEqual(model.operations[0].parameters, [
+            {"name": "fields", "in": "query", "schema": {"type": "array"}}
+        ])
+
+    def test_documents_fetched_once(self):
+        fetched = []
+
+        def fetch(url):
+            fetched.append(url)
+            return {"Zaak": {"type": "object"}}
+
+        resolver = RefResolver({}, "https://maykinmedia.nl/openapi.json", fetch=fetch)
+        resolver.resolve({"$ref": "schemas.json#/Zaak"})
+        resolver.resolve({"$ref": "https://maykinmedia.nl/schemas.json#/Zaak"})
+
+        self.assertEqual(fetched, ["https://maykinmedia.nl/schemas.json"])
+
+    def test_cycle(self):
+        spec = {"Node": {"properties": {"children": {"items": {"$ref": "#/Node"}}}}}
+
+        node = RefResolver(spec).resolve({"$ref": "#/Node"})
+
+        self.assertEqual(node["properties"]["children"]["items"], {"$ref": "#/Node"})
+
+    def test_relative_ref_without_base_url(self):
+        parameter = {"$ref": "common.yaml#/parameters/fields"}
+
+        self.assertEqual(SpecModel({"paths": {"/": {"get": {"parameters": [parameter]}}}}).operations[0].parameters, [parameter])
+
+    def test_unparsable_remote_ref(self):
+        parameter = {"$ref": "common.yaml#/parameters/fields"}
+        spec = {"paths": {"/": {"get": {"parameters": [parameter]}}}}
+        with requests_mock.Mocker() as mock:
+            mock.get("https://maykinmedia.nl/specs/common.yaml", text="parameters: [fields\n")
+            mock.get("https://maykinmedia.nl/specs/common.json", text="{not json")
+            mock.get("https://maykinmedia.nl/specs/list.yaml", text="- fields\n")
+            for ref in ("common.yaml", "common.json", "list.yaml"):
+                resolver = RefResolver(spec, "https://maykinmedia.nl/specs/openapi.yaml")
+                with self.assertRaises(RefResolutionError):
+                    resolver.resolve({"$ref": ref + "#/parameters/fields"})
+
+            model = SpecModel(spec, base_url="https://maykinmedia.nl/specs/openapi.yaml")
+
+        self.assertEqual(model.operations[0].parameters, [parameter])
@@ -1,3 +1,9 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ImageDigest
+
+
+@admin.register(ImageDigest)
+class ImageDigestAdmin(admin.ModelAdmin):
+    list_display = ['image', 'digest', 'resolved_at']
+    search_fields = ['image']
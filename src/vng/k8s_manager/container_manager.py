@@ -2,9 +2,31 @@ import json
 import yaml
 import uuid
 import os
+from datetime import timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 from .kubernetes import *
 from ..utils.commands import run_command, safeget
+from ..utils.instrumentation import KUBERNETES, timed
+
+
+def config_map_references(deployment):
+    '''
+    Return the names of the ConfigMaps used by the pods of the deployment
+    '''
+    pod_spec = safeget(deployment, 'spec', 'template', 'spec') or {}
+    names = set()
+    for container in (pod_spec.get('containers') or []) + (pod_spec.get('initContainers') or []):
+        for env_from in container.get('envFrom') or []:
+            names.add(safeget(env_from, 'configMapRef', 'name'))
+        for env in container.get('env') or []:
+            names.add(safeget(env, 'valueFrom', 'configMapKeyRef', 'name'))
+    for volume in pod_spec.get('volumes') or []:
+        names.add(safeget(volume, 'configMap', 'name'))
+    names.discard(None)
+    return names
 
 
 class K8S():
@@ -25,6 +47,7 @@ class K8S():
         for gfile in self.garbage:
             os.remove(gfile)
 
+    @timed(KUBERNETES, 'initialize')
     def initialize(self):
         if self.initialized:
             return
@@ -67,13 +90,16 @@ class K8S():
 
         self.initialized = True
 
-    def fetch_resource(self, resource):
+    @timed(KUBERNETES, 'fetch')
+    def fetch_resource(self, resource, selector=None):
         fetch = [
             'kubectl',
             'get',
             resource,
             '--output=json'
         ]
+        if selector:
+            fetch.append('--selector={}'.format(selector))
         res = run_command(fetch).decode('utf-8')
         return json.loads(res)
 
@@ -86,13 +112,37 @@ class K8S():
                     # Delete the workload
                     run_command([*clean_up, name])
 
+    @timed(KUBERNETES, 'delete')
     def delete(self):
         self.delete_resource('deployments', ['kubectl', 'delete', 'deployment'])
         self.delete_resource('services', ['kubectl', 'delete', 'service'])
 
         # TODO: remove unused resources, remember that Kubernetes has a Garbage Collector integrated
         # svc still used
+        # The shared ConfigMaps are removed by `prune_config_maps`
+
+    @timed(KUBERNETES, 'delete')
+    def prune_config_maps(self, min_age=timedelta(hours=1)):
+        '''
+        Delete the shared ConfigMaps that no deployment uses anymore. ConfigMaps
+        younger than `min_age` are kept, their deployment may still be applied.
+        Returns the names of the deleted ConfigMaps.
+        '''
+        used = set()
+        for deployment in self.fetch_resource('deployments')['items']:
+            used |= config_map_references(deployment)
+        created_before = timezone.now() - min_age
+        deleted = []
+        for config_map in self.fetch_resource('configmaps', selector=SHARED_CONFIG_LABEL)['items']:
+            name = safeget(config_map, 'metadata', 'name')
+            created = parse_datetime(safeget(config_map, 'metadata', 'creationTimestamp') or '')
+            if name in used or created is None or created > created_before:
+                continue
+            run_command(['kubectl', 'delete', 'configmap', name])
+            deleted.append(name)
+        return deleted
 
+    @timed(KUBERNETES, 'pod_log')
     def get_pod_log(self, c_name):
         if not self.pod_name:
             self.make_aware()
@@ -109,6 +159,7 @@ class K8S():
         except:
             raise Exception('Application {} not found in the deployed cluster'.format(self.app_name))
 
+    @timed(KUBERNETES, 'pod_status')
     def get_pod_status(self):
         status_command = [
             'kubectl',
@@ -125,6 +176,7 @@ class K8S():
                 return item
         raise Exception('Application {} not found in the deployed cluster'.format(self.app_name))
 
+    @timed(KUBERNETES, 'pod_status')
     def get_pod_status_deployment(self):
         status_command = [
             'kubectl',
@@ -147,6 +199,7 @@ class K8S():
                     return True, None
         raise Exception('Application {} not found in the deployed cluster'.format(self.app_name))
 
+    @timed(KUBERNETES, 'service_status')
     def service_status(self):
         status_command = [
             'kubectl',
@@ -166,11 +219,23 @@ class K8S():
                 return None
         raise Exception('Application {} not found in the deployed cluster'.format(self.app_name))
 
+    @timed(KUBERNETES, 'scale')
+    def scale(self, replicas):
+        scale_command = [
+            'kubectl',
+            'scale',
+            'deployment',
+            self.app_name,
+            '--replicas={}'.format(replicas)
+        ]
+        return run_command(scale_command)
+
     def make_aware(self):
         status = self.get_pod_status()
         self.pod_name = status['metadata']['name']
         self.deployment = status['metadata']['ownerReferences'][0]['name']
 
+    @timed(KUBERNETES, 'exec')
     def exec(self, commands):
         self.make_aware()
         exec_command = [
@@ -182,6 +247,7 @@ class K8S():
         ]
         return run_command(exec_command).decode('utf-8')
 
+    @timed(KUBERNETES, 'copy')
     def copy_to(self, source, dest):
         self.make_aware()
         copy_command = [
@@ -0,0 +1,100 @@
+'''
+Resolution of the mutable image tags of the session containers into digests,
+so that deployments use pinned images which can be pulled once per node.
+'''
+import logging
+
+import requests
+
+from django.utils import timezone
+
+from .models import ImageDigest
+
+logger = logging.getLogger(__name__)
+
+DOCKER_HUB_AUTH = 'https://auth.docker.io/token'
+DOCKER_HUB_REGISTRY = 'https://registry-1.docker.io'
+
+MANIFEST_TYPES = ', '.join([
+    'application/vnd.docker.distribution.manifest.list.v2+json',
+    'application/vnd.oci.image.index.v1+json',
+    'application/vnd.docker.distribution.manifest.v2+json',
+])
+
+
+def parse_image(image):
+    '''
+    Split an image reference in registry host, repository and tag
+    '''
+    registry = None
+    name = image
+    first = image.split('/', 1)[0]
+    if '/' in image and ('.' in first or ':' in first or first == 'localhost'):
+        registry, name = image.split('/', 1)
+    tag = 'latest'
+    if ':' in name:
+        name, tag = name.rsplit(':', 1)
+    if registry is None and '/' not in name:
+        name = 'library/{}'.format(name)
+    return registry, name, tag
+
+
+def fetch_digest(image, timeout=10):
+    '''
+    Return the digest the tag of the image points to, only Docker Hub images are supported
+    '''
+    if '@' in image:
+        return image.split('@', 1)[1]
+    registry, repository, tag = parse_image(image)
+    if registry is not None:
+        logger.info('Digest resolution not supported for %s', image)
+        return None
+    token = requests.get(DOCKER_HUB_AUTH, params={
+        'service': 'registry.docker.io',
+        'scope': 'repository:{}:pull'.format(repository),
+    }, timeout=timeout).json()['token']
+    response = requests.head(
+        '{}/v2/{}/manifests/{}'.format(DOCKER_HUB_REGISTRY, repository, tag),
+        headers={
+            'Authorization': 'Bearer {}'.format(token),
+            'Accept': MANIFEST_TYPES,
+        },
+        timeout=timeout
+    )
+    response.raise_for_status()
+    return response.headers.get('Docker-Content-Digest')
+
+
+def resolve_digests(images):
+    '''
+    Store the current digest of every image, returns the updated ImageDigest objects
+    '''
+    resolved = []
+    for image in sorted(set(images)):
+        try:
+            digest = fetch_digest(image)
+        except (requests.RequestException, KeyError, ValueError) as e:
+            logger.exception(e)
+            continue
+        if not digest:
+            continue
+        image_digest, __ = ImageDigest.objects.update_or_create(image=image, defaults={
+            'digest': digest,
+            'resolved_at': timezone.now()
+        })
+        resolved.append(image_digest)
+    return resolved
+
+
+def pin_containers(containers):
+    '''
+    Let the containers use the resolved digest of their image, returns the
+    pinned image references. Containers of unresolved images keep their tag.
+    '''
+    digests = {d.image: d for d in ImageDigest.objects.filter(image__in=[c.image for c in containers])}
+    pinned = []
+    for c in containers:
+        if c.image in digests:
+            c.pinned_image = digests[c.image].get_pinned_image()
+            pinned.append(c.pinned_image)
+    return sorted(set(pinned))
@@ -1,10 +1,53 @@
-import uuid
-import yaml
+import hashlib
+import json
+import logging
 import os
-import random
+import yaml
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 
 from ..utils.commands import run_command
+from ..utils.instrumentation import KUBERNETES, timed
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(content, length=10):
+    '''
+    Deterministic short hash of a Kubernetes object content, used to name objects
+    so that identical ones are shared instead of being created over and over
+    '''
+    serialized = json.dumps(content, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(serialized).hexdigest()[:length]
+
+
+# Label of the ConfigMaps shared between sessions, they are removed by `K8S.prune_config_maps`
+SHARED_CONFIG_LABEL = 'vng-shared-config'
+
+
+def in_cluster():
+    '''
+    Whether this application runs in a pod, Kubernetes sets the variable in every container
+    '''
+    return 'KUBERNETES_SERVICE_HOST' in os.environ
+
+
+def uses_load_balancer():
+    '''
+    Whether every session is exposed through its own LoadBalancer service,
+    instead of being reached inside the cluster by the proxy. The cluster DNS
+    names only resolve inside the cluster, so the 'cluster' routing is refused
+    when this application runs elsewhere.
+    '''
+    if settings.KUBERNETES_ROUTING == 'loadbalancer':
+        return True
+    if settings.KUBERNETES_ROUTING != 'cluster':
+        raise ImproperlyConfigured('Unknown KUBERNETES_ROUTING {!r}'.format(settings.KUBERNETES_ROUTING))
+    if not in_cluster():
+        raise ImproperlyConfigured(
+            "KUBERNETES_ROUTING 'cluster' requires this application to run inside the Kubernetes cluster"
+        )
+    return False
 
 
 class AutoAssigner(object):
@@ -14,33 +57,94 @@ class AutoAssigner(object):
             setattr(self, k, v)
 
 
-class KubernetesObject(AutoAssigner):
+class Manifest():
+    '''
+    Multi-document bundle of Kubernetes objects.
+    The bundle is rendered only once and applied with a single server-side apply,
+    instead of running a `kubectl create` for every object.
+    '''
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.create_config = [
+    field_manager = 'vng-api-test-platform'
+
+    def __init__(self, objects):
+        self.objects = objects
+        self._rendered = None
+
+    def get_documents(self):
+        documents = []
+        seen = set()
+        for obj in self.objects:
+            content = obj.get_content()
+            key = (content['kind'], content['metadata']['name'])
+            # Objects with a content-hashed name may be required by several containers
+            if key in seen:
+                continue
+            seen.add(key)
+            documents.append(content)
+        return documents
+
+    def render(self):
+        if self._rendered is None:
+            self._rendered = yaml.dump_all(self.get_documents(), default_flow_style=False)
+        return self._rendered
+
+    def get_apply_command(self, dry_run=False):
+        command = [
+            'kubectl',
+            'apply',
+            '--server-side',
+            '--force-conflicts',
+            '--field-manager={}'.format(self.field_manager),
+        ]
+        if dry_run:
+            command.append('--dry-run=server')
+        return command + ['-f', '-']
+
+    @timed(KUBERNETES, 'apply')
+    def apply(self, dry_run=None):
+        if dry_run is None:
+            dry_run = settings.KUBERNETES_DRY_RUN
+        if dry_run:
+            logger.info('Rendered manifest:\n%s', self.render())
+            logger.info('Manifest diff:\n%s', self.diff())
+        return run_command(self.get_apply_command(dry_run=dry_run), input=self.render())
+
+    @timed(KUBERNETES, 'diff')
+    def diff(self):
+        diff_command = [
             'kubectl',
-            'create',
-            '-f'
+            'diff',
+            '--server-side',
+            '--force-conflicts',
+            '--field-manager={}'.format(self.field_manager),
+            '-f',
+            '-'
         ]
+        res = run_command(diff_command, input=self.render())
+        return res.decode('utf-8') if res is not None else ''
+
+
+class KubernetesObject(AutoAssigner):
 
     def requirements(self):
-        pass
-
-    def execute(self):
-        self.requirements()
-        filename = str(uuid.uuid4())
-        self.dump(filename)
-        self.create_config.append(filename)
-        run_command(self.create_config)
-        if not settings.DEBUG:
-            os.remove(filename)
+        '''
+        Return the Kubernetes objects that must exist before this one is applied
+        '''
+        return []
+
+    def get_manifest(self):
+        return Manifest([*self.requirements(), self])
+
+    def execute(self, dry_run=None):
+        self.get_manifest().apply(dry_run=dry_run)
         return self
 
+    def diff(self):
+        return self.get_manifest().diff()
+
     def dump(self, filename):
-        content = self.get_content()
         with open(filename, 'w') as out_file:
-            out_file.write(yaml.dump(content))
+            out_file.write(self.get_manifest().render())
 
 
 class Ingress(KubernetesObject):
@@ -56,25 +160,6 @@ class Ingress(KubernetesObject):
     apiVersion = 'extensions/v1beta1'
     kind = 'Ingress'
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.apply_config = [
-            'kubectl',
-            'apply',
-            '-f'
-        ]
-
-    def execute(self):
-        # TODO: use differnet commands
-        self.requirements()
-        filename = str(uuid.uuid4())
-        self.dump(filename)
-        self.create_config.append(filename)
-        res = run_command(self.create_config)
-        if not settings.DEBUG:
-            os.remove(filename)
-        return self
-
     def get_content(self):
         _paths = []
         for p in self.paths:
@@ -110,36 +195,56 @@ class Container(AutoAssigner):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.cpu_limit = '0.1'
-
-    def exec_config(self):
+        # Mebibytes reserved on the node for the container
+        self.memory_request = 256
+
+    def get_cpu_request(self):
+        return float(self.cpu_limit) / 2
+
+    def get_image(self):
+        return getattr(self, 'pinned_image', None) or self.image
+
+    def get_pull_policy(self):
+        # A digest never changes content, the copy on the node can be used
+        if '@' in self.get_image():
+            return 'IfNotPresent'
+        return 'Always'
+
+    def get_config(self):
+        '''
+        Return the ConfigMaps needed by this container.
+        The names are derived from the content, so identical configurations are
+        reused across sessions rather than created again under a random name.
+        '''
+        config = []
         if len(self.variables) != 0:
-            cm = ConfigMap(
-                name='{}-configmap-{}'.format(self.name, random.randint(0, 1000)),
+            self.configMap = ConfigMap(
+                name='config-{}'.format(content_hash(self.variables)),
                 labels=self.name,
                 container=self
             )
-            cm.execute()
-            self.configMap = cm
+            config.append(self.configMap)
         if hasattr(self, 'data'):
-            data = ConfigMapData(
-                name='{}-configmap-data-{}'.format(self.name, random.randint(0, 1000)),
+            self.configMap_data = ConfigMapData(
+                name='config-data-{}'.format(content_hash([self.filename, self.data])),
                 labels=self.name,
                 container=self
             )
-            data.execute()
-            self.configMap_data = data
+            config.append(self.configMap_data)
+        return config
 
     def get_content(self):
         base = {
             'name': self.name,
-            'image': self.image,
-            'imagePullPolicy': 'Always',
+            'image': self.get_image(),
+            'imagePullPolicy': self.get_pull_policy(),
             'resources': {
                 'limits': {
                     'cpu': self.cpu_limit
                 },
                 'requests': {
-                    'cpu': str(float(self.cpu_limit) / 2)
+                    'cpu': str(self.get_cpu_request()),
+                    'memory': '{}Mi'.format(self.memory_request)
                 }
             }
         }
@@ -160,15 +265,13 @@ class Container(AutoAssigner):
             }]
         if hasattr(self, 'command'):
             base['command'] = self.command
-        if hasattr(self, 'command'):
-            base['command'] = self.command
         return base
 
     def get_init_content(self):
         if hasattr(self, 'initContainer'):
             return {
                 'name': '{}-init'.format(self.name),
-                'image': self.image,
+                'image': self.get_image(),
                 'command': self.initContainer
             }
         return None
@@ -219,11 +322,12 @@ class NodePort(Service):
     def get_content(self):
         service = super().get_base()
         service['spec']['type'] = 'NodePort'
-        service['ports'] = [{
-            'name': 'http',
-            'ports': c.public_port,
+        service['spec']['ports'] = [{
+            'protocol': 'TCP',
+            'name': 'httpport{}'.format(c.public_port),
+            'port': c.public_port,
             'targetPort': c.private_port
-        }for c in self.containers]
+        }for c in self.containers if c.public_port]
         return service
 
 
@@ -238,13 +342,20 @@ class ClusterIP(Service):
     def get_content(self):
         service = super().get_base()
         service['spec']['type'] = 'ClusterIP'
-        service['ports'] = [{
-            'name': 'http',
-            'ports': c.public_port,
+        service['spec']['ports'] = [{
+            'protocol': 'TCP',
+            'name': 'httpport{}'.format(c.public_port),
+            'port': c.public_port,
             'targetPort': c.private_port
-        }for c in self.containers]
+        }for c in self.containers if c.public_port]
         return service
 
+    def get_address(self):
+        '''
+        DNS name of the service, resolvable from inside the cluster only
+        '''
+        return '{}.{}.svc.cluster.local'.format(self.name, settings.KUBERNETES_NAMESPACE)
+
 
 class LoadBalancer(Service):
 
@@ -269,19 +380,13 @@ class Deployment(KubernetesObject):
     apiVersion = 'extensions/v1beta1'
 
     def requirements(self):
+        config = []
         for c in self.containers:
-            c.exec_config()
-
-        to_service = [c for c in self.containers if c.public_port and c.private_port]
-
-        if len(to_service) != 0:
-            NodePort(
-                name='{}-nodePort'.format(self.name),
-                app=self.name,
-                containers=to_service
-            )
+            config.extend(c.get_config())
+        return config
 
     def get_content(self):
+        init_containers = [c.get_init_content() for c in self.containers]
         res = {
             'apiVersion': self.apiVersion,
             'kind': self.kind,
@@ -299,7 +404,7 @@ class Deployment(KubernetesObject):
                     },
                     'spec': {
                         'containers': [c.get_content() for c in self.containers],
-                        'initContainers': [c.get_init_content() for c in self.containers if c.get_init_content() is not None]
+                        'initContainers': [i for i in init_containers if i is not None]
                     }
                 }
             }
@@ -309,6 +414,91 @@ class Deployment(KubernetesObject):
         return res
 
 
+class ImageWarmer(KubernetesObject):
+    '''
+    name, images
+    DaemonSet pulling the given images on every node of the cluster,
+    so that the session pods start without waiting for the registry.
+    The images may lack a shell, so the containers pulling them run a static
+    busybox copied in from a shared volume.
+    '''
+
+    kind = 'DaemonSet'
+    apiVersion = 'apps/v1'
+    pause_image = 'k8s.gcr.io/pause:3.2'
+    # The busybox binary of the official image is statically linked
+    busybox_image = 'busybox:1.32'
+    tools_path = '/warmer'
+
+    def tools_mount(self):
+        return {
+            'name': 'tools',
+            'mountPath': self.tools_path
+        }
+
+    def init_resources(self):
+        return {
+            'requests': {
+                'cpu': '10m',
+                'memory': '16Mi'
+            }
+        }
+
+    def get_content(self):
+        return {
+            'apiVersion': self.apiVersion,
+            'kind': self.kind,
+            'metadata': {
+                'name': self.name,
+            },
+            'spec': {
+                'selector': {
+                    'matchLabels': {
+                        'app': self.name
+                    }
+                },
+                'template': {
+                    'metadata': {
+                        'labels': {
+                            'app': self.name
+                        }
+                    },
+                    'spec': {
+                        'volumes': [{
+                            'name': 'tools',
+                            'emptyDir': {}
+                        }],
+                        'initContainers': [{
+                            'name': 'install-tools',
+                            'image': self.busybox_image,
+                            'command': ['cp', '/bin/busybox', '{}/busybox'.format(self.tools_path)],
+                            'volumeMounts': [self.tools_mount()],
+                            'resources': self.init_resources()
+                        }] + [{
+                            # Every image is pulled by an init container exiting immediately
+                            'name': 'pull-{}'.format(i),
+                            'image': image,
+                            'imagePullPolicy': 'IfNotPresent',
+                            'command': ['{}/busybox'.format(self.tools_path), 'true'],
+                            'volumeMounts': [self.tools_mount()],
+                            'resources': self.init_resources()
+                        } for i, image in enumerate(self.images)],
+                        'containers': [{
+                            'name': 'pause',
+                            'image': self.pause_image,
+                            'resources': {
+                                'requests': {
+                                    'cpu': '1m',
+                                    'memory': '8Mi'
+                                }
+                            }
+                        }]
+                    }
+                }
+            }
+        }
+
+
 class ConfigMap(KubernetesObject):
     '''
     name, labels, container
@@ -317,22 +507,20 @@ class ConfigMap(KubernetesObject):
     kind = 'ConfigMap'
 
     def get_content(self):
-
-        name = self.name
         res = {
             'apiVersion': self.apiVersion,
             'kind': self.kind,
             'metadata': {
-                'name': name,
+                'name': self.name,
                 'labels': {
-                    'app': self.labels
+                    # Shared between sessions, so labelled by content instead of app
+                    'content-hash': self.name.rsplit('-', 1)[-1],
+                    SHARED_CONFIG_LABEL: 'true',
                 }
             },
         }
         if hasattr(self.container, 'variables') and len(self.container.variables) != 0:
             res['data'] = self.container.variables
-        if hasattr(self.container, 'data'):
-            res['data'] = self.container.variables
         return res
 
 
@@ -350,15 +538,14 @@ class ConfigMapData(ConfigMap):
         }
 
     def get_content(self):
-
-        name = self.name
         res = {
             'apiVersion': self.apiVersion,
             'kind': self.kind,
             'metadata': {
-                'name': name,
+                'name': self.name,
                 'labels': {
-                    'app': self.labels
+                    'content-hash': self.name.rsplit('-', 1)[-1],
+                    SHARED_CONFIG_LABEL: 'true',
                 }
             },
         }
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.13 on 2026-10-19 11:20
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageDigest',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.CharField(help_text='The Docker image reference, including the tag', max_length=200, unique=True)),
+                ('digest', models.CharField(help_text='The content digest the tag pointed to when it was last resolved', max_length=100)),
+                ('resolved_at', models.DateTimeField(default=django.utils.timezone.now, help_text='The time at which the digest was resolved')),
+            ],
+            options={
+                'verbose_name': 'Image digest',
+                'verbose_name_plural': 'Image digests',
+            },
+        ),
+    ]
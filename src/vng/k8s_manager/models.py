@@ -1,3 +1,30 @@
 from django.db import models
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
 
-# Create your models here.
+
+class ImageDigest(models.Model):
+
+    image = models.CharField(max_length=200, unique=True, help_text=_(
+        "The Docker image reference, including the tag"
+    ))
+    digest = models.CharField(max_length=100, help_text=_(
+        "The content digest the tag pointed to when it was last resolved"
+    ))
+    resolved_at = models.DateTimeField(default=timezone.now, help_text=_(
+        "The time at which the digest was resolved"
+    ))
+
+    class Meta:
+        verbose_name = _('Image digest')
+        verbose_name_plural = _('Image digests')
+
+    def __str__(self):
+        return '{} - {}'.format(self.image, self.digest)
+
+    def get_pinned_image(self):
+        repository = self.image.split('@')[0]
+        # strip the tag, but not the port of a registry host
+        if ':' in repository.rsplit('/', 1)[-1]:
+            repository = repository.rsplit(':', 1)[0]
+        return '{}@{}'.format(repository, self.digest)
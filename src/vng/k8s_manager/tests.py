@@ -1,3 +1,198 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
 
-# Create your tests here.
+import yaml
+
+import mock
+import requests_mock
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from .container_manager import K8S
+from .images import fetch_digest, parse_image, pin_containers
+from .kubernetes import (
+    SHARED_CONFIG_LABEL, ClusterIP, Container, Deployment, ImageWarmer, Manifest, uses_load_balancer
+)
+from .models import ImageDigest
+
+
+class ManifestTests(SimpleTestCase):
+
+    def _deployment(self, name='test-app'):
+        db = Container(
+            name='postgis',
+            image='mdillon/postgis',
+            public_port=5432,
+            variables={'POSTGRES_USER': 'postgres'},
+            data=['CREATE DATABASE test;'],
+            filename='init.sql',
+        )
+        api = Container(
+            name='api',
+            image='vngr/gemma-zrc',
+            public_port=8000,
+            variables={'POSTGRES_USER': 'postgres'},
+        )
+        return Deployment(name=name, containers=[db, api])
+
+    def test_manifest_bundles_requirements(self):
+        documents = list(yaml.safe_load_all(self._deployment().get_manifest().render()))
+
+        kinds = [d['kind'] for d in documents]
+        # The two identical environment ConfigMaps are deduplicated
+        self.assertEqual(kinds, ['ConfigMap', 'ConfigMap', 'Deployment'])
+
+    def test_configmap_names_are_deterministic(self):
+        first = self._deployment('first').get_manifest().get_documents()
+        second = self._deployment('second').get_manifest().get_documents()
+
+        self.assertEqual(
+            [d['metadata']['name'] for d in first[:2]],
+            [d['metadata']['name'] for d in second[:2]],
+        )
+        self.assertTrue(first[0]['metadata']['name'].startswith('config-'))
+
+    def test_init_container_rendered_once(self):
+        deployment = self._deployment()
+        with mock.patch.object(Container, 'get_init_content', return_value=None) as m:
+            deployment.get_content()
+        self.assertEqual(m.call_count, len(deployment.containers))
+
+    @override_settings(KUBERNETES_DRY_RUN=False)
+    @mock.patch('vng.k8s_manager.kubernetes.run_command')
+    def test_execute_applies_server_side(self, run_command):
+        deployment = self._deployment().execute()
+
+        run_command.assert_called_once()
+        command = run_command.call_args[0][0]
+        self.assertEqual(command[:3], ['kubectl', 'apply', '--server-side'])
+        self.assertEqual(command[-2:], ['-f', '-'])
+        self.assertNotIn('--dry-run=server', command)
+        self.assertEqual(
+            run_command.call_args[1]['input'],
+            deployment.get_manifest().render()
+        )
+
+    @mock.patch('vng.k8s_manager.kubernetes.run_command', return_value=b'')
+    def test_dry_run(self, run_command):
+        Manifest([self._deployment()]).apply(dry_run=True)
+
+        commands = [c[0][0] for c in run_command.call_args_list]
+        self.assertIn(['kubectl', 'diff'], [c[:2] for c in commands])
+        self.assertIn('--dry-run=server', commands[-1])
+
+
+class PruneConfigMapsTests(SimpleTestCase):
+
+    def test_unused_config_maps_are_deleted(self):
+        documents = ManifestTests()._deployment().get_manifest().get_documents()
+        config_maps, deployment = documents[:-1], documents[-1]
+        self.assertTrue(all(d['metadata']['labels'][SHARED_CONFIG_LABEL] == 'true' for d in config_maps))
+        old = (timezone.now() - timedelta(days=1)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        new = timezone.now().strftime('%Y-%m-%dT%H:%M:%SZ')
+
+        def config_map(name, created):
+            return {'metadata': {'name': name, 'creationTimestamp': created}}
+
+        resources = {
+            'deployments': [deployment],
+            'configmaps': [config_map(d['metadata']['name'], old) for d in config_maps] + [
+                config_map('config-unused', old), config_map('config-applying', new)
+            ],
+        }
+        deleted = []
+
+        def run_command(command, **kwargs):
+            if command[1] == 'delete':
+                deleted.append(command[-1])
+                return b''
+            return json.dumps({'items': resources[command[2]]}).encode('utf-8')
+
+        with mock.patch('vng.k8s_manager.container_manager.run_command', side_effect=run_command):
+            self.assertEqual(K8S().prune_config_maps(), ['config-unused'])
+        self.assertEqual(deleted, ['config-unused'])
+
+
+class ServiceTests(SimpleTestCase):
+
+    @override_settings(KUBERNETES_NAMESPACE='sessions')
+    def test_cluster_ip(self):
+        containers = [
+            Container(name='api', image='vngr/gemma-zrc', public_port=8000, private_port=8000),
+            Container(name='rabbit', image='rabbitmq', public_port=None, private_port=None),
+        ]
+        service = ClusterIP(name='s1-service', app='s1', containers=containers)
+
+        content = service.get_content()
+
+        self.assertEqual(content['spec']['type'], 'ClusterIP')
+        self.assertEqual(content['spec']['ports'], [{
+            'protocol': 'TCP',
+            'name': 'httpport8000',
+            'port': 8000,
+            'targetPort': 8000
+        }])
+        self.assertEqual(service.get_address(), 's1-service.sessions.svc.cluster.local')
+
+    def test_routing(self):
+        with mock.patch.dict('os.environ', clear=True):
+            self.assertTrue(uses_load_balancer())
+            with override_settings(KUBERNETES_ROUTING='cluster'):
+                # The cluster DNS names do not resolve outside the cluster
+                with self.assertRaises(ImproperlyConfigured):
+                    uses_load_balancer()
+        with mock.patch.dict('os.environ', {'KUBERNETES_SERVICE_HOST': '10.0.0.1'}):
+            with override_settings(KUBERNETES_ROUTING='cluster'):
+                self.assertFalse(uses_load_balancer())
+            with override_settings(KUBERNETES_ROUTING='ingress'):
+                with self.assertRaises(ImproperlyConfigured):
+                    uses_load_balancer()
+
+
+class ImageTests(TestCase):
+
+    digest = 'sha256:5c40b3c27b9f13c873fefb2139765c56ce97fd50230f1f2d5c91e55dec171907'
+
+    def test_parse_image(self):
+        self.assertEqual(parse_image('rabbitmq'), (None, 'library/rabbitmq', 'latest'))
+        self.assertEqual(parse_image('vngr/gemma-zrc:develop'), (None, 'vngr/gemma-zrc', 'develop'))
+        self.assertEqual(
+            parse_image('localhost:5000/vngr/ac:1.0'),
+            ('localhost:5000', 'vngr/ac', '1.0')
+        )
+
+    def test_fetch_digest(self):
+        with requests_mock.Mocker() as m:
+            m.get('https://auth.docker.io/token', json={'token': 'token'})
+            m.head(
+                'https://registry-1.docker.io/v2/vngr/gemma-zrc/manifests/develop',
+                headers={'Docker-Content-Digest': self.digest}
+            )
+            self.assertEqual(fetch_digest('vngr/gemma-zrc:develop'), self.digest)
+        self.assertEqual(m.request_history[1].headers['Authorization'], 'Bearer token')
+
+    def test_pin_containers(self):
+        ImageDigest.objects.create(image='vngr/gemma-zrc:develop', digest=self.digest)
+        zrc = Container(name='zrc', image='vngr/gemma-zrc:develop', public_port=8000, private_port=8000)
+        rabbit = Container(name='rabbit', image='rabbitmq', public_port=None, private_port=None)
+
+        pinned = pin_containers([zrc, rabbit])
+
+        self.assertEqual(pinned, ['vngr/gemma-zrc@{}'.format(self.digest)])
+        self.assertEqual(zrc.get_content()['image'], 'vngr/gemma-zrc@{}'.format(self.digest))
+        self.assertEqual(zrc.get_content()['imagePullPolicy'], 'IfNotPresent')
+        self.assertEqual(rabbit.get_content()['image'], 'rabbitmq')
+        self.assertEqual(rabbit.get_content()['imagePullPolicy'], 'Always')
+
+    def test_image_warmer(self):
+        images = ['vngr/gemma-zrc@{}'.format(self.digest), 'rabbitmq@{}'.format(self.digest)]
+
+        content = ImageWarmer(name='warmer', images=images).get_content()
+
+        self.assertEqual(content['kind'], 'DaemonSet')
+        install, *pulls = content['spec']['template']['spec']['initContainers']
+        self.assertEqual([c['image'] for c in pulls], images)
+        # The pulled images need no shell, they run the busybox copied in by the first init container
+        self.assertEqual(install['command'], ['cp', '/bin/busybox', '/warmer/busybox'])
+        self.assertEqual(pulls[0]['command'], ['/warmer/busybox', 'true'])
@@ -1,11 +1,15 @@
 import requests
 import re
 
+from vng.utils.specs import fetch_spec
+
 OpenAPIv = 3.0
 
 
 def openAPIInspector(url):
-    resp = requests.get(url)
+    resp = fetch_spec(url)
+    if resp is None:
+        raise requests.ConnectionError(url)
     data = resp.json()
     try:
         version = float(data['openapi'][:3])
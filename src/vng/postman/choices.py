@@ -4,3 +4,4 @@ from djchoices import DjangoChoices, ChoiceItem
 class ResultChoices(DjangoChoices):
     success = ChoiceItem("Success")
     failed = ChoiceItem("Failed")
+    error = ChoiceItem("Error")
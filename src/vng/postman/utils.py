@@ -64,3 +64,47 @@ def get_json_obj(content, file=False):
                         break
 
     return res
+
+
+def dump_json_indexed(content):
+    '''
+    Serialize a Newman JSON log with its executions last, returns the data and
+    the (offset, length) of every execution in it, so one execution can be read
+    back without parsing the whole log.
+    '''
+    run = content.pop('run', None) or {}
+    executions = run.pop('executions', None) or []
+    # Moved to the end, the document then ends with the executions
+    run['executions'] = []
+    content['run'] = run
+    head = json.dumps(content)
+    if not head.endswith('[]}}'):
+        raise ValueError('The executions do not end the serialized Newman log')
+    parts = [head[:-3]]
+    spans = []
+    offset = len(parts[0])
+    for position, execution in enumerate(executions):
+        if position:
+            parts.append(', ')
+            offset += 2
+        data = json.dumps(execution)
+        spans.append((offset, len(data)))
+        parts.append(data)
+        offset += len(data)
+    parts.append(']}}')
+    run['executions'] = executions
+    # json.dumps escapes non-ASCII characters, the offsets are byte offsets
+    return ''.join(parts).encode('ascii'), spans
+
+
+def get_execution_url(execution):
+    url = execution.get('request', {}).get('url', '')
+    if not isinstance(url, dict):
+        return str(url)
+    host = url.get('host', [])
+    host = '.'.join(host) if isinstance(host, list) else str(host)
+    path = url.get('path', [])
+    path = '/'.join(path) if isinstance(path, list) else str(path)
+    if 'protocol' in url:
+        return '{}://{}/{}'.format(url['protocol'], host, path)
+    return '{}/{}'.format(host, path)
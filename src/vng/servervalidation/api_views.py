@@ -1,5 +1,7 @@
 import json
+import uuid
 
+from django.conf import settings
 from django.shortcuts import get_object_or_404
 from django.http import HttpResponse, JsonResponse, Http404
 from django.utils import timezone
@@ -7,7 +9,9 @@ from django.utils import timezone
 from django.db import transaction
 from django.db.models import Prefetch
 
-from rest_framework import permissions, viewsets, mixins, views
+from rest_framework import permissions, viewsets, mixins, status, views
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.decorators import action
 # from rest_framework.exceptions import bad_request
@@ -22,7 +26,10 @@ from vng.postman.choices import ResultChoices
 
 from vng.api_authentication.authentication import CustomTokenAuthentication
 
-from .serializers import ServerRunSerializer, ServerRunPayloadExample, ServerRunResultShield, PostmanTestSerializer
+from .serializers import (
+    ServerRunSerializer, ServerRunPayloadExample, ServerRunResultShield, PostmanTestSerializer,
+    PostmanExecutionSerializer, PostmanExecutionDetailSerializer, ServerRunBulkSerializer, ServerRunStatusSerializer
+)
 from .models import ServerRun, PostmanTestResult, PostmanTest
 from .task import execute_test
 from ..utils import choices
@@ -72,6 +79,16 @@ class ServerRunViewSet(
     Provider-run list.
 
     Return a list of all the existing provider-run.
+
+    bulk:
+    Create many provider-runs.
+
+    Start the given provider-runs at once, they are executed in parallel.
+
+    bulk_status:
+    Status of many provider-runs.
+
+    Return the status, progress and outcome of the provider-runs given by repeating the `uuid` parameter.
     """
     authentication_classes = (CustomTokenAuthentication, SessionAuthentication)
     permission_classes = (permissions.IsAuthenticated,)
@@ -94,6 +111,35 @@ class ServerRunViewSet(
         else:
             server = serializer.save(user=self.request.user, pk=None, started=timezone.now())
 
+    @extend_schema(request=ServerRunBulkSerializer, responses={201: ServerRunStatusSerializer(many=True)})
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk(self, request, *args, **kwargs):
+        serializer = ServerRunBulkSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            instances = serializer.save()
+        return Response(ServerRunStatusSerializer(instances, many=True).data, status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        parameters=[OpenApiParameter('uuid', str, description='The UUID of a provider run, repeat it for more runs')],
+        responses={200: ServerRunStatusSerializer(many=True)}
+    )
+    @action(methods=['GET'], detail=False, url_path='status')
+    def bulk_status(self, request, *args, **kwargs):
+        values = request.query_params.getlist('uuid')
+        if len(values) > settings.SERVER_RUN_BULK_MAX:
+            raise ValidationError({
+                'uuid': 'At most {} provider runs can be given'.format(settings.SERVER_RUN_BULK_MAX)
+            })
+        try:
+            uuids = [uuid.UUID(value) for value in values]
+        except ValueError:
+            raise ValidationError({'uuid': 'Give valid UUIDs'})
+        server_runs = ServerRun.objects.filter(user=request.user, uuid__in=uuids).select_related(
+            'test_scenario', 'environment'
+        ).order_by('pk')
+        return Response(ServerRunStatusSerializer(server_runs, many=True).data)
+
 
 class TriggerServerRunScheduledView(viewsets.ViewSet):
     authentication_classes = (CustomTokenAuthentication, SessionAuthentication)
@@ -214,6 +260,55 @@ class PostmanTestViewset(mixins.ListModelMixin,
         return Response(obj.valid_file)
 
 
+class PostmanExecutionPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class PostmanExecutionViewSet(mixins.ListModelMixin,
+                              mixins.RetrieveModelMixin,
+                              viewsets.GenericViewSet):
+    """
+    list:
+    Execution list of a Postman test result
+
+    Return the requests made by Newman for a Postman test of a provider run, page by page.
+    Filter on `?success=false` for the failed calls.
+
+    retrieve:
+    Execution detail
+
+    Return a request made by Newman, including the request, the response and the assertions as logged by Newman
+    """
+    authentication_classes = (CustomTokenAuthentication, SessionAuthentication)
+    permission_classes = (permissions.AllowAny,)
+    serializer_class = PostmanExecutionSerializer
+    pagination_class = PostmanExecutionPagination
+    lookup_field = 'position'
+
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return PostmanExecutionDetailSerializer
+        return self.serializer_class
+
+    def get_test_result(self):
+        test_result = get_object_or_404(
+            PostmanTestResult.objects.select_related('server_run__test_scenario', 'server_run__user'),
+            server_run__uuid=self.kwargs['uuid'], pk=self.kwargs['test_result_pk']
+        )
+        if not test_result.server_run.logs_visible_to(self.request.user):
+            raise PermissionDenied
+        return test_result
+
+    def get_queryset(self):
+        queryset = self.get_test_result().get_executions().select_related('postman_test_result')
+        success = self.request.query_params.get('success')
+        if success in ('true', 'false'):
+            queryset = queryset.filter(success=success == 'true')
+        return queryset
+
+
 class ServerRunLatestResultView(views.APIView):
     """
     Retrieve the latest badge for a specific environment
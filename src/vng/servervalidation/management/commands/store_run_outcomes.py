@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from ...models import ServerRun
+
+
+class Command(BaseCommand):
+    help = "Store the outcome of the stopped provider runs which do not have one yet"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="Provider runs read per query")
+
+    def handle(self, *args, **options):
+        stored = 0
+        runs = ServerRun.objects.filter(stopped__isnull=False, outcome__isnull=True)
+        while True:
+            batch = list(runs.prefetch_related('postmantestresult_set').order_by('pk')[:max(options["batch_size"], 1)])
+            if not batch:
+                break
+            for server_run in batch:
+                for ptr in server_run.postmantestresult_set.all():
+                    if ptr.assertions_failed is None:
+                        ptr.update_outcome()
+                server_run.outcome = server_run.compute_outcome()
+                server_run.save(update_fields=['outcome'])
+            stored += len(batch)
+        self.stdout.write("Stored the outcome of {} provider runs".format(stored))
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.13 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servervalidation', '0128_auto_20210122_1421'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='serverrun',
+            name='outcome',
+            field=models.CharField(blank=True, choices=[('Success', 'Success'), ('Failed', 'Failed'), ('Error', 'Error')], default=None, help_text='The aggregated result of the Postman tests, stored when the provider run is stopped', max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='postmantestresult',
+            name='assertions_passed',
+            field=models.PositiveIntegerField(blank=True, default=None, help_text='The number of passed assertions', null=True),
+        ),
+        migrations.AddField(
+            model_name='postmantestresult',
+            name='assertions_failed',
+            field=models.PositiveIntegerField(blank=True, default=None, help_text='The number of failed assertions and test script errors', null=True),
+        ),
+        migrations.AlterField(
+            model_name='postmantestresult',
+            name='status',
+            field=models.CharField(choices=[('Success', 'Success'), ('Failed', 'Failed'), ('Error', 'Error')], default=None, help_text='Indicates whether all test passed or not', null=True, max_length=10),
+        ),
+    ]
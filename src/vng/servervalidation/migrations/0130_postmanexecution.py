@@ -0,0 +1,36 @@
+# Generated by Django 2.2.13 on 2026-10-19 19:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servervalidation', '0129_serverrun_outcome'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostmanExecution',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(help_text='The position of the execution in the Newman run, starting at 0')),
+                ('name', models.TextField(blank=True, default='', help_text='The name of the request in the collection')),
+                ('method', models.CharField(blank=True, default='', help_text='The HTTP method of the request', max_length=10)),
+                ('url', models.TextField(blank=True, default='', help_text='The URL of the request')),
+                ('response_code', models.PositiveSmallIntegerField(blank=True, default=None, help_text='The status code of the response, empty when the call was not performed', null=True)),
+                ('response_time', models.PositiveIntegerField(blank=True, default=None, help_text='The response time in milliseconds', null=True)),
+                ('assertions_passed', models.PositiveIntegerField(default=0, help_text='The number of passed assertions')),
+                ('assertions_failed', models.PositiveIntegerField(default=0, help_text='The number of failed assertions and test script errors')),
+                ('success', models.BooleanField(default=False, help_text='Indicates whether the call succeeded')),
+                ('offset', models.BigIntegerField(help_text='The byte offset of the execution in the JSON log')),
+                ('length', models.PositiveIntegerField(help_text='The length in bytes of the execution in the JSON log')),
+                ('postman_test_result', models.ForeignKey(help_text='The Postman test result which this execution belongs to', on_delete=django.db.models.deletion.CASCADE, to='servervalidation.PostmanTestResult')),
+            ],
+            options={
+                'ordering': ('postman_test_result', 'position'),
+                'unique_together': {('postman_test_result', 'position')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.13 on 2026-10-19 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servervalidation', '0130_postmanexecution'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='serverrun',
+            index=models.Index(fields=['test_scenario', 'environment', '-stopped'], name='serverrun_scenario_env_stopped'),
+        ),
+        migrations.AddIndex(
+            model_name='serverrun',
+            index=models.Index(fields=['environment', '-stopped'], name='serverrun_env_stopped'),
+        ),
+        migrations.AddIndex(
+            model_name='serverrun',
+            index=models.Index(fields=['environment', '-started'], name='serverrun_env_started'),
+        ),
+        migrations.AddIndex(
+            model_name='serverrun',
+            index=models.Index(fields=['user', 'test_scenario'], name='serverrun_user_scenario'),
+        ),
+    ]
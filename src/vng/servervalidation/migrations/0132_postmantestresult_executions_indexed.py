@@ -0,0 +1,25 @@
+# Generated by Django 2.2.13 on 2026-10-19 22:10
+
+from django.db import migrations, models
+
+
+def mark_indexed(apps, schema_editor):
+    # Logs with executions were indexed, the logs without are indexed on their next view
+    PostmanTestResult = apps.get_model('servervalidation', 'PostmanTestResult')
+    PostmanTestResult.objects.filter(postmanexecution__isnull=False).distinct().update(executions_indexed=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servervalidation', '0131_serverrun_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postmantestresult',
+            name='executions_indexed',
+            field=models.BooleanField(default=False, help_text='Whether the executions of the JSON log are indexed, also when the log has none'),
+        ),
+        migrations.RunPython(mark_indexed, migrations.RunPython.noop),
+    ]
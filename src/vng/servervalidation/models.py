@@ -1,13 +1,15 @@
 import json
 import array
 import itertools
+import os
+import tempfile
 import uuid
 
 from datetime import datetime
 
 from tinymce.models import HTMLField
 
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.conf import settings
 from django.utils.translation import ugettext_lazy as _
@@ -241,10 +243,23 @@ class ServerRun(models.Model):
         "If enabled, this provider run will be executed every day at midnight"
     ))
     build_version = models.CharField(max_length=100, blank=True, default="")
+    outcome = models.CharField(max_length=10, choices=ResultChoices.choices, default=None, null=True, blank=True, help_text=_(
+        "The aggregated result of the Postman tests, stored when the provider run is stopped"
+    ))
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, help_text=_(
         "The universally unique identifier of this provider run, needed to retrieve the badge"
     ))
 
+    class Meta:
+        indexes = [
+            # The provider runs of an environment, latest first
+            models.Index(fields=['test_scenario', 'environment', '-stopped'], name='serverrun_scenario_env_stopped'),
+            # The latest badge and the last runs of the environments list
+            models.Index(fields=['environment', '-stopped'], name='serverrun_env_stopped'),
+            models.Index(fields=['environment', '-started'], name='serverrun_env_started'),
+            models.Index(fields=['user', 'test_scenario'], name='serverrun_user_scenario'),
+        ]
+
     def __str__(self):
         return "{} - {}".format(self.started, self.status)
 
@@ -257,18 +272,24 @@ class ServerRun(models.Model):
     def is_error(self):
         return self.status == choices.StatusChoices.error_deploy
 
-    def get_execution_result(self):
+    def logs_visible_to(self, user):
+        return user == self.user or self.test_scenario.public_logs or user.is_superuser
+
+    def compute_outcome(self):
         ptr_set = self.postmantestresult_set.all()
         if len(ptr_set) == 0:
-            success = None
-        else:
-            success = True
-            for ptr in ptr_set:
-                if ptr.is_success() == 0:
-                    success = None
-                elif ptr.is_success() == -1 and success is not None:
-                    success = False
-        return success
+            return ResultChoices.error
+        if any(ptr.get_call_results()[1] for ptr in ptr_set):
+            return ResultChoices.failed
+        return ResultChoices.success
+
+    def get_execution_result(self):
+        # Only computed for the runs still executing, the outcome of the runs
+        # stopped before it was stored is stored by the store_run_outcomes command
+        outcome = self.outcome if self.outcome is not None else self.compute_outcome()
+        if outcome == ResultChoices.error:
+            return None
+        return outcome == ResultChoices.success
 
     def get_all_call_results(self):
         success = 0
@@ -297,6 +318,15 @@ class PostmanTestResult(models.Model):
     status = models.CharField(max_length=10, choices=ResultChoices.choices, default=None, null=True, help_text=_(
         "Indicates whether all test passed or not"
     ))
+    assertions_passed = models.PositiveIntegerField(default=None, null=True, blank=True, help_text=_(
+        "The number of passed assertions"
+    ))
+    assertions_failed = models.PositiveIntegerField(default=None, null=True, blank=True, help_text=_(
+        "The number of failed assertions and test script errors"
+    ))
+    executions_indexed = models.BooleanField(default=False, help_text=_(
+        "Whether the executions of the JSON log are indexed, also when the log has none"
+    ))
 
     def __str__(self):
         if self.status is None:
@@ -304,6 +334,14 @@ class PostmanTestResult(models.Model):
         else:
             return '{} - {}'.format(self.pk, self.status)
 
+    def update_outcome(self):
+        """
+        Store the status and the call results, read from the Newman log once
+        """
+        self.assertions_passed, self.assertions_failed = self._count_call_results()
+        self.status = ResultChoices.success if not self.assertions_failed else ResultChoices.failed
+        self.save(update_fields=['status', 'assertions_passed', 'assertions_failed'])
+
     def is_success(self):
         _, negative = self.get_call_results()
         status = ResultChoices.success if not negative else ResultChoices.failed
@@ -314,16 +352,6 @@ class PostmanTestResult(models.Model):
         else:
             return 0
 
-    def display_log(self):
-        if self.log:
-            with open(self.log.path) as fp:
-                return fp.read().replace('\n', '<br>')
-
-    def display_log_json(self):
-        if self.log:
-            with open(self.log_json.path) as fp:
-                return fp.read()
-
     def get_json_obj_info(self):
         if hasattr(self, 'status_saved'):
             return self.status_saved
@@ -353,7 +381,54 @@ class PostmanTestResult(models.Model):
                 execution['response']['body'] = json.loads(array.array('B', buffer).tostring())
             except:
                 pass
-        self.log_json.save(filename, ContentFile(json.dumps(content)))
+        data, spans = postman.dump_json_indexed(content)
+        self.executions_indexed = True
+        self.log_json.save(filename, ContentFile(data))
+        self._index_executions(content['run']['executions'], spans)
+
+    def _index_executions(self, executions, spans):
+        PostmanExecution.objects.bulk_create([
+            PostmanExecution.from_newman(self, position, execution, offset, length)
+            for position, (execution, (offset, length)) in enumerate(zip(executions, spans))
+        ])
+
+    def index_log_json(self):
+        """
+        Index the executions of a JSON log stored before the executions were
+        indexed at execution time, the log is rewritten in the indexed layout
+        """
+        try:
+            with open(self.log_json.path, 'rb') as f:
+                content = json.load(f)
+        except OSError:
+            # Possibly a passing storage problem, tried again on the next view
+            return
+        except ValueError:
+            content = None
+        with transaction.atomic():
+            # Locked against a concurrent first view of the same log
+            locked = PostmanTestResult.objects.select_for_update().filter(pk=self.pk).first()
+            if locked is None or locked.executions_indexed or self.postmanexecution_set.exists():
+                self._mark_indexed()
+                return
+            # A log which is not a Newman log has nothing to index
+            if isinstance(content, dict) and isinstance(content.get('run'), dict):
+                data, spans = postman.dump_json_indexed(content)
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.log_json.path))
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, self.log_json.path)
+                self._index_executions(content['run']['executions'], spans)
+            self._mark_indexed()
+
+    def _mark_indexed(self):
+        PostmanTestResult.objects.filter(pk=self.pk).update(executions_indexed=True)
+        self.executions_indexed = True
+
+    def get_executions(self):
+        if self.log_json and not self.executions_indexed:
+            self.index_log_json()
+        return self.postmanexecution_set.all()
 
     def get_outcome_html(self):
         with open(self.log.path) as f:
@@ -368,6 +443,11 @@ class PostmanTestResult(models.Model):
             return postman.get_outcome_json(jfile, file=True)
 
     def get_call_results(self):
+        if self.assertions_passed is not None and self.assertions_failed is not None:
+            return self.assertions_passed, self.assertions_failed
+        return self._count_call_results()
+
+    def _count_call_results(self):
         positive, negative = 0, 0
         for call in self.get_json_obj():
             if 'testScript' in call:
@@ -441,6 +521,86 @@ class PostmanTestResult(models.Model):
         return [postman.get_call_result(call) for call in self.get_json_obj()]
 
 
+class PostmanExecution(models.Model):
+    """
+    A request of a Newman run, indexed when the JSON log is stored so that
+    large logs can be browsed page by page. The full execution is read from
+    the JSON log at its byte offset.
+    """
+
+    postman_test_result = models.ForeignKey(PostmanTestResult, on_delete=models.CASCADE, help_text=_(
+        "The Postman test result which this execution belongs to"
+    ))
+    position = models.PositiveIntegerField(help_text=_(
+        "The position of the execution in the Newman run, starting at 0"
+    ))
+    name = models.TextField(blank=True, default='', help_text=_("The name of the request in the collection"))
+    method = models.CharField(max_length=10, blank=True, default='', help_text=_("The HTTP method of the request"))
+    url = models.TextField(blank=True, default='', help_text=_("The URL of the request"))
+    response_code = models.PositiveSmallIntegerField(null=True, blank=True, default=None, help_text=_(
+        "The status code of the response, empty when the call was not performed"
+    ))
+    response_time = models.PositiveIntegerField(null=True, blank=True, default=None, help_text=_(
+        "The response time in milliseconds"
+    ))
+    assertions_passed = models.PositiveIntegerField(default=0, help_text=_("The number of passed assertions"))
+    assertions_failed = models.PositiveIntegerField(default=0, help_text=_(
+        "The number of failed assertions and test script errors"
+    ))
+    success = models.BooleanField(default=False, help_text=_("Indicates whether the call succeeded"))
+    offset = models.BigIntegerField(help_text=_("The byte offset of the execution in the JSON log"))
+    length = models.PositiveIntegerField(help_text=_("The length in bytes of the execution in the JSON log"))
+
+    class Meta:
+        ordering = ('postman_test_result', 'position')
+        unique_together = ('postman_test_result', 'position')
+
+    def __str__(self):
+        return '{} {}'.format(self.method, self.url)
+
+    @classmethod
+    def from_newman(cls, postman_test_result, position, execution, offset, length):
+        if not isinstance(execution, dict):
+            execution = {}
+        passed, failed = 0, 0
+        for script in execution.get('testScript') or []:
+            if isinstance(script, dict) and 'error' in script:
+                failed += 1
+        assertions = execution.get('assertions') or []
+        for assertion in assertions if isinstance(assertions, list) else []:
+            if isinstance(assertion, dict) and 'error' in assertion:
+                failed += 1
+            else:
+                passed += 1
+        item = execution.get('item') if isinstance(execution.get('item'), dict) else {}
+        request = execution.get('request') if isinstance(execution.get('request'), dict) else {}
+        response = execution.get('response') if isinstance(execution.get('response'), dict) else {}
+        code = response.get('code')
+        response_time = response.get('responseTime')
+        return cls(
+            postman_test_result=postman_test_result,
+            position=position,
+            name=str(item.get('name', '')),
+            method=str(request.get('method', ''))[:10],
+            url=postman.get_execution_url(execution),
+            response_code=code if isinstance(code, int) and 0 <= code < 1000 else None,
+            response_time=response_time if isinstance(response_time, int) and response_time >= 0 else None,
+            assertions_passed=passed,
+            assertions_failed=failed,
+            success=isinstance(code, int) and not failed and not item.get('error_test'),
+            offset=offset,
+            length=length,
+        )
+
+    def get_details(self):
+        """
+        Return the full execution, read from the JSON log
+        """
+        with open(self.postman_test_result.log_json.path, 'rb') as f:
+            f.seek(self.offset)
+            return json.loads(f.read(self.length))
+
+
 class Endpoint(models.Model):
 
     test_scenario_url = models.ForeignKey(TestScenarioUrl, on_delete=models.CASCADE, help_text=_(
@@ -1,10 +1,15 @@
+from collections import defaultdict
+
+from celery import group
 from rest_framework import serializers
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
-from .models import TestScenarioUrl, Endpoint, ServerRun, TestScenario, PostmanTest, Environment
+from .models import TestScenarioUrl, Endpoint, ServerRun, TestScenario, PostmanTest, Environment, PostmanExecution
 from .task import execute_test
 
-from django.db import transaction
 
 class TestScenarioUrlSerializer(serializers.ModelSerializer):
     class Meta:
@@ -30,16 +35,6 @@ class EndpointSerializer(serializers.ModelSerializer):
     def to_internal_value(self, data):
         return data
 
-    def create(self, validated_data):
-        try:
-            name = validated_data.pop('name')
-            value = validated_data['value']
-            tsu = TestScenarioUrl.objects.get(name=name, test_scenario=validated_data['environment'].test_scenario)
-            ep = Endpoint.objects.create(test_scenario_url=tsu, url=value, environment=validated_data['environment'])
-            return ep
-        except Exception:
-            raise serializers.ValidationError("The urls names provided do not match")
-
 
 class EnvironmentSerializer(serializers.ModelSerializer):
     endpoints = EndpointSerializer(many=True, source='endpoint_set', required=False)
@@ -55,6 +50,22 @@ class EnvironmentSerializer(serializers.ModelSerializer):
         }
 
 
+def build_endpoints(environment, endpoint_set, test_scenario_urls):
+    '''
+    Return the unsaved endpoints of a new environment, the variables missing
+    from `endpoint_set` get the placeholder of the test scenario
+    '''
+    values = {ep['name']: ep['value'] for ep in endpoint_set or [] if 'name' in ep and 'value' in ep}
+    return [
+        Endpoint(
+            test_scenario_url=test_scenario_url,
+            url=values.get(test_scenario_url.name) or test_scenario_url.placeholder,
+            environment=environment
+        )
+        for test_scenario_url in test_scenario_urls
+    ]
+
+
 class ServerRunSerializer(serializers.ModelSerializer):
 
     environment = EnvironmentSerializer()
@@ -82,7 +93,6 @@ class ServerRunSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'started', 'stopped', 'status']
 
     def create(self, validated_data):
-        endpoint_created = []
         env = validated_data.pop('environment')
         created = False
         try:
@@ -101,17 +111,9 @@ class ServerRunSerializer(serializers.ModelSerializer):
 
         validated_data['environment'] = environment
         if created:
-            flattened_endpoints = {ep['name']: ep['value'] for ep in env['endpoint_set'] if 'name' in ep and 'value' in ep}
-            testscenariourls = validated_data['test_scenario'].testscenariourl_set.all()
-
-            for test_scenario_url in validated_data['test_scenario'].testscenariourl_set.all():
-                value = flattened_endpoints.get(test_scenario_url.name) or test_scenario_url.placeholder
-                ep_serializer = EndpointSerializer()
-                endpoint_created.append(ep_serializer.create({
-                    'name': test_scenario_url.name,
-                    'value': value,
-                    'environment': environment
-                }))
+            Endpoint.objects.bulk_create(build_endpoints(
+                environment, env.get('endpoint_set'), validated_data['test_scenario'].testscenariourl_set.all()
+            ))
 
         instance = ServerRun.objects.create(**validated_data)
 
@@ -119,6 +121,83 @@ class ServerRunSerializer(serializers.ModelSerializer):
         return instance
 
 
+class ServerRunStatusSerializer(serializers.ModelSerializer):
+
+    test_scenario = serializers.SlugRelatedField(slug_field='name', read_only=True)
+    environment = serializers.CharField(source='environment.name', read_only=True)
+
+    class Meta:
+        model = ServerRun
+        fields = [
+            'uuid',
+            'test_scenario',
+            'environment',
+            'started',
+            'stopped',
+            'status',
+            'percentage_exec',
+            'status_exec',
+            'outcome',
+        ]
+        read_only_fields = fields
+
+
+class ServerRunBulkSerializer(serializers.Serializer):
+
+    provider_runs = ServerRunSerializer(many=True, help_text=_(
+        "The provider runs to start, with the same fields as a single provider run"
+    ))
+
+    def validate_provider_runs(self, value):
+        if not value:
+            raise serializers.ValidationError(_("Give at least one provider run"))
+        if len(value) > settings.SERVER_RUN_BULK_MAX:
+            raise serializers.ValidationError(
+                _("At most %(max)d provider runs can be started at once") % {'max': settings.SERVER_RUN_BULK_MAX}
+            )
+        return value
+
+    def create(self, validated_data):
+        '''
+        Start the provider runs, the environments which do not exist yet are
+        created with their endpoints and the runs are executed as one group
+        once the transaction is committed
+        '''
+        user = self.context['request'].user
+        runs = validated_data['provider_runs']
+        test_scenarios = {run['test_scenario'].pk: run['test_scenario'] for run in runs}
+
+        environments = {
+            (environment.test_scenario_id, environment.name): environment
+            for environment in Environment.objects.filter(
+                user=user, test_scenario__in=list(test_scenarios), name__in={run['environment']['name'] for run in runs}
+            )
+        }
+        test_scenario_urls = defaultdict(list)
+        for test_scenario_url in TestScenarioUrl.objects.filter(test_scenario__in=list(test_scenarios)):
+            test_scenario_urls[test_scenario_url.test_scenario_id].append(test_scenario_url)
+
+        endpoints = []
+        instances = []
+        started = timezone.now()
+        for run in runs:
+            env = run.pop('environment')
+            key = (run['test_scenario'].pk, env['name'])
+            if key not in environments:
+                environments[key] = Environment.objects.create(
+                    name=env['name'], test_scenario=run['test_scenario'], user=user
+                )
+                endpoints.extend(
+                    build_endpoints(environments[key], env.get('endpoint_set'), test_scenario_urls[key[0]])
+                )
+            instances.append(ServerRun.objects.create(environment=environments[key], user=user, started=started, **run))
+        Endpoint.objects.bulk_create(endpoints)
+
+        pks = [instance.pk for instance in instances]
+        transaction.on_commit(lambda: group(execute_test.si(pk) for pk in pks).delay())
+        return instances
+
+
 class ServerRunPayloadExample(ServerRunSerializer):
 
     class Meta(ServerRunSerializer.Meta):
@@ -169,3 +248,26 @@ class PostmanTestSerializer(serializers.ModelSerializer):
     class Meta:
         model = PostmanTest
         fields = ('name', 'version', 'test_scenario', 'validation_file',)
+
+
+class PostmanExecutionSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = PostmanExecution
+        fields = (
+            'position', 'name', 'method', 'url', 'response_code', 'response_time',
+            'assertions_passed', 'assertions_failed', 'success',
+        )
+
+
+class PostmanExecutionDetailSerializer(PostmanExecutionSerializer):
+
+    details = serializers.SerializerMethodField(help_text=_(
+        "The execution as logged by Newman, with the request, the response and the assertions"
+    ))
+
+    class Meta(PostmanExecutionSerializer.Meta):
+        fields = PostmanExecutionSerializer.Meta.fields + ('details',)
+
+    def get_details(self, obj):
+        return obj.get_details()
@@ -21,6 +21,7 @@ from .models import PostmanTest, PostmanTestResult, Endpoint, ServerRun, ServerH
 from ..utils import choices
 from ..utils.newman import NewmanManager
 from ..utils.auth import get_jwt
+from ..utils.instrumentation import PROVIDER_RUN, timer
 
 
 logger = get_task_logger(__name__)
@@ -90,27 +91,28 @@ def execute_test(server_run_pk, scheduled=False, email=False):
             for ep in endpoints:
                 param[ep.test_scenario_url.name] = ep.url
             nm.replace_parameters(param)
-            file_html, file_json = nm.execute_test()
+            with timer(PROVIDER_RUN, 'newman'):
+                file_html, file_json = nm.execute_test()
             ptr = PostmanTestResult(
                 postman_test=postman_test,
                 server_run=server_run
             )
-            data = substitute_hidden_vars(server_run, file_html)
-            data_json = substitute_hidden_vars(server_run, file_json)
+            with timer(PROVIDER_RUN, 'hidden_vars'):
+                data = substitute_hidden_vars(server_run, file_html)
+                data_json = substitute_hidden_vars(server_run, file_json)
 
-            with open(file_html.name, 'w') as f:
-                f.write(data)
+                with open(file_html.name, 'w') as f:
+                    f.write(data)
 
-            with open(file_json.name, 'w') as f:
-                json.dump(json.loads(data_json), f, indent=4)
+                with open(file_json.name, 'w') as f:
+                    json.dump(json.loads(data_json), f, indent=4)
 
-            ptr.log.save(file_name, File(open(file_html.name)))
-            ptr.save_json(file_name, File(open(file_json.name)))
+            with timer(PROVIDER_RUN, 'ingest'):
+                ptr.log.save(file_name, File(open(file_html.name)))
+                ptr.save_json(file_name, File(open(file_json.name)))
 
-            _, negative = ptr.get_call_results()
-            status = ResultChoices.success if not negative else ResultChoices.failed
-            ptr.save()
-            failure = failure or (status == ResultChoices.failed)
+                ptr.update_outcome()
+            failure = failure or (ptr.status == ResultChoices.failed)
 
         server_run.status_exec = 'Completed'
     except Exception as e:
@@ -122,6 +124,7 @@ def execute_test(server_run_pk, scheduled=False, email=False):
     if server_run.status != choices.StatusChoices.error_deploy:
         server_run.status = choices.StatusWithScheduledChoices.stopped
     server_run.stopped = timezone.now()
+    server_run.outcome = server_run.compute_outcome()
     server_run.save()
     if email:
         send_email_failure([server_run_pk])
@@ -0,0 +1,125 @@
+import io
+import json
+
+from django.test import tag
+from django.urls import reverse
+from django.utils import timezone
+
+from django_webtest import WebTest
+
+from vng.postman.choices import ResultChoices
+from vng.utils.choices import StatusChoices
+
+from .factories import EnvironmentFactory, PostmanTestResultFactory, ServerRunFactory
+from ...utils.benchmark import measure
+from ...utils.factories import UserFactory
+
+SCALES = (1, 10, 50)
+
+# Upper bounds on the queries of a single request, the main guard is that the
+# count does not grow with the size of the dataset
+QUERY_BUDGETS = {
+    'newman_ingest': 4,
+    'server_run_list': 12,
+    'server_run_shield': 3,
+    'server_run_result': 6,
+}
+
+
+def newman_log(size):
+    '''
+    A Newman JSON log with `size` executions, one out of four failed
+    '''
+    executions = []
+    for i in range(size):
+        execution = {
+            'item': {'name': 'Call {}'.format(i)},
+            'request': {'method': 'GET', 'url': 'https://example.com/zaken/{}'.format(i)},
+            'response': {'code': 200, 'responseTime': 10, 'stream': {
+                'type': 'Buffer', 'data': list(json.dumps({'id': i}).encode('utf-8'))
+            }},
+            'assertions': [{'assertion': 'Status code is 200'}],
+        }
+        if i % 4 == 3:
+            execution['assertions'][0]['error'] = {'message': 'expected 500 to be 200'}
+        executions.append(execution)
+    return json.dumps({
+        'run': {'executions': executions, 'timings': {'started': '100', 'stopped': '200'}}
+    }).encode('utf-8')
+
+
+@tag('performance')
+class ServerRunPerformanceTests(WebTest):
+
+    def setUp(self):
+        self.user = UserFactory()
+
+    def assertScaleInvariant(self, name, measurements):
+        counts = [measurement.queries for measurement in measurements]
+        self.assertEqual(len(set(counts)), 1, '{} queries grow with the dataset: {}'.format(name, counts))
+        self.assertLessEqual(max(counts), QUERY_BUDGETS[name])
+
+    def build_server_run(self, size, **kwargs):
+        '''
+        A stopped provider run with `size` Newman results of `size` executions
+        '''
+        server_run = ServerRunFactory(
+            user=self.user, status=StatusChoices.stopped, stopped=timezone.now(), outcome=ResultChoices.failed,
+            **kwargs
+        )
+        log = newman_log(size)
+        for i in range(size):
+            postman_test_result = PostmanTestResultFactory(server_run=server_run, log_json=None)
+            postman_test_result.save_json('log.json', io.BytesIO(log))
+        return server_run
+
+    def test_newman_ingest(self):
+        measurements = []
+        for size in SCALES:
+            postman_test_result = PostmanTestResultFactory(log_json=None)
+            log = newman_log(size)
+            with measure('newman_ingest', size) as measurement:
+                postman_test_result.save_json('log.json', io.BytesIO(log))
+            measurements.append(measurement)
+            self.assertEqual(postman_test_result.postmanexecution_set.count(), size)
+        self.assertScaleInvariant('newman_ingest', measurements)
+
+    def test_server_run_list(self):
+        measurements = []
+        for size in SCALES:
+            environment = EnvironmentFactory()
+            for i in range(size):
+                ServerRunFactory(
+                    user=self.user, test_scenario=environment.test_scenario, environment=environment,
+                    status=StatusChoices.stopped, stopped=timezone.now(), outcome=ResultChoices.success
+                )
+            with measure('server_run_list', size) as measurement:
+                self.app.get(reverse('server_run:server-run_list', kwargs={
+                    'api_id': environment.test_scenario.api.id,
+                    'scenario_uuid': environment.test_scenario.uuid,
+                    'env_uuid': environment.uuid
+                }), user=self.user)
+            measurements.append(measurement)
+        self.assertScaleInvariant('server_run_list', measurements)
+
+    def test_server_run_shield(self):
+        measurements = []
+        for size in SCALES:
+            server_run = self.build_server_run(size)
+            with measure('server_run_shield', size) as measurement:
+                response = self.app.get(reverse('apiv1server:api_server-run-shield', kwargs={'uuid': server_run.uuid}))
+            measurements.append(measurement)
+            self.assertEqual(response.json['message'], 'Failed')
+        self.assertScaleInvariant('server_run_shield', measurements)
+
+    def test_server_run_result(self):
+        measurements = []
+        for size in SCALES:
+            server_run = self.build_server_run(size)
+            with measure('server_run_result', size) as measurement:
+                response = self.app.get(
+                    reverse('apiv1server:provider_result', kwargs={'uuid': server_run.uuid}), user=self.user
+                )
+            measurements.append(measurement)
+            self.assertEqual(len(response.json), size)
+        self.assertScaleInvariant('server_run_result', measurements)
@@ -1,7 +1,14 @@
+import io
+
+import mock
+
+from django.core.management import call_command
 from django.test import TestCase
 from django.core.files.uploadedfile import SimpleUploadedFile
 
-from .factories import PostmanTestResultFactory
+from vng.postman.choices import ResultChoices
+
+from .factories import PostmanTestResultFactory, PostmanTestResultFailureFactory, ServerRunFactory
 
 
 class PostmanTestResultTests(TestCase):
@@ -94,3 +101,117 @@ class PostmanTestResultTests(TestCase):
             'assertions': {'passed': 0, 'failed': 1, 'total': 1},
             'calls': {'success': 0, 'failed': 1, 'total': 1}
         })
+
+    def test_update_outcome(self):
+        ptr = PostmanTestResultFailureFactory.create()
+
+        ptr.update_outcome()
+
+        ptr.refresh_from_db()
+        self.assertEqual(ptr.status, ResultChoices.failed)
+        self.assertEqual((ptr.assertions_passed, ptr.assertions_failed), (0, 1))
+        # The stored counts are used, the log is not read again
+        ptr.log_json.delete(save=False)
+        self.assertEqual(ptr.get_call_results(), (0, 1))
+
+
+class ServerRunOutcomeTests(TestCase):
+
+    def test_store_run_outcomes(self):
+        server_run = ServerRunFactory.create(stopped='2019-01-01T12:00:00Z')
+        PostmanTestResultFactory.create(server_run=server_run)
+        PostmanTestResultFailureFactory.create(server_run=server_run)
+        running_run = ServerRunFactory.create(stopped=None)
+
+        call_command('store_run_outcomes', stdout=io.StringIO())
+
+        server_run.refresh_from_db()
+        self.assertEqual(server_run.outcome, ResultChoices.failed)
+        self.assertEqual(
+            [ptr.assertions_failed is not None for ptr in server_run.postmantestresult_set.all()], [True, True]
+        )
+        with self.assertNumQueries(0):
+            self.assertFalse(server_run.get_execution_result())
+        running_run.refresh_from_db()
+        self.assertIsNone(running_run.outcome)
+
+    def test_outcome_not_stored_when_read(self):
+        server_run = ServerRunFactory.create(stopped='2019-01-01T12:00:00Z')
+        PostmanTestResultFailureFactory.create(server_run=server_run)
+
+        self.assertFalse(server_run.get_execution_result())
+
+        server_run.refresh_from_db()
+        self.assertIsNone(server_run.outcome)
+        self.assertIsNone(server_run.postmantestresult_set.get().assertions_failed)
+
+    def test_stored_outcome(self):
+        server_run = ServerRunFactory.create(stopped='2019-01-01T12:00:00Z', outcome=ResultChoices.success)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(server_run.get_execution_result())
+
+
+class PostmanExecutionIndexTests(TestCase):
+
+    log_json = b'''
+        {
+            "run": {
+                "executions": [
+                    {
+                        "item": {"name": "List zaken"},
+                        "request": {"method": "GET", "url": {"protocol": "https", "host": ["example", "com"], "path": ["zaken"]}},
+                        "response": {"code": 200, "responseTime": 12},
+                        "assertions": [{"assertion": "Status code is 200"}]
+                    },
+                    {
+                        "item": {"name": "Create zaak"},
+                        "request": {"method": "POST", "url": "https://example.com/zaken"},
+                        "response": {"code": 400, "responseTime": 8},
+                        "assertions": [{"assertion": "Status code is 201", "error": {"message": "expected 400 to be 201"}}]
+                    }
+                ],
+                "timings": {"started": "100", "stopped": "200"}
+            }
+        }
+    '''
+
+    def test_index_at_ingest(self):
+        ptr = PostmanTestResultFactory.create(log_json=None)
+        ptr.save_json('test.json', io.BytesIO(self.log_json))
+
+        first, second = ptr.postmanexecution_set.all()
+        self.assertEqual((first.position, first.name, first.method), (0, 'List zaken', 'GET'))
+        self.assertEqual(first.url, 'https://example.com/zaken')
+        self.assertEqual((first.response_code, first.response_time), (200, 12))
+        self.assertTrue(first.success)
+        self.assertEqual((second.assertions_passed, second.assertions_failed), (0, 1))
+        self.assertFalse(second.success)
+        self.assertEqual(second.get_details()['request']['method'], 'POST')
+
+        # The stored log is still a complete Newman log
+        self.assertEqual(len(ptr.get_json_obj()), 2)
+
+    def test_index_on_first_use(self):
+        ptr = PostmanTestResultFactory.create(log_json=SimpleUploadedFile('test.json', self.log_json))
+        self.assertFalse(ptr.postmanexecution_set.exists())
+
+        executions = ptr.get_executions()
+
+        self.assertEqual([execution.name for execution in executions], ['List zaken', 'Create zaak'])
+        self.assertEqual(executions[1].get_details()['item']['name'], 'Create zaak')
+        self.assertEqual(len(ptr.get_json_obj()), 2)
+        self.assertEqual(ptr.get_executions().count(), 2)
+
+    def test_log_without_executions_indexed_once(self):
+        log_json = b'{"run": {"executions": [], "timings": {}}}'
+        ptr = PostmanTestResultFactory.create(log_json=SimpleUploadedFile('test.json', log_json))
+
+        self.assertEqual(ptr.get_executions().count(), 0)
+        ptr.refresh_from_db()
+        self.assertTrue(ptr.executions_indexed)
+
+        with mock.patch.object(ptr, 'index_log_json') as index_log_json:
+            self.assertEqual(ptr.get_executions().count(), 0)
+        index_log_json.assert_not_called()
+
@@ -1,6 +1,8 @@
 import collections
 import json
 
+import mock
+
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.test import TestCase
@@ -12,7 +14,7 @@ from vng.accounts.models import User
 from vng.postman.choices import ResultChoices
 from vng.utils.choices import StatusChoices
 
-from ..models import PostmanTestResult
+from ..models import Environment, PostmanTestResult, ServerRun
 from .factories import (
     ServerRunFactory, TestScenarioFactory, TestScenarioUrlFactory, PostmanTestFactory,
     PostmanTestNoAssertionFactory, EndpointFactory, PostmanTestResultFactory, EnvironmentFactory,
@@ -524,3 +526,160 @@ class ServerRunResultAPITests(WebTest):
 
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json[0]['status'], ResultChoices.failed)
+
+
+class PostmanExecutionTests(WebTest):
+
+    def setUp(self):
+        self.user = UserFactory.create()
+        self.test_result = PostmanTestResultFactory.create(
+            server_run__user=self.user, server_run__test_scenario__public_logs=False
+        )
+        with open(self.test_result.log_json.path, 'w') as f:
+            json.dump({
+                'run': {
+                    'executions': [
+                        {
+                            'item': {'name': 'call {}'.format(i)},
+                            'request': {'method': 'GET', 'url': 'https://some-url.com/{}'.format(i)},
+                            'response': {'code': 200 if i % 2 else 500},
+                            'assertions': [{}] if i % 2 else [{'error': 'bla'}],
+                        } for i in range(60)
+                    ],
+                    'timings': {'started': '100', 'stopped': '200'}
+                }
+            }, f)
+        self.url = reverse('apiv1server:provider:api_postman-execution-list', kwargs={
+            'uuid': self.test_result.server_run.uuid, 'test_result_pk': self.test_result.pk
+        })
+
+    def test_list_paginated(self):
+        response = self.app.get(self.url, user=self.user)
+
+        self.assertEqual(response.json['count'], 60)
+        self.assertEqual(len(response.json['results']), 50)
+        self.assertEqual(response.json['results'][0]['name'], 'call 0')
+
+        response = self.app.get(response.json['next'], user=self.user)
+        self.assertEqual(len(response.json['results']), 10)
+
+    def test_list_failed(self):
+        response = self.app.get(self.url, {'success': 'false', 'page_size': 5}, user=self.user)
+
+        self.assertEqual(response.json['count'], 30)
+        self.assertEqual(len(response.json['results']), 5)
+        self.assertFalse(any(execution['success'] for execution in response.json['results']))
+
+    def test_retrieve_details(self):
+        response = self.app.get('{}/7'.format(self.url), user=self.user)
+
+        self.assertEqual(response.json['name'], 'call 7')
+        self.assertEqual(response.json['details']['request']['url'], 'https://some-url.com/7')
+
+    def test_private_logs(self):
+        self.app.get(self.url, user=UserFactory.create(), status=403)
+
+    def test_download_range(self):
+        url = reverse('server_run:server-run_detail_log_json_download', kwargs={
+            'api_id': self.test_result.server_run.test_scenario.api.id,
+            'uuid': self.test_result.server_run.uuid,
+            'test_result_pk': self.test_result.pk,
+        })
+        with open(self.test_result.log_json.path, 'rb') as f:
+            content = f.read()
+
+        response = self.app.get(url, user=self.user)
+        self.assertEqual(response.body, content)
+        self.assertEqual(response.headers['Accept-Ranges'], 'bytes')
+
+        response = self.app.get(url, headers={'Range': 'bytes=10-19'}, user=self.user, status=206)
+        self.assertEqual(response.body, content[10:20])
+        self.assertEqual(response.headers['Content-Range'], 'bytes 10-19/{}'.format(len(content)))
+
+        response = self.app.get(url, headers={'Range': 'bytes=-5'}, user=self.user, status=206)
+        self.assertEqual(response.body, content[-5:])
+
+        self.app.get(url, headers={'Range': 'bytes={}-'.format(len(content))}, user=self.user, status=416)
+
+
+class ServerRunBulkAPITests(TransactionWebTest):
+
+    def setUp(self):
+        self.user = UserFactory.create()
+        self.test_scenario = TestScenarioFactory()
+        self.tsu1 = TestScenarioUrlFactory(test_scenario=self.test_scenario, name='ZRC')
+        self.tsu2 = TestScenarioUrlFactory(test_scenario=self.test_scenario, name='DRC')
+        self.environment = EnvironmentFactory(test_scenario=self.test_scenario, user=self.user, name='existing')
+        self.url = reverse('apiv1server:provider:api_server-run-bulk')
+
+    def get_user_key(self):
+        call = self.app.post(reverse('apiv1_auth:rest_login'), params=collections.OrderedDict([
+            ('username', self.user.username),
+            ('password', 'password')]))
+        key = get_object(call.body)['key']
+        head = {'Authorization': 'Token {}'.format(key)}
+        return head
+
+    @mock.patch('vng.servervalidation.serializers.group')
+    def test_bulk_create(self, group):
+        runs = [
+            create_server_run(self.test_scenario.name, [self.tsu1], env_name='new'),
+            create_server_run(self.test_scenario.name, [], env_name='existing'),
+        ]
+        response = self.app.post_json(self.url, {'provider_runs': runs}, headers=self.get_user_key(), status=201)
+
+        self.assertEqual([run['environment'] for run in response.json], ['new', 'existing'])
+        server_runs = ServerRun.objects.filter(user=self.user).order_by('pk')
+        self.assertEqual([str(run.uuid) for run in server_runs], [run['uuid'] for run in response.json])
+
+        environment = Environment.objects.get(user=self.user, name='new')
+        self.assertEqual(
+            dict(environment.endpoint_set.values_list('test_scenario_url__name', 'url')),
+            {'ZRC': 'https://google.com', 'DRC': self.tsu2.placeholder}
+        )
+        # The existing environment keeps its endpoints
+        self.assertFalse(self.environment.endpoint_set.exists())
+        self.assertEqual(server_runs[1].environment, self.environment)
+
+        signatures = list(group.call_args[0][0])
+        self.assertEqual([signature.args for signature in signatures], [(run.pk,) for run in server_runs])
+        group.return_value.delay.assert_called_once_with()
+
+    @mock.patch('vng.servervalidation.serializers.group')
+    def test_bulk_create_invalid(self, group):
+        runs = [
+            create_server_run(self.test_scenario.name, [self.tsu1], env_name='new'),
+            create_server_run('unknown scenario', [self.tsu1], env_name='new'),
+        ]
+        self.app.post_json(self.url, {'provider_runs': runs}, headers=self.get_user_key(), status=400)
+        self.app.post_json(self.url, {'provider_runs': []}, headers=self.get_user_key(), status=400)
+        with self.settings(SERVER_RUN_BULK_MAX=1):
+            self.app.post_json(self.url, {'provider_runs': runs[:1] * 2}, headers=self.get_user_key(), status=400)
+
+        self.assertFalse(ServerRun.objects.exists())
+        group.assert_not_called()
+
+    def test_bulk_status(self):
+        server_run1 = ServerRunFactory(
+            user=self.user, test_scenario=self.test_scenario, environment=self.environment,
+            status=StatusChoices.stopped, percentage_exec=100, outcome=ResultChoices.success
+        )
+        server_run2 = ServerRunFactory(
+            user=self.user, test_scenario=self.test_scenario, environment=self.environment,
+            status=StatusChoices.running, percentage_exec=50
+        )
+        other = ServerRunFactory()
+        url = reverse('apiv1server:provider:api_server-run-bulk-status')
+
+        response = self.app.get(url, [
+            ('uuid', server_run1.uuid), ('uuid', server_run2.uuid), ('uuid', other.uuid)
+        ], headers=self.get_user_key())
+
+        self.assertEqual(
+            [(run['uuid'], run['status'], run['percentage_exec'], run['outcome']) for run in response.json],
+            [
+                (str(server_run1.uuid), StatusChoices.stopped, 100, ResultChoices.success),
+                (str(server_run2.uuid), StatusChoices.running, 50, None),
+            ]
+        )
+        self.app.get(url, {'uuid': 'invalid'}, headers=self.get_user_key(), status=400)
@@ -2,6 +2,8 @@ import re
 
 from django.conf import settings
 from django.core import mail
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils.translation import ugettext as _
 from django_webtest import WebTest
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -1037,6 +1039,24 @@ class ProviderOrderingTests(WebTest):
         self.assertIn('env1', rows[2].text)
         self.assertIn('env2', rows[3].text)
 
+    def test_query_count_independent_of_environments(self):
+        url = reverse('server_run:environment_list', kwargs={'api_id': self.api.id})
+        with CaptureQueriesContext(connection) as few:
+            self.app.get(url, user=self.user)
+
+        for i in range(5):
+            ServerRunFactory.create(
+                stopped="2019-01-02T12:00:00Z",
+                test_scenario=self.test_scenario2,
+                environment=EnvironmentFactory.create(test_scenario=self.test_scenario2),
+                user=self.user
+            )
+        with CaptureQueriesContext(connection) as many:
+            response = self.app.get(url, user=self.user)
+
+        self.assertEqual(len(response.html.find('th', {'scope': 'col'}, text='ID').parent.parent.findChildren('tr')), 10)
+        self.assertEqual(len(few), len(many))
+
     def test_ordering_server_run_list(self):
         self.server2 = ServerRunFactory.create(
             stopped="2019-01-01T11:00:00Z",
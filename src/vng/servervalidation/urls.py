@@ -21,6 +21,7 @@ urlpatterns = [
     path('<int:api_id>/<uuid:uuid>/schedule/', views.CreateSchedule.as_view(), name='server-run_create_schedule'),
     path('<int:api_id>/<uuid:uuid>/schedule/activate/', views.ScheduleActivate.as_view(), name='schedule_activate'),
     path('<int:api_id>/<uuid:uuid>/log_json/<int:test_result_pk>/', views.ServerRunLogJsonView.as_view(), name='server-run_detail_log_json'),
+    path('<int:api_id>/<uuid:uuid>/log_json/<int:test_result_pk>/download/', views.ServerRunLogJsonDownloadView.as_view(), name='server-run_detail_log_json_download'),
     path('<int:api_id>/<uuid:uuid>/log/<int:test_result_pk>/', views.ServerRunLogView.as_view(), name='server-run_detail_log'),
     path('<int:api_id>/<uuid:uuid>/pdf/<int:test_result_pk>', views.ServerRunPdfView.as_view(), name='server-run_detail_pdf'),
     path('<int:api_id>/<uuid:uuid>/update/', views.ServerRunOutputUpdate.as_view(), name='server-run_info-update'),
@@ -6,6 +6,7 @@ from datetime import time
 
 from django.conf import settings
 from django.db import transaction
+from django.db.models import F, Max, OuterRef, Prefetch, Subquery
 from django.core.files.storage import default_storage
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.http import HttpResponse, HttpResponseRedirect, Http404, JsonResponse, FileResponse
@@ -25,7 +26,7 @@ import vng.postman.utils as postman
 
 from ..utils import choices
 from ..utils.newman import OpenAPIConverter
-from ..utils.views import OwnerSingleObject, PDFGenerator
+from ..utils.views import OwnerSingleObject, PDFGenerator, ranged_file_response
 from .forms import (
     CreateServerRunForm, CreateEndpointForm,
     SelectEnvironmentForm, CreateTestScenarioForm,
@@ -49,39 +50,32 @@ class EnvironmentList(LoginRequiredMixin, ListView):
     def get_context_data(self, *args, **kwargs):
         data = super().get_context_data(*args, **kwargs)
         data['api'] = API.objects.get(id=self.kwargs['api_id'])
+
+        # Only the test scenarios and environments of the current page are loaded
+        rows = list(data['object_list'])
+        test_scenarios = TestScenario.objects.select_related('api').in_bulk({row['test_scenario'] for row in rows})
+        environments = Environment.objects.in_bulk({row['environment'] for row in rows})
+        data['object_list'] = data[self.context_object_name] = [
+            (test_scenarios[row['test_scenario']], environments[row['environment']], row['last_run'])
+            for row in rows
+        ]
         return data
 
     def get_queryset(self):
-        res_no_last_run = []
-        res = []
-        runs_for_user = ServerRun.objects.filter(
-            test_scenario__api=self.kwargs['api_id'],
-            user=self.request.user,
-        )
-        distinct_combinations = runs_for_user.select_related(
-            'test_scenario', 'environment'
-        ).order_by('test_scenario__id', 'environment__id').values_list(
-            'test_scenario',
-            'environment'
-        ).distinct('test_scenario', 'environment')
-        for test_scenario_id, environment_id in distinct_combinations:
-            test_scenario = TestScenario.objects.get(id=test_scenario_id)
-            environment = Environment.objects.get(id=environment_id)
-
-            last_run = environment.last_run
-            if last_run:
-                res.append((test_scenario, environment, last_run))
-            else:
-                last_started_at = environment.last_started_at
-                res_no_last_run.append((test_scenario, environment, last_started_at))
-
+        runs_of_environment = ServerRun.objects.filter(environment=OuterRef('environment')).order_by().values('environment')
         # For all the environment that haven't had a stopped run yet, order
         # them by the last started run and display them before the environments
         # with stopped runs
-        res_no_last_run.sort(key=lambda x: x[2], reverse=True)
-        res_no_last_run = [(scenario, env, None) for scenario, env, _ in res_no_last_run]
-        res.sort(key=lambda x: x[2], reverse=True)
-        return res_no_last_run + res
+        return ServerRun.objects.filter(
+            test_scenario__api=self.kwargs['api_id'],
+            user=self.request.user,
+        ).values('test_scenario', 'environment').annotate(
+            last_run=Subquery(runs_of_environment.annotate(last=Max('stopped')).values('last')),
+            last_started_at=Subquery(runs_of_environment.annotate(last=Max('started')).values('last')),
+        ).distinct().order_by(
+            F('last_run').desc(nulls_first=True), F('last_started_at').desc(nulls_last=True),
+            'test_scenario', 'environment'
+        )
 
 
 class ServerRunList(ListView):
@@ -92,10 +86,12 @@ class ServerRunList(ListView):
     model = ServerRun
 
     def get_queryset(self):
+        # The results are only read for the runs without a stored outcome
+        results = Prefetch('postmantestresult_set', PostmanTestResult.objects.filter(server_run__outcome__isnull=True))
         return self.model.objects.filter(
             test_scenario__uuid=self.kwargs['scenario_uuid'],
             environment__uuid=self.kwargs['env_uuid'],
-        ).order_by('-stopped', '-started')
+        ).select_related('test_scenario__api').prefetch_related(results).order_by('-stopped', '-started')
 
     def get_context_data(self, *args, **kwargs):
         data = super().get_context_data(*args, **kwargs)
@@ -459,13 +455,18 @@ class ServerRunLogView(DetailView):
 
     def get(self, request, *args, **kwargs):
         self.object = self.get_object()
-        if self.request.user == self.object.user or self.object.test_scenario.public_logs or self.request.user.is_superuser:
-            return HttpResponse(content=self.object.postmantestresult_set.get(pk=kwargs['test_result_pk']).log)
-        else:
+        if not self.object.logs_visible_to(self.request.user):
             raise PermissionDenied
+        test_result = get_object_or_404(self.object.postmantestresult_set, pk=kwargs['test_result_pk'])
+        if not test_result.log:
+            raise Http404
+        return ranged_file_response(request, test_result.log.path, 'text/html')
 
 
 class ServerRunLogJsonView(DetailView):
+    """
+    Browse the executions of the JSON log, loaded page by page from the API
+    """
 
     model = ServerRun
     template_name = 'servervalidation/server-run_log_json.html'
@@ -475,12 +476,33 @@ class ServerRunLogJsonView(DetailView):
     def get_context_data(self, *args, **kwargs):
         context = super().get_context_data(*args, **kwargs)
         test_result_pk = self.kwargs.get('test_result_pk')
-        test_result = self.object.postmantestresult_set.get(pk=test_result_pk)
+        test_result = get_object_or_404(self.object.postmantestresult_set, pk=test_result_pk)
+        if not self.object.logs_visible_to(self.request.user):
+            raise PermissionDenied
         context['postman_test_result'] = test_result
-        if self.request.user == test_result.server_run.user or test_result.server_run.test_scenario.public_logs or self.request.user.is_superuser:
-            return context
-        else:
+        context['executions_url'] = reverse('apiv1server:provider:api_postman-execution-list', kwargs={
+            'uuid': self.object.uuid, 'test_result_pk': test_result.pk
+        })
+        return context
+
+
+class ServerRunLogJsonDownloadView(DetailView):
+
+    model = ServerRun
+    slug_field = 'uuid'
+    slug_url_kwarg = 'uuid'
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        if not self.object.logs_visible_to(self.request.user):
             raise PermissionDenied
+        test_result = get_object_or_404(self.object.postmantestresult_set, pk=kwargs['test_result_pk'])
+        if not test_result.log_json:
+            raise Http404
+        return ranged_file_response(
+            request, test_result.log_json.path, 'application/json',
+            filename='{}.json'.format(os.path.splitext(os.path.basename(test_result.log_json.name))[0])
+        )
 
 
 class ServerRunPdfView(PDFGenerator, ServerRunOutputUuid):
@@ -499,10 +521,15 @@ class ServerRunPdfView(PDFGenerator, ServerRunOutputUuid):
             else:
                 calls['response'] = 'Error occurred call the resource'
 
-        self.filename = 'Server run {} report.pdf'.format(server_run.pk)
         context['error_codes'] = postman.get_error_codes()
         return context
 
+    def get_pdf_fingerprint(self):
+        return [self.kwargs['test_result_pk'], self.object.status, self.object.stopped]
+
+    def get_pdf_filename(self):
+        return 'Server run {} report.pdf'.format(self.object.pk)
+
 
 class PostmanDownloadView(View):
 
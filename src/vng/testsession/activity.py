@@ -0,0 +1,42 @@
+'''
+Tracking of the calls made through the proxy of the sessions.
+The proxy only records the activity in memory, the last activity of every session
+is written to the database at most once every `SESSION_ACTIVITY_FLUSH_SECONDS`.
+'''
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Session
+
+
+class ActivityTracker():
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._flushed_at = time.monotonic()
+
+    def record(self, session):
+        now = timezone.now()
+        with self._lock:
+            self._pending[session.pk] = now
+            due = time.monotonic() - self._flushed_at >= settings.SESSION_ACTIVITY_FLUSH_SECONDS
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed_at = time.monotonic()
+        for pk, last_activity in pending.items():
+            # Several processes flush independently, never move the activity back in time
+            Session.objects.filter(pk=pk) \
+                .filter(Q(last_activity__isnull=True) | Q(last_activity__lt=last_activity)) \
+                .update(last_activity=last_activity)
+
+
+tracker = ActivityTracker()
@@ -1,10 +1,12 @@
 from ordered_model.admin import OrderedModelAdmin, OrderedTabularInline, OrderedInlineModelAdminMixin
 from django.contrib import admin
+from django.utils.translation import ugettext_lazy as _
 
 
 import vng.testsession.models as model
 
 from .forms import SessionTypeFormAdmin
+from .task import import_scenario_cases
 
 
 class VNGEndpointInline(OrderedTabularInline):
@@ -103,8 +105,17 @@ class SessionLogAdmin(admin.ModelAdmin):
 class ScenarioCaseCollectionAdmin(OrderedInlineModelAdminMixin, admin.ModelAdmin):
     list_display = [
         'name',
+        'import_status',
+        'import_progress',
     ]
+    readonly_fields = ['import_status', 'import_progress', 'import_message']
     inlines = [ScenarioCaseInline]
+    actions = ['reimport_scenario_cases']
+
+    def reimport_scenario_cases(self, request, queryset):
+        for collection in queryset.exclude(oas_link__isnull=True).exclude(oas_link=''):
+            import_scenario_cases.delay(collection.pk)
+    reimport_scenario_cases.short_description = _('Re-import the scenario cases from the OAS')
 
 
 @admin.register(model.ScenarioCase)
@@ -0,0 +1,262 @@
+'''
+Admission control of the sessions deployed on the shared Kubernetes cluster.
+A session is deployed only when the resources it requests fit in the remaining
+capacity of the cluster, otherwise it waits in a queue that is served in a
+round robin fashion between the users.
+'''
+import logging
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+
+from vng.k8s_manager.kubernetes import Container, uses_load_balancer
+
+from .gemma_containers import AC, BRC, DRC, NRC, NRC_CELERY, ZRC, ZTC, postgis, rabbitMQ
+from .models import Session, VNGEndpoint
+from ..utils import choices
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key of the PostgreSQL advisory lock serializing the admission decisions
+ADMISSION_LOCK = 72657
+
+ACTIVE_STATUSES = (
+    choices.SessionStatusChoices.starting,
+    choices.SessionStatusChoices.running,
+)
+
+
+class Demand(namedtuple('Demand', ['cpu', 'memory', 'load_balancers'])):
+    '''
+    Resources requested on the cluster, cpu in cores and memory in Mebibytes
+    '''
+
+    def __add__(self, other):
+        return Demand(*[a + b for a, b in zip(self, other)])
+
+    def __sub__(self, other):
+        return Demand(*[a - b for a, b in zip(self, other)])
+
+    def fits(self, available):
+        return all(a <= b for a, b in zip(self, available))
+
+    @classmethod
+    def empty(cls):
+        return cls(0.0, 0, 0)
+
+    @classmethod
+    def capacity(cls):
+        capacity = settings.KUBERNETES_CAPACITY
+        return cls(capacity['cpu'], capacity['memory'], capacity['load_balancers'])
+
+
+def containers_demand(containers, load_balancers=0):
+    return Demand(
+        sum(c.get_cpu_request() for c in containers),
+        sum(c.memory_request for c in containers),
+        load_balancers
+    )
+
+
+def session_type_demand(session_type):
+    '''
+    Resources deployed by `bootstrap_session` for a session of the given type
+    '''
+    load_balancers = 1 if uses_load_balancer() else 0
+    if session_type.ZGW_images:
+        containers = [postgis, ZRC, NRC, ZTC, BRC, DRC, AC, NRC_CELERY, rabbitMQ]
+        return containers_demand(containers, load_balancers=load_balancers)
+
+    images = VNGEndpoint.objects.filter(session_type=session_type, docker_image__isnull=False) \
+        .exclude(docker_image='').values_list('docker_image', flat=True)
+    containers = [Container(name='', image=image) for image in images]
+    if not containers:
+        # Only external endpoints are proxied, nothing is deployed
+        return Demand.empty()
+    if session_type.database:
+        containers.append(postgis)
+    return containers_demand(containers, load_balancers=load_balancers)
+
+
+class DemandCache():
+
+    def __init__(self):
+        self._demands = {}
+
+    def __call__(self, session):
+        if session.session_type_id not in self._demands:
+            self._demands[session.session_type_id] = session_type_demand(session.session_type)
+        return self._demands[session.session_type_id]
+
+
+def used_capacity(demand_of, exclude=None):
+    '''
+    Resources requested by the active sessions, suspended sessions only keep their LoadBalancer
+    '''
+    used = Demand.empty()
+    sessions = Session.objects.filter(status__in=ACTIVE_STATUSES).select_related('session_type')
+    if exclude is not None:
+        sessions = sessions.exclude(pk=exclude.pk)
+    for session in sessions:
+        demand = demand_of(session)
+        if session.suspended:
+            demand = Demand(0.0, 0, demand.load_balancers)
+        used += demand
+    return used
+
+
+def idle_sessions(exclude=None):
+    '''
+    Running sessions that received no call for `SESSION_IDLE_MINUTES`, least recently used first
+    '''
+    threshold = timezone.now() - timedelta(minutes=settings.SESSION_IDLE_MINUTES)
+    sessions = Session.objects.filter(status=choices.SessionStatusChoices.running) \
+        .select_related('session_type') \
+        .annotate(last_activity_at=Coalesce('last_activity', Max('sessionlog__date'), 'started')) \
+        .filter(last_activity_at__lte=threshold) \
+        .order_by('last_activity_at')
+    if exclude is not None:
+        sessions = sessions.exclude(pk=exclude.pk)
+    return sessions
+
+
+def fair_order(sessions):
+    '''
+    Round robin between users: the n-th queued session of every user is served
+    before the (n+1)-th session of any user, ties are broken by the request time
+    '''
+    per_user = defaultdict(int)
+    ranked = []
+    for session in sorted(sessions, key=lambda s: (s.started, s.pk)):
+        ranked.append((per_user[session.user_id], session.started, session.pk, session))
+        per_user[session.user_id] += 1
+    return [r[-1] for r in sorted(ranked, key=lambda r: r[:3])]
+
+
+def _lock():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_xact_lock(%s)', [ADMISSION_LOCK])
+
+
+def _evict(demand, available, demand_of, exclude=None):
+    '''
+    Mark idle sessions for shutdown until the demand fits, returns the evicted sessions
+    '''
+    evicted = []
+    for session in idle_sessions(exclude=exclude):
+        if demand.fits(available):
+            break
+        freed = demand_of(session)
+        if freed == Demand.empty():
+            continue
+        session.status = choices.SessionStatusChoices.shutting_down
+        session.deploy_status = _('Stopped to make room for other sessions, no calls since {}').format(
+            session.last_activity_at
+        )
+        session.save()
+        available += freed
+        evicted.append(session)
+    return evicted, available
+
+
+def evict_for(session):
+    '''
+    Stop idle sessions to make room for the session whose pod cannot be
+    scheduled although it was admitted, e.g. when the capacity setting is
+    larger than the cluster. The cluster is taken as full, so only as many
+    sessions are stopped as the demand of the session needs.
+    Returns the evicted sessions.
+    '''
+    demand_of = DemandCache()
+    with transaction.atomic():
+        _lock()
+        evicted, __ = _evict(demand_of(session), Demand.empty(), demand_of, exclude=session)
+        transaction.on_commit(lambda: _dispatch_stop(evicted))
+    return evicted
+
+
+def _dispatch_stop(evicted):
+    from .task import stop_session
+
+    for session in evicted:
+        logger.info('Evicting idle session %s', session.name)
+        stop_session.delay(session.uuid)
+
+
+def _queue(session, position):
+    session.status = choices.SessionStatusChoices.queued
+    session.deploy_status = _('Waiting for resources, position {} in the queue').format(position)
+    session.deploy_percentage = 0
+    session.save()
+
+
+def admit(session):
+    '''
+    Decide whether the session can be deployed right away.
+    If not, the session is queued and deployed later by `process_queue`.
+    '''
+    demand_of = DemandCache()
+    demand = demand_of(session)
+    if demand == Demand.empty():
+        return True
+    with transaction.atomic():
+        _lock()
+        queued = Session.objects.filter(status=choices.SessionStatusChoices.queued) \
+            .exclude(pk=session.pk).select_related('session_type')
+        ahead = fair_order([*queued, session]).index(session)
+        admitted = False
+        evicted = []
+        if ahead == 0:
+            available = Demand.capacity() - used_capacity(demand_of, exclude=session)
+            if not demand.fits(available):
+                evicted, available = _evict(demand, available, demand_of, exclude=session)
+            admitted = demand.fits(available)
+        if admitted:
+            session.status = choices.SessionStatusChoices.starting
+            session.save()
+        else:
+            _queue(session, ahead + 1)
+        transaction.on_commit(lambda: _dispatch_stop(evicted))
+    return admitted
+
+
+def process_queue():
+    '''
+    Admit the queued sessions fitting in the cluster, in fair order.
+    The queue is served strictly in order so that large sessions are not starved.
+    Returns the admitted sessions, their deployment is left to the caller.
+    '''
+    demand_of = DemandCache()
+    admitted = []
+    with transaction.atomic():
+        _lock()
+        queued = fair_order(
+            Session.objects.filter(status=choices.SessionStatusChoices.queued).select_related('session_type')
+        )
+        if not queued:
+            return admitted
+        available = Demand.capacity() - used_capacity(demand_of)
+        evicted = []
+        position = 0
+        for session in queued:
+            demand = demand_of(session)
+            if position == 0 and not demand.fits(available):
+                more_evicted, available = _evict(demand, available, demand_of)
+                evicted.extend(more_evicted)
+            if position == 0 and demand.fits(available):
+                available -= demand
+                session.status = choices.SessionStatusChoices.starting
+                session.deploy_status = _('Resources available, starting the deployment')
+                session.save()
+                admitted.append(session)
+                continue
+            position += 1
+            _queue(session, position)
+        transaction.on_commit(lambda: _dispatch_stop(evicted))
+    return admitted
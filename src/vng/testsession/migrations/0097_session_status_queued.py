@@ -0,0 +1,18 @@
+# Generated by Django 2.2.13 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testsession', '0096_auto_20200923_1054'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='session',
+            name='status',
+            field=models.CharField(choices=[('starting', 'starting'), ('running', 'running'), ('shutting_down', 'shutting down'), ('stopped', 'stopped'), ('error_deploy', 'Error deployment'), ('queued', 'queued')], default='starting', help_text='Indicates the status of this session', max_length=20),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.13 on 2026-10-19 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testsession', '0097_session_status_queued'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='last_activity',
+            field=models.DateTimeField(blank=True, default=None, help_text='The time of the last call made through the session, updated periodically', null=True),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='suspended',
+            field=models.BooleanField(default=False, help_text='Indicates that the deployment of the session has been scaled down for inactivity'),
+        ),
+    ]
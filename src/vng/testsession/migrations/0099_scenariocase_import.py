@@ -0,0 +1,38 @@
+# Generated by Django 2.2.13 on 2026-10-19 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testsession', '0098_session_activity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scenariocase',
+            name='from_oas',
+            field=models.BooleanField(default=False, help_text='Whether this scenario case was generated from the OAS of the collection'),
+        ),
+        migrations.AddField(
+            model_name='scenariocasecollection',
+            name='import_message',
+            field=models.TextField(blank=True, default='', help_text='The outcome of the last import of the scenario cases from the OAS'),
+        ),
+        migrations.AddField(
+            model_name='scenariocasecollection',
+            name='import_progress',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Percentage of the import of the scenario cases from the OAS that is done'),
+        ),
+        migrations.AddField(
+            model_name='scenariocasecollection',
+            name='import_status',
+            field=models.CharField(blank=True, choices=[('queued', 'queued'), ('running', 'running'), ('finished', 'finished'), ('error', 'error')], default='', help_text='The status of the import of the scenario cases from the OAS', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='scenariocasecollection',
+            name='oas_link',
+            field=models.URLField(blank=True, help_text='Optional field that takes a URL to an OAS3 schema, automatically generating the scenario cases from this schema when the URL is set or changed. The admin action re-imports a changed schema, scenario cases that are set manually are kept', null=True),
+        ),
+    ]
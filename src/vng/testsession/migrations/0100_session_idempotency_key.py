@@ -0,0 +1,22 @@
+# Generated by Django 2.2.13 on 2026-10-19 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testsession', '0099_scenariocase_import'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='idempotency_key',
+            field=models.CharField(blank=True, default='', help_text='The Idempotency-Key header of the API call creating the session, retries with the same key return this session', max_length=100),
+        ),
+        migrations.AddConstraint(
+            model_name='session',
+            constraint=models.UniqueConstraint(condition=models.Q(_negated=True, idempotency_key=''), fields=('user', 'idempotency_key'), name='session_user_idempotency_key'),
+        ),
+    ]
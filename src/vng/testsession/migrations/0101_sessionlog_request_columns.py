@@ -0,0 +1,52 @@
+# Generated by Django 2.2.13 on 2026-10-19 19:40
+
+import json
+from urllib.parse import urlparse
+
+from django.db import migrations, models
+
+
+def fill_request_columns(apps, schema_editor):
+    SessionLog = apps.get_model('testsession', 'SessionLog')
+    batch = []
+    for log in SessionLog.objects.filter(method='').exclude(request=None).only('pk', 'request').iterator():
+        try:
+            method, url = json.loads(log.request)['request']['path'].split(' ', 1)
+        except (ValueError, TypeError, KeyError):
+            continue
+        log.method, log.url, log.path = method[:10], url, urlparse(url).path
+        batch.append(log)
+        if len(batch) == 1000:
+            SessionLog.objects.bulk_update(batch, ['method', 'url', 'path'])
+            batch = []
+    SessionLog.objects.bulk_update(batch, ['method', 'url', 'path'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testsession', '0100_session_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessionlog',
+            name='method',
+            field=models.CharField(blank=True, default='', help_text='The HTTP method of the request', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='sessionlog',
+            name='url',
+            field=models.TextField(blank=True, default='', help_text='The absolute URL of the request'),
+        ),
+        migrations.AddField(
+            model_name='sessionlog',
+            name='path',
+            field=models.TextField(blank=True, default='', help_text='The path of the URL of the request, without the query string'),
+        ),
+        migrations.AddIndex(
+            model_name='sessionlog',
+            index=models.Index(fields=['session', 'date', 'id'], name='sessionlog_session_date_id'),
+        ),
+        migrations.RunPython(fill_request_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.13 on 2026-10-19 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testsession', '0101_sessionlog_request_columns'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['user', 'session_type', '-started'], name='session_user_type_started'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(condition=models.Q(status__in=['starting', 'running']), fields=['user'], name='session_active_user'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(condition=models.Q(status='running'), fields=['last_activity'], name='session_running_activity'),
+        ),
+        migrations.AddIndex(
+            model_name='exposedurl',
+            index=models.Index(fields=['session', 'subdomain'], name='exposedurl_session_subdomain'),
+        ),
+    ]
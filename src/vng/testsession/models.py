@@ -2,10 +2,7 @@ import json
 import uuid
 import re
 import time
-import operator
-import requests
 import yaml
-from functools import reduce
 
 from tinymce.models import HTMLField
 
@@ -13,8 +10,7 @@ from django.forms import ValidationError
 from django.conf import settings
 from django.core.validators import RegexValidator
 from django.core.files import File
-from django.db import models
-from django.db import transaction
+from django.db import models, transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils import timezone
@@ -26,6 +22,8 @@ from ordered_model.models import OrderedModel
 from filer.fields.file import FilerFileField
 
 import vng.postman.utils as postman
+from vng.utils.oas import RefResolver, load_json, load_yaml
+from vng.utils.specs import fetch_spec
 
 from vng.accounts.models import User
 from vng.postman.choices import ResultChoices
@@ -170,93 +168,79 @@ class ScenarioCaseCollection(models.Model):
     name = models.CharField(max_length=100, help_text=_("The name of the collection"))
     oas_link = models.URLField(blank=True, null=True, help_text=_(
         "Optional field that takes a URL to an OAS3 schema, automatically generating "
-        "the scenario cases from this schema. Only works if no scenario cases are set manually"
+        "the scenario cases from this schema when the URL is set or changed. The admin "
+        "action re-imports a changed schema, scenario cases that are set manually are kept"
+    ))
+    import_status = models.CharField(
+        max_length=20, choices=choices.ImportStatusChoices.choices, blank=True, default='',
+        help_text=_("The status of the import of the scenario cases from the OAS")
+    )
+    import_progress = models.PositiveSmallIntegerField(default=0, help_text=_(
+        "Percentage of the import of the scenario cases from the OAS that is done"
+    ))
+    import_message = models.TextField(blank=True, default='', help_text=_(
+        "The outcome of the last import of the scenario cases from the OAS"
     ))
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # To import the scenario cases only when the link changes
+        instance._saved_oas_link = instance.__dict__.get('oas_link')
+        return instance
+
     def clean(self, *args, **kwargs):
         if not self.oas_link:
             return
 
-        try:
-            response = requests.get(self.oas_link, timeout=60)
-        except requests.exceptions.ConnectionError as e:
+        response = fetch_spec(self.oas_link)
+        if response is None:
             raise ValidationError({'oas_link': _("The URL did not resolve")})
 
-        content = response.content
-
         # Translate yaml to Python dict if needed
         if self.oas_link.endswith('.yaml'):
             try:
-                schema = yaml.load(content, Loader=yaml.FullLoader)
+                load_yaml(response.content)
             except yaml.scanner.ScannerError:
                 raise ValidationError({'oas_link': _("The URL does not point to a valid YAML file")})
         else:
             try:
-                if isinstance(content, bytes):
-                    content = content.decode('utf-8')
-                schema = json.loads(content)
+                load_json(response.content)
             except json.decoder.JSONDecodeError:
                 raise ValidationError({'oas_link': _("The URL does not point to a valid JSON file")})
 
 
-def get_parameter_from_ref(schema, ref_link):
+def get_parameter_from_ref(schema, ref_link, base_url=None):
     """
     Retrieve parameter information from a reference
     """
+    return RefResolver(schema, base_url).resolve({'$ref': ref_link})
 
-    # Only support local references
-    if ref_link.startswith('#'):
-        key_list = ref_link.split('/')[1:]
-        return reduce(operator.getitem, key_list, schema)
-    else:
-        raise NotImplementedError()
 
-@transaction.atomic()
 @receiver(post_save, sender=ScenarioCaseCollection, dispatch_uid='create_cases_from_oas')
-def create_cases_from_oas(sender, instance, **kwargs):
-    # Only proceed if a link to OAS is provided and if the collection does not
-    # have any ScenarioCases yet
-    if not instance.oas_link or instance.scenariocase_set.exists():
+def create_cases_from_oas(sender, instance, created, **kwargs):
+    # Only proceed if a link to OAS is provided or changed, the scenario cases
+    # are imported outside of the request. Other changes, like the name, keep
+    # the scenario cases as they are.
+    changed = created or instance.oas_link != getattr(instance, '_saved_oas_link', None)
+    instance._saved_oas_link = instance.oas_link
+    if not instance.oas_link or not changed:
         return
 
-    content = requests.get(instance.oas_link, timeout=60).content
-
-    # Translate yaml to Python dict if needed
-    if instance.oas_link.endswith('.yaml'):
-        schema = yaml.load(content, Loader=yaml.FullLoader)
-    else:
-        if isinstance(content, bytes):
-            content = content.decode('utf-8')
-        schema = json.loads(content)
-
-    for path, methods in schema['paths'].items():
-        for method, details in methods.items():
-            if method == 'parameters':
-                continue
-
-            # Cannot bulk create, because we need the ScenarioCase id to create
-            # the QueryParamsScenario
-            sc = ScenarioCase.objects.create(
-                collection=instance,
-                url=path,
-                http_method=method.upper(),
-                description=details.get('summary', ''),
-            )
+    from .task import import_scenario_cases
+
+    def queue_import():
+        ScenarioCaseCollection.objects.filter(pk=instance.pk).update(
+            import_status=choices.ImportStatusChoices.queued, import_progress=0
+        )
+        import_scenario_cases.delay(instance.pk)
 
-            for parameter in details.get('parameters') or []:
-                # Retrieve parameter information from local reference
-                if '$ref' in parameter:
-                    parameter = get_parameter_from_ref(schema, parameter['$ref'])
+    # The worker must read the committed collection and OAS link
+    transaction.on_commit(queue_import)
 
-                if parameter['in'] == 'query':
-                    QueryParamsScenario.objects.create(
-                        scenario_case=sc,
-                        name=parameter['name'],
-                        expected_value='*',
-                    )
 
 class VNGEndpoint(OrderedModel):
 
@@ -351,6 +335,9 @@ class ScenarioCase(OrderedModel):
     ))
     order_with_respect_to = 'collection'
     description = models.TextField(default='', null=True, blank=True)
+    from_oas = models.BooleanField(default=False, help_text=_(
+        "Whether this scenario case was generated from the OAS of the collection"
+    ))
 
     class Meta(OrderedModel.Meta):
         pass
@@ -394,7 +381,7 @@ class Session(models.Model):
     stopped = models.DateTimeField(_('Stopped at'), null=True, blank=True, help_text=_(
         "The time at which the session was stopped"
     ))
-    status = models.CharField(max_length=20, choices=choices.StatusChoices.choices, default=choices.StatusChoices.starting, help_text=_(
+    status = models.CharField(max_length=20, choices=choices.SessionStatusChoices.choices, default=choices.SessionStatusChoices.starting, help_text=_(
         "Indicates the status of this session"
     ))
     user = models.ForeignKey(User, verbose_name=_('User'), on_delete=models.SET_NULL, null=True, help_text=_(
@@ -420,10 +407,39 @@ class Session(models.Model):
         "The name of the software tested by this session"
     ))
     product_role = models.CharField(max_length=100, blank=True, null=True)
+    last_activity = models.DateTimeField(blank=True, null=True, default=None, help_text=_(
+        "The time of the last call made through the session, updated periodically"
+    ))
+    suspended = models.BooleanField(default=False, help_text=_(
+        "Indicates that the deployment of the session has been scaled down for inactivity"
+    ))
+    idempotency_key = models.CharField(max_length=100, blank=True, default='', help_text=_(
+        "The Idempotency-Key header of the API call creating the session, retries with the same key return this session"
+    ))
 
     class Meta:
         verbose_name = _('Session')
         verbose_name_plural = _('Sessions')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'idempotency_key'], condition=~models.Q(idempotency_key=''),
+                name='session_user_idempotency_key'
+            ),
+        ]
+        indexes = [
+            # The sessions list of a user
+            models.Index(fields=['user', 'session_type', '-started'], name='session_user_type_started'),
+            # The active sessions counted on every page and the dashboard
+            models.Index(
+                fields=['user'], condition=models.Q(status__in=['starting', 'running']),
+                name='session_active_user'
+            ),
+            # The idle and suspend checks of the running sessions
+            models.Index(
+                fields=['last_activity'], condition=models.Q(status='running'),
+                name='session_running_activity'
+            ),
+        ]
 
     @staticmethod
     def assign_name(id):
@@ -452,6 +468,9 @@ class Session(models.Model):
     def is_shutting_down(self):
         return self.status == choices.StatusChoices.shutting_down
 
+    def is_queued(self):
+        return self.status == choices.SessionStatusChoices.queued
+
     def get_report_stats(self):
         success, failed, not_called = 0, 0, 0
         reports = Report.objects.filter(session_log__in=self.sessionlog_set.all())
@@ -464,6 +483,42 @@ class Session(models.Model):
                 not_called += 1
         return success, failed, not_called + (self.session_type.scenario_cases.count() - reports.count())
 
+    @classmethod
+    def get_report_stats_bulk(cls, sessions):
+        '''
+        Return the result of `get_report_stats` for each session by its primary
+        key, with two queries for all the sessions instead of a few per session
+        '''
+        stats = {session.pk: [0, 0, 0, 0] for session in sessions}
+        reports = Report.objects.filter(session_log__session__in=list(stats)).values(
+            'session_log__session', 'result'
+        ).annotate(n=models.Count('pk')).order_by()
+        columns = {
+            choices.HTTPCallChoices.success: 0,
+            choices.HTTPCallChoices.failed: 1,
+            choices.HTTPCallChoices.not_called: 2,
+        }
+        for row in reports:
+            session_stats = stats[row['session_log__session']]
+            if row['result'] in columns:
+                session_stats[columns[row['result']]] += row['n']
+            session_stats[3] += row['n']
+        case_counts = dict(
+            ScenarioCase.objects.filter(
+                collection__vngendpoint__session_type__in={session.session_type_id for session in sessions}
+            ).values_list('collection__vngendpoint__session_type').annotate(
+                n=models.Count('pk', distinct=True)
+            ).order_by()
+        )
+        return {
+            session.pk: (
+                stats[session.pk][0],
+                stats[session.pk][1],
+                stats[session.pk][2] + case_counts.get(session.session_type_id, 0) - stats[session.pk][3],
+            )
+            for session in sessions
+        }
+
 class ExposedUrl(models.Model):
 
     port = models.PositiveIntegerField(default=8080, help_text=_(
@@ -485,6 +540,12 @@ class ExposedUrl(models.Model):
         "The address under which the Docker containers are deployed"
     ))
 
+    class Meta:
+        indexes = [
+            # The lookup of the proxy on every call
+            models.Index(fields=['session', 'subdomain'], name='exposedurl_session_subdomain'),
+        ]
+
     def __str__(self):
         return '{} {}'.format(self.session, self.vng_endpoint)
 
@@ -509,12 +570,30 @@ class SessionLog(models.Model):
     response_status = models.PositiveIntegerField(blank=True, null=True, default=None, help_text=_(
         "The HTTP status code of the response"
     ))
+    # Stored apart from the request so the logs can be listed and filtered without parsing it
+    method = models.CharField(max_length=10, blank=True, default='', help_text=_(
+        "The HTTP method of the request"
+    ))
+    url = models.TextField(blank=True, default='', help_text=_(
+        "The absolute URL of the request"
+    ))
+    path = models.TextField(blank=True, default='', help_text=_(
+        "The path of the URL of the request, without the query string"
+    ))
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the logs of a session
+            models.Index(fields=['session', 'date', 'id'], name='sessionlog_session_date_id'),
+        ]
 
     def __str__(self):
         return '{} - {} - {}'.format(str(self.date), str(self.session),
                                      str(self.response_status))
 
     def request_path(self):
+        if self.method:
+            return '{} {}'.format(self.method, self.url)
         return json.loads(self.request)['request']['path']
 
     def request_headers(self):
@@ -0,0 +1,118 @@
+'''
+Import of the scenario cases of a collection from its OAS.
+
+The import is a diff against the scenario cases generated by the previous
+import: cases of new operations are added, the descriptions and query
+parameters of existing ones are updated and cases of operations which are no
+longer in the OAS are removed, unless they are referenced by reports. Scenario
+cases added by hand are never changed.
+'''
+from collections import namedtuple
+
+from django.db.models import Max
+
+from vng.utils.oas import SpecModel, load_json, load_yaml
+
+from .models import QueryParamsScenario, ScenarioCase
+
+ImportSummary = namedtuple('ImportSummary', ['created', 'updated', 'deleted'])
+
+
+def load_oas(oas_link, content):
+    # Translate yaml to Python dict if needed
+    if oas_link.endswith('.yaml'):
+        return load_yaml(content)
+    return load_json(content)
+
+
+def _operations(schema, base_url):
+    '''
+    Return the operations of the OAS as {(url, http method): (description, query parameter names)}
+    '''
+    operations = {}
+    for operation in SpecModel(schema, base_url=base_url).operations:
+        query_params = []
+        for parameter in operation.parameters:
+            if parameter.get('in') == 'query' and parameter['name'] not in query_params:
+                query_params.append(parameter['name'])
+        operations[(operation.path, operation.method.upper())] = (
+            operation.details.get('summary', ''), query_params
+        )
+    return operations
+
+
+def import_cases(collection, schema, on_progress=None):
+    '''
+    Bring the scenario cases of the collection in line with the OAS, returns an ImportSummary.
+    Not atomic so the progress can be followed, an interrupted import is completed by the next.
+    '''
+    def progress(percentage):
+        if on_progress:
+            on_progress(percentage)
+
+    operations = _operations(schema, collection.oas_link)
+    progress(20)
+
+    existing = {
+        (case.url, case.http_method): case
+        for case in collection.scenariocase_set.prefetch_related('queryparamsscenario_set')
+    }
+
+    # New cases are appended, in the order of the OAS
+    next_order = (collection.scenariocase_set.aggregate(Max('order'))['order__max'] or 0) + 1
+    new_cases = []
+    updated_cases = []
+    for (url, http_method), (description, __) in operations.items():
+        case = existing.get((url, http_method))
+        if case is None:
+            new_cases.append(ScenarioCase(
+                collection=collection, url=url, http_method=http_method,
+                description=description, order=next_order, from_oas=True
+            ))
+            next_order += 1
+        elif case.from_oas and case.description != description:
+            case.description = description
+            updated_cases.append(case)
+
+    # Returns the primary keys on PostgreSQL, needed for the query parameters
+    ScenarioCase.objects.bulk_create(new_cases)
+    ScenarioCase.objects.bulk_update(updated_cases, ['description'])
+    progress(50)
+
+    new_params = []
+    stale_params = []
+    for case in new_cases:
+        new_params += [
+            QueryParamsScenario(scenario_case=case, name=name, expected_value='*')
+            for name in operations[(case.url, case.http_method)][1]
+        ]
+    for key, case in existing.items():
+        if not case.from_oas or key not in operations:
+            continue
+        params = {param.name: param for param in case.queryparamsscenario_set.all()}
+        names = operations[key][1]
+        new_params += [
+            QueryParamsScenario(scenario_case=case, name=name, expected_value='*')
+            for name in names if name not in params
+        ]
+        stale_params += [param.pk for name, param in params.items() if name not in names]
+        if any(name not in params for name in names) or any(name not in names for name in params):
+            if case not in updated_cases:
+                updated_cases.append(case)
+    QueryParamsScenario.objects.bulk_create(new_params)
+    progress(80)
+
+    # The reports of earlier sessions keep the cases they refer to
+    removed = [
+        case.pk for key, case in existing.items()
+        if case.from_oas and key not in operations
+    ]
+    removed = list(
+        ScenarioCase.objects.filter(pk__in=removed, report__isnull=True).values_list('pk', flat=True)
+    )
+    QueryParamsScenario.objects.filter(pk__in=stale_params).delete()
+    QueryParamsScenario.objects.filter(scenario_case__in=removed).delete()
+    ScenarioCase.objects.filter(pk__in=removed).delete()
+    progress(100)
+
+    return ImportSummary(len(new_cases), len(updated_cases), len(removed))
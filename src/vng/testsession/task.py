@@ -7,17 +7,25 @@ import uuid
 from datetime import timedelta, datetime
 from celery.utils.log import get_task_logger
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.utils.timezone import make_aware
 from django.utils.translation import ugettext_lazy as _
 
 from vng.k8s_manager.kubernetes import *
 from vng.k8s_manager.container_manager import K8S
+from vng.k8s_manager.images import pin_containers, resolve_digests
 
 from ..celery.celery import app
-from .models import ExposedUrl, Session, TestSession, VNGEndpoint
+from .models import ExposedUrl, ScenarioCaseCollection, Session, TestSession, VNGEndpoint
+from .oas_import import import_cases, load_oas
+from . import admission
 from ..utils import choices
 from ..utils.newman import NewmanManager
+from ..utils.specs import fetch_spec
 from .gemma_containers import *
 
 logger = get_task_logger(__name__)
@@ -36,6 +44,50 @@ def stop_session(session_uuid):
             kuber.delete()
     session.status = choices.StatusChoices.stopped
     session.save()
+    # the resources are released, the queued sessions may fit now
+    process_session_queue.delay()
+
+
+@app.task(bind=True, max_retries=3, default_retry_delay=60)
+def import_scenario_cases(self, collection_pk):
+    """
+    Import the scenario cases of the collection from its OAS, retried when the
+    OAS cannot be downloaded
+    """
+    collection = ScenarioCaseCollection.objects.get(pk=collection_pk)
+    collection_qs = ScenarioCaseCollection.objects.filter(pk=collection_pk)
+    collection_qs.update(import_status=choices.ImportStatusChoices.running, import_progress=0)
+
+    response = fetch_spec(collection.oas_link)
+    if not response:
+        if self.request.retries < self.max_retries:
+            collection_qs.update(import_message=_("The OAS could not be downloaded, retrying"))
+            raise self.retry()
+        collection_qs.update(
+            import_status=choices.ImportStatusChoices.error,
+            import_message=_("The OAS could not be downloaded")
+        )
+        return
+
+    try:
+        schema = load_oas(collection.oas_link, response.content)
+        summary = import_cases(
+            collection, schema,
+            on_progress=lambda percentage: collection_qs.update(import_progress=percentage)
+        )
+    except Exception as e:
+        logger.exception(e)
+        collection_qs.update(
+            import_status=choices.ImportStatusChoices.error,
+            import_message=_("The OAS could not be imported: {}").format(e)
+        )
+        return
+
+    collection_qs.update(
+        import_status=choices.ImportStatusChoices.finished,
+        import_progress=100,
+        import_message=_("{} scenario cases created, {} updated and {} deleted").format(*summary)
+    )
 
 
 def update_session_status(session, message, percentage=None):
@@ -71,6 +123,116 @@ def purge_sessions():
     return purged
 
 
+def evict_idle_sessions(session):
+    '''
+    Stop enough sessions without any recent call to release the resources of the given session
+    '''
+    return bool(admission.evict_for(session))
+
+
+@app.task
+def process_session_queue():
+    for session in admission.process_queue():
+        bootstrap_session.delay(session.uuid, admitted=True)
+
+
+@app.task
+def suspend_idle_sessions():
+    '''
+    Scale down the deployment of the running sessions without recent calls,
+    the proxy scales them back up on the next call
+    '''
+    threshold = timezone.now() - timedelta(minutes=settings.SESSION_SUSPEND_MINUTES)
+    # Only the sessions with a deployment, endpoints with an empty image are external
+    deployed = VNGEndpoint.objects.filter(docker_image__isnull=False).exclude(docker_image='')
+    sessions = Session.objects.filter(status=choices.StatusChoices.running, suspended=False) \
+        .filter(Q(exposedurl__vng_endpoint__in=deployed) | Q(session_type__ZGW_images=True)) \
+        .annotate(last_activity_at=Coalesce('last_activity', 'started')) \
+        .filter(last_activity_at__lte=threshold) \
+        .distinct()
+    for session in sessions:
+        logger.info('Suspending idle session %s', session.name)
+        try:
+            # The database deployment is kept, it has no persistent volume
+            K8S(app_name=session.name).scale(0)
+        except Exception:
+            # The other idle sessions are still suspended
+            logger.exception('Suspending session %s failed', session.name)
+            continue
+        session.suspended = True
+        session.save()
+
+
+def resume_session(session):
+    '''
+    Scale back up the deployment of a suspended session, waiting at most
+    `SESSION_RESUME_TIMEOUT` seconds for the pod to be running
+    '''
+    k8s = K8S(app_name=session.name)
+    k8s.scale(1)
+    Session.objects.filter(pk=session.pk).update(suspended=False)
+    session.suspended = False
+    deadline = time.monotonic() + settings.SESSION_RESUME_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            running, __ = k8s.get_pod_status_deployment()
+            if running:
+                return True
+        except Exception:
+            # The new pod is not scheduled yet
+            pass
+        time.sleep(2)
+    return False
+
+
+def session_images():
+    images = [c.image for c in [postgis, ZRC, NRC, ZTC, BRC, DRC, AC, NRC_CELERY, rabbitMQ]]
+    images += VNGEndpoint.objects.filter(docker_image__isnull=False).exclude(docker_image='') \
+        .values_list('docker_image', flat=True).distinct()
+    return images
+
+
+@app.task
+def refresh_session_images():
+    '''
+    Resolve the tags of the images used by the sessions and pre-pull them on all the nodes
+    '''
+    resolved = resolve_digests(session_images())
+    if not resolved:
+        return
+    K8S().initialize()
+    ImageWarmer(
+        name='session-image-warmer',
+        images=sorted(set(d.get_pinned_image() for d in resolved))
+    ).execute()
+
+
+@app.task
+def prune_config_maps():
+    '''
+    Delete the ConfigMaps shared between sessions which no deployment uses anymore
+    '''
+    k8s = K8S()
+    k8s.initialize()
+    for name in k8s.prune_config_maps():
+        logger.info('Deleted unused ConfigMap %s', name)
+
+
+def pin_session_images(session, containers):
+    '''
+    Deploy the containers with the resolved digests and record them in the build version of the session
+    '''
+    pinned = pin_containers(containers)
+    if not pinned:
+        return
+    versions = [session.build_version] if session.build_version else []
+    for image in pinned:
+        if image not in versions:
+            versions.append(image)
+    session.build_version = '\n'.join(versions)
+    session.save()
+
+
 def deploy_db(session, data=[]):
 
     db_k8s = K8S(app_name='db-{}'.format(session.name))
@@ -78,6 +240,7 @@ def deploy_db(session, data=[]):
     db = copy.deepcopy(postgis)
     db.name = 'db-{}'.format(session.name)
     db.data = data
+    pin_session_images(session, [db])
     d_db = Deployment(
         name='db-{}'.format(session.name),
         labels='db-{}'.format(session.name),
@@ -115,6 +278,7 @@ def ZGW_deploy(session):
         copy.deepcopy(rabbitMQ),
     ]
     uwsgi_containers = containers[:-2]
+    pin_session_images(session, containers)
     exposed_urls = []
     for c in containers:
         vng_endpoint = VNGEndpoint.objects.filter(session_type=session.session_type).filter(name__icontains=c.name)
@@ -138,12 +302,7 @@ def ZGW_deploy(session):
     update_session_status(session, _('Deployment of the pod'), 5)
 
     # Crete the service forwarding the right ports
-    LoadBalancer(
-        name='{}-loadbalancer'.format(session.name),
-        app=session.name,
-        containers=containers
-    ).execute()
-    ip = external_ip_pooling(k8s, session, n_trial=150, max_percentage=40)
+    ip = expose_session(k8s, session, containers, n_trial=150, max_percentage=40)
     if ip is None:
         update_session_status(session, _('Impossible to deploy successfully, IP address not allocated'))
         session.status = choices.StatusChoices.error_deploy
@@ -192,19 +351,22 @@ def ZGW_deploy(session):
     session.save()
 
 
-def external_ip_pooling(k8s, session, n_trial=15, purge=True, percentage=36, max_percentage=99):
+def pod_pooling(k8s, session, n_trial=15, purge=True):
     for i in range(n_trial):
         time.sleep(10)
         res, message = k8s.get_pod_status_deployment()
         if res:
-            break
-    if not res:
-        if purge and purge_sessions():
-            update_session_status(session, _('Impossible to deploy successfully, trying to remove old sessions'))
-            external_ip_pooling(k8s, session, purge=False)
-        else:
-            update_session_status(session, _('Impossible to deploy successfully, all the resources are being used'))
-            return None
+            return True
+    if purge and evict_idle_sessions(session):
+        update_session_status(session, _('Impossible to deploy successfully, trying to remove idle sessions'))
+        return pod_pooling(k8s, session, n_trial=n_trial, purge=False)
+    update_session_status(session, _('Impossible to deploy successfully, all the resources are being used'))
+    return False
+
+
+def external_ip_pooling(k8s, session, n_trial=15, purge=True, percentage=36, max_percentage=99):
+    if not pod_pooling(k8s, session, n_trial=n_trial, purge=purge):
+        return None
     for i in range(n_trial):
         time.sleep(10)
         update_session_status(session, _('Installation progress ') + '{}'.format(i + 1), min(percentage + i * 6, max_percentage))
@@ -214,13 +376,66 @@ def external_ip_pooling(k8s, session, n_trial=15, purge=True, percentage=36, max
     return None
 
 
+def expose_session(k8s, session, containers, n_trial=15, percentage=36, max_percentage=99):
+    '''
+    Create the service forwarding the ports of the containers, return the address
+    under which the proxy reaches them or None if the deployment failed
+    '''
+    if uses_load_balancer():
+        LoadBalancer(
+            name='{}-loadbalancer'.format(session.name),
+            app=session.name,
+            containers=containers
+        ).execute()
+        return external_ip_pooling(k8s, session, n_trial=n_trial, percentage=percentage, max_percentage=max_percentage)
+
+    service = ClusterIP(
+        name='{}-service'.format(session.name),
+        app=session.name,
+        containers=containers
+    ).execute()
+    # No external IP to wait for, only the pod has to be scheduled
+    if not pod_pooling(k8s, session, n_trial=n_trial):
+        return None
+    update_session_status(session, _('Installation progress'), max_percentage)
+    return service.get_address()
+
+
 @app.task
-def bootstrap_session(session_uuid, purged=False):
+def bootstrap_session(session_uuid, admitted=False):
     '''
     Create all the necessary endpoint and exposes it so they can be used as proxy
     In case there is one or multiple docker images linked, it starts all of them
+    Sessions not fitting in the cluster are queued, `process_session_queue` deploys them later
+    A session is deployed once, duplicate deliveries of the task are skipped
     '''
-    session = Session.objects.get(uuid=session_uuid)
+    lock = 'bootstrap-session-{}'.format(session_uuid)
+    # None when the cache is unreachable, the deployment is not blocked then
+    if cache.add(lock, True, settings.SESSION_BOOTSTRAP_LOCK_SECONDS) is False:
+        logger.info('Session %s is already being deployed', session_uuid)
+        return
+    try:
+        session = Session.objects.get(uuid=session_uuid)
+        # Running, stopped or failed sessions were deployed before
+        if session.status != choices.StatusChoices.starting:
+            return
+        deploy_session(session, admitted=admitted)
+        # A deployment giving up leaves the session starting, which keeps its capacity reserved
+        Session.objects.filter(pk=session.pk, status=choices.StatusChoices.starting).update(
+            status=choices.StatusChoices.error_deploy
+        )
+    except Exception as e:
+        logger.exception(e)
+        Session.objects.filter(uuid=session_uuid).update(
+            status=choices.StatusChoices.error_deploy, error_message=str(e)
+        )
+    finally:
+        cache.delete(lock)
+
+
+def deploy_session(session, admitted=False):
+    if not admitted and not admission.admit(session):
+        return
     if session.session_type.ZGW_images:
         ZGW_deploy(session)
         return
@@ -268,17 +483,13 @@ def bootstrap_session(session_uuid, purged=False):
             containers.append(container)
     if len(containers) != 0:
         update_session_status(session, _('Docker image installation on Kubernetes'), 10)
+        pin_session_images(session, containers)
         deployment = Deployment(
             name=session.name,
             labels=session.name,
             containers=containers
         ).execute()
-        lb = LoadBalancer(
-            name='{}-loadbalancer'.format(session.name),
-            app=session.name,
-            containers=containers
-        ).execute()
-        ip = external_ip_pooling(k8s, session)
+        ip = expose_session(k8s, session, containers)
         if not ip:
             update_session_status(session, _('An error within the image prevented from a correct deployment'))
             return
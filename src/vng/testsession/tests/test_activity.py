@@ -0,0 +1,109 @@
+from datetime import timedelta
+
+import mock
+import requests_mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from subdomains.utils import reverse as reverse_sub
+
+from django_webtest import WebTest
+
+from ..activity import ActivityTracker
+from ..task import suspend_idle_sessions
+from .factories import ExposedUrlFactory, SessionFactory, VNGEndpointDockerFactory
+from ...utils import choices
+
+
+class ActivityTrackerTests(TestCase):
+
+    @override_settings(SESSION_ACTIVITY_FLUSH_SECONDS=60)
+    def test_record_is_buffered(self):
+        session = SessionFactory()
+        tracker = ActivityTracker()
+
+        tracker.record(session)
+        session.refresh_from_db()
+        self.assertIsNone(session.last_activity)
+
+        tracker.flush()
+        session.refresh_from_db()
+        self.assertIsNotNone(session.last_activity)
+
+    @override_settings(SESSION_ACTIVITY_FLUSH_SECONDS=0)
+    def test_flush_never_goes_back_in_time(self):
+        later = timezone.now() + timedelta(hours=1)
+        session = SessionFactory(last_activity=later)
+
+        ActivityTracker().record(session)
+
+        session.refresh_from_db()
+        self.assertEqual(session.last_activity, later)
+
+
+@override_settings(SESSION_SUSPEND_MINUTES=30)
+class SuspendIdleSessionsTests(TestCase):
+
+    def _session(self, **kwargs):
+        session = SessionFactory(status=choices.StatusChoices.running, **kwargs)
+        ExposedUrlFactory(session=session, vng_endpoint=VNGEndpointDockerFactory(session_type=session.session_type))
+        return session
+
+    @mock.patch('vng.testsession.task.K8S')
+    def test_suspend_idle_session(self, k8s):
+        idle = self._session(last_activity=timezone.now() - timedelta(hours=1))
+        busy = self._session(last_activity=timezone.now())
+
+        suspend_idle_sessions()
+
+        k8s.assert_called_once_with(app_name=idle.name)
+        k8s.return_value.scale.assert_called_once_with(0)
+        idle.refresh_from_db()
+        busy.refresh_from_db()
+        self.assertTrue(idle.suspended)
+        self.assertFalse(busy.suspended)
+
+    @mock.patch('vng.testsession.task.K8S')
+    def test_skip_sessions_without_deployment(self, k8s):
+        external = SessionFactory(status=choices.StatusChoices.running, last_activity=timezone.now() - timedelta(hours=1))
+        ExposedUrlFactory(
+            session=external,
+            vng_endpoint=VNGEndpointDockerFactory(session_type=external.session_type, docker_image='')
+        )
+
+        suspend_idle_sessions()
+
+        k8s.assert_not_called()
+
+    @mock.patch('vng.testsession.task.K8S')
+    def test_failure_does_not_stop_the_others(self, k8s):
+        failing = self._session(last_activity=timezone.now() - timedelta(hours=2))
+        idle = self._session(last_activity=timezone.now() - timedelta(hours=1))
+        k8s.return_value.scale.side_effect = [Exception('deployment not found'), None]
+
+        suspend_idle_sessions()
+
+        failing.refresh_from_db()
+        idle.refresh_from_db()
+        self.assertEqual(k8s.return_value.scale.call_count, 2)
+        self.assertEqual(sorted([failing.suspended, idle.suspended]), [False, True])
+
+
+@override_settings(SESSION_RESUME_TIMEOUT=0)
+class ResumeSessionTests(WebTest):
+
+    def setUp(self):
+        self.exp_url = ExposedUrlFactory(session__suspended=True, session__status=choices.StatusChoices.running)
+        self.session = self.exp_url.session
+
+    @mock.patch('vng.api.v1.testsession.views.resume_session')
+    def test_call_resumes_suspended_session(self, resume_session):
+        url = reverse_sub('run_test', self.exp_url.subdomain, kwargs={
+            'relative_url': ''
+        })
+        with requests_mock.Mocker() as m:
+            m.get(requests_mock.ANY, json={})
+            self.app.get(url, extra_environ={'HTTP_HOST': '{}-example.com'.format(self.exp_url.subdomain)})
+
+        resume_session.assert_called_once()
+        self.assertEqual(resume_session.call_args[0][0], self.session)
@@ -0,0 +1,147 @@
+from datetime import timedelta
+
+import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..admission import (
+    Demand, DemandCache, admit, evict_for, fair_order, idle_sessions, process_queue, session_type_demand,
+    used_capacity
+)
+from ..task import bootstrap_session
+from .factories import SessionFactory, SessionLogFactory, SessionTypeFactory, VNGEndpointDockerFactory
+from ...utils import choices
+from ...utils.factories import UserFactory
+
+
+@override_settings(
+    KUBERNETES_CAPACITY={'cpu': 4.0, 'memory': 4096, 'load_balancers': 1},
+    SESSION_IDLE_MINUTES=60,
+)
+class AdmissionTests(TestCase):
+
+    def setUp(self):
+        self.session_type = SessionTypeFactory()
+        VNGEndpointDockerFactory(session_type=self.session_type)
+
+    def _session(self, **kwargs):
+        kwargs.setdefault('session_type', self.session_type)
+        kwargs.setdefault('started', timezone.now())
+        return SessionFactory(**kwargs)
+
+    def test_demand_docker_session(self):
+        demand = session_type_demand(self.session_type)
+
+        self.assertEqual(demand, Demand(0.05, 256, 1))
+
+    @override_settings(KUBERNETES_ROUTING='cluster')
+    @mock.patch.dict('os.environ', {'KUBERNETES_SERVICE_HOST': '10.0.0.1'})
+    def test_demand_cluster_routing(self):
+        self.assertEqual(session_type_demand(self.session_type).load_balancers, 0)
+
+    def test_demand_external_session(self):
+        self.assertEqual(session_type_demand(SessionTypeFactory()), Demand.empty())
+
+    def test_admit_when_capacity_available(self):
+        session = self._session()
+
+        self.assertTrue(admit(session))
+        session.refresh_from_db()
+        self.assertEqual(session.status, choices.SessionStatusChoices.starting)
+
+    def test_queue_when_cluster_full(self):
+        self._session(status=choices.SessionStatusChoices.running)
+        session = self._session()
+
+        self.assertFalse(admit(session))
+        session.refresh_from_db()
+        self.assertEqual(session.status, choices.SessionStatusChoices.queued)
+        self.assertIn('position 1', session.deploy_status)
+
+    @mock.patch('vng.testsession.admission._dispatch_stop')
+    def test_evict_idle_session(self, dispatch_stop):
+        idle = self._session(
+            status=choices.SessionStatusChoices.running,
+            started=timezone.now() - timedelta(hours=3)
+        )
+        SessionLogFactory(session=idle, date=timezone.now() - timedelta(hours=2))
+        session = self._session()
+
+        self.assertTrue(admit(session))
+        idle.refresh_from_db()
+        self.assertEqual(idle.status, choices.SessionStatusChoices.shutting_down)
+
+    @mock.patch('vng.testsession.admission._dispatch_stop')
+    def test_evict_for_pending_pod(self, dispatch_stop):
+        oldest, idle = [
+            self._session(status=choices.SessionStatusChoices.running, started=timezone.now() - timedelta(hours=hours))
+            for hours in (4, 3)
+        ]
+        session = self._session()
+
+        # Only as many idle sessions are stopped as the session needs
+        self.assertEqual(evict_for(session), [oldest])
+        oldest.refresh_from_db()
+        idle.refresh_from_db()
+        self.assertEqual(oldest.status, choices.SessionStatusChoices.shutting_down)
+        self.assertEqual(idle.status, choices.SessionStatusChoices.running)
+
+    @mock.patch('vng.testsession.task.deploy_session')
+    def test_failed_deploy_releases_capacity(self, deploy_session):
+        session = self._session()
+        self.assertEqual(used_capacity(DemandCache()), Demand(0.05, 256, 1))
+
+        # The deployment gave up without changing the status
+        bootstrap_session(session.uuid)
+
+        session.refresh_from_db()
+        self.assertEqual(session.status, choices.SessionStatusChoices.error_deploy)
+        self.assertEqual(used_capacity(DemandCache()), Demand.empty())
+
+        other = self._session()
+        deploy_session.side_effect = Exception('kubectl failed')
+        bootstrap_session(other.uuid)
+
+        other.refresh_from_db()
+        self.assertEqual(other.status, choices.SessionStatusChoices.error_deploy)
+        self.assertEqual(used_capacity(DemandCache()), Demand.empty())
+
+    def test_old_session_with_recent_calls_is_not_idle(self):
+        busy = self._session(
+            status=choices.SessionStatusChoices.running,
+            started=timezone.now() - timedelta(days=2)
+        )
+        SessionLogFactory(session=busy, date=timezone.now())
+
+        self.assertNotIn(busy, idle_sessions())
+
+    def test_fair_order(self):
+        first_user, second_user = UserFactory(), UserFactory()
+        now = timezone.now()
+        a1 = self._session(user=first_user, started=now)
+        a2 = self._session(user=first_user, started=now + timedelta(seconds=1))
+        a3 = self._session(user=first_user, started=now + timedelta(seconds=2))
+        b1 = self._session(user=second_user, started=now + timedelta(seconds=3))
+
+        self.assertEqual(fair_order([a3, b1, a2, a1]), [a1, b1, a2, a3])
+
+    def test_process_queue(self):
+        running = self._session(status=choices.SessionStatusChoices.running)
+        first = self._session(status=choices.SessionStatusChoices.queued)
+        second = self._session(
+            status=choices.SessionStatusChoices.queued,
+            started=timezone.now() + timedelta(seconds=1)
+        )
+
+        self.assertEqual(process_queue(), [])
+        second.refresh_from_db()
+        self.assertIn('position 2', second.deploy_status)
+
+        running.status = choices.SessionStatusChoices.stopped
+        running.save()
+
+        self.assertEqual(process_queue(), [first])
+        second.refresh_from_db()
+        self.assertEqual(second.status, choices.SessionStatusChoices.queued)
+        self.assertIn('position 1', second.deploy_status)
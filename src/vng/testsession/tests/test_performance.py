@@ -0,0 +1,184 @@
+import os
+import pstats
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import override_settings, tag
+from django.urls import reverse
+from subdomains.utils import reverse as reverse_sub
+
+from django_webtest import WebTest
+
+from ..models import Report, Session
+from .factories import (
+    SessionFactory, ScenarioCaseFactory, ScenarioCaseCollectionFactory, ExposedUrlFactory, SessionLogFactory,
+    VNGEndpointFactory, QueryParamsScenarioFactory
+)
+from ...utils import choices
+from ...utils.benchmark import StubUpstream, measure
+from ...utils.factories import UserFactory
+from ...utils.instrumentation import PROXY, flush
+
+SCALES = (1, 10, 50)
+
+# Upper bounds on the queries of a single request, the main guard is that the
+# count does not grow with the size of the dataset
+QUERY_BUDGETS = {
+    'proxy': 40,
+    'session_list': 20,
+    'session_shield': 6,
+    'session_result': 8,
+}
+
+
+def build_session(size=0, url='https://test.openzaak.nl/documenten/api/v1', vng_endpoint=None, **kwargs):
+    '''
+    A running session in which each scenario case has been called once, the
+    service gets `size` new scenario cases unless an existing one is given
+    '''
+    if vng_endpoint is None:
+        vng_endpoint = VNGEndpointFactory(scenario_collection=ScenarioCaseCollectionFactory(), url=url)
+        for i in range(size):
+            scenario_case = ScenarioCaseFactory(
+                collection=vng_endpoint.scenario_collection, url='resource/{}'.format(i)
+            )
+            QueryParamsScenarioFactory(scenario_case=scenario_case, name='param')
+    session = SessionFactory(session_type=vng_endpoint.session_type, status=choices.StatusChoices.running, **kwargs)
+    exposed_url = ExposedUrlFactory(session=session, vng_endpoint=vng_endpoint)
+    for i, scenario_case in enumerate(vng_endpoint.scenario_collection.scenariocase_set.all()):
+        Report.objects.create(
+            scenario_case=scenario_case,
+            session_log=SessionLogFactory(session=session),
+            result=choices.HTTPCallChoices.success if i % 2 else choices.HTTPCallChoices.failed
+        )
+    return session, exposed_url
+
+
+@tag('performance')
+@override_settings(SUBDOMAIN_SEPARATOR='-')
+class SessionPerformanceTests(WebTest):
+
+    def assertScaleInvariant(self, name, measurements):
+        counts = [measurement.queries for measurement in measurements]
+        self.assertEqual(len(set(counts)), 1, '{} queries grow with the dataset: {}'.format(name, counts))
+        self.assertLessEqual(max(counts), QUERY_BUDGETS[name])
+
+    def test_proxy(self):
+        measurements = []
+        with StubUpstream() as upstream:
+            for size in SCALES:
+                session, exposed_url = build_session(size, url=upstream.url)
+                url = reverse_sub('run_test', exposed_url.subdomain, kwargs={
+                    'relative_url': 'resource/0'
+                })
+                with measure('proxy', size) as measurement:
+                    self.app.get(
+                        url, {'param': 'value'}, user=session.user,
+                        extra_environ={'HTTP_HOST': '{}-example.com'.format(exposed_url.subdomain)}
+                    )
+                measurements.append(measurement)
+        self.assertScaleInvariant('proxy', measurements)
+
+    def test_session_list(self):
+        measurements = []
+        for size in SCALES:
+            session, exposed_url = build_session(5)
+            for i in range(size - 1):
+                build_session(vng_endpoint=exposed_url.vng_endpoint, user=session.user)
+            with measure('session_list', size) as measurement:
+                self.app.get(reverse('testsession:sessions', kwargs={
+                    'api_id': session.session_type.api.id
+                }), user=session.user)
+            measurements.append(measurement)
+        self.assertScaleInvariant('session_list', measurements)
+
+    def test_report_stats_bulk(self):
+        session, exposed_url = build_session(4)
+        other, _ = build_session(vng_endpoint=exposed_url.vng_endpoint, user=session.user)
+        Report.objects.filter(session_log__session=other).first().delete()
+        empty, _ = build_session(2)
+        sessions = [session, other, empty]
+
+        stats = Session.get_report_stats_bulk(sessions)
+        self.assertEqual(stats, {s.pk: s.get_report_stats() for s in sessions})
+        self.assertEqual(stats[other.pk], (2, 1, 1))
+
+    def test_session_shield(self):
+        measurements = []
+        for size in SCALES:
+            session, _ = build_session(size)
+            with measure('session_shield', size) as measurement:
+                self.app.get(reverse('apiv1session:testsession-shield', kwargs={'uuid': session.uuid}))
+            measurements.append(measurement)
+        self.assertScaleInvariant('session_shield', measurements)
+
+    def test_session_result(self):
+        measurements = []
+        for size in SCALES:
+            session, _ = build_session(size)
+            with measure('session_result', size) as measurement:
+                response = self.app.get(
+                    reverse('apiv1session:result_session', kwargs={'uuid': session.uuid}), user=session.user
+                )
+            measurements.append(measurement)
+            self.assertEqual(len(response.json['report']), size)
+        self.assertScaleInvariant('session_result', measurements)
+
+
+@override_settings(SUBDOMAIN_SEPARATOR='-')
+class InstrumentationTests(WebTest):
+
+    def setUp(self):
+        # Drop the timings of the earlier tests
+        flush()
+        cache.clear()
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir)
+
+    def test_proxy_phases(self):
+        with StubUpstream() as upstream:
+            session, exposed_url = build_session(1, url=upstream.url)
+            url = reverse_sub('run_test', exposed_url.subdomain, kwargs={'relative_url': 'resource/0'})
+            self.app.get(
+                url, user=session.user, extra_environ={'HTTP_HOST': '{}-example.com'.format(exposed_url.subdomain)}
+            )
+
+        staff = UserFactory(is_staff=True)
+        metrics = self.app.get(reverse('metrics'), user=staff).text
+        for phase in ('lookup', 'upstream', 'log', 'matching', 'response'):
+            self.assertIn('vng_proxy_phase_seconds_count{{phase="{}"}} 1'.format(phase), metrics)
+        self.assertIn('vng_proxy_phase_seconds_count{phase="rewrite"} 0', metrics)
+        self.assertIn('vng_proxy_phase_seconds_bucket{phase="upstream",le="+Inf"} 1', metrics)
+
+    def test_flush(self):
+        with override_settings(METRICS_FLUSH_SECONDS=3600):
+            PROXY.observe('lookup', 0.001)
+            PROXY.observe('lookup', 0.002)
+            self.assertIsNone(cache.get(PROXY._key('lookup', 0)))
+            flush()
+        self.assertEqual(cache.get(PROXY._key('lookup', 0)), 2)
+        self.assertEqual(cache.get(PROXY._key('lookup', 'sum')), 3000)
+
+    def test_metrics_access(self):
+        self.app.get(reverse('metrics'), user=UserFactory(), status=403)
+        self.app.get(reverse('metrics'), status=403)
+        with override_settings(METRICS_TOKEN='secret'):
+            self.app.get(reverse('metrics'), headers={'Authorization': 'Bearer wrong'}, status=403)
+            response = self.app.get(reverse('metrics'), headers={'Authorization': 'Bearer secret'})
+        self.assertIn('# TYPE vng_kubernetes_operation_seconds histogram', response.text)
+
+    def test_profile(self):
+        staff = UserFactory(is_staff=True)
+        url = reverse('apiv1session:session_types-list')
+        with override_settings(PROFILE_DIR=self.profile_dir):
+            response = self.app.get(url, user=UserFactory(), headers={'X-Profile': '1'})
+            self.assertNotIn('X-Profile-File', response.headers)
+
+            response = self.app.get(url, user=staff, headers={'X-Profile': 'pstats'})
+            stats = pstats.Stats(os.path.join(self.profile_dir, response.headers['X-Profile-File']))
+            self.assertTrue(stats.total_calls)
+
+            response = self.app.get(url, user=staff, headers={'X-Profile': '1'})
+            self.assertTrue(response.headers['X-Profile-File'].endswith('.folded'))
+            self.assertTrue(os.path.exists(os.path.join(self.profile_dir, response.headers['X-Profile-File'])))
@@ -1,9 +1,14 @@
+import mock
 import requests_mock
 import yaml
-from django.test import TestCase
+from django.db import transaction
+from django.test import TransactionTestCase
 from vng.testsession.models import ScenarioCaseCollection, ScenarioCase
+from vng.testsession.task import import_scenario_cases
+from vng.utils import choices
 
-class ScenarioCaseGenerateFromOASTests(TestCase):
+
+class ScenarioCaseGenerateFromOASTests(TransactionTestCase):
 
     def test_generate_scenario_cases_from_oas(self):
         with requests_mock.Mocker() as m:
@@ -258,7 +263,7 @@ class ScenarioCaseGenerateFromOASTests(TestCase):
 
         self.assertFalse(scenario_cases.exists())
 
-    def test_no_generate_scenario_cases_if_cases_exist_for_collection(self):
+    def test_manual_scenario_cases_are_kept(self):
         collection = ScenarioCaseCollection.objects.create()
         scenario_case = ScenarioCase.objects.create(
             collection=collection,
@@ -288,9 +293,94 @@ class ScenarioCaseGenerateFromOASTests(TestCase):
 
         scenario_cases = collection.scenariocase_set.all()
 
-        self.assertEqual(scenario_cases.count(), 1)
+        self.assertEqual(scenario_cases.count(), 2)
 
         self.assertEqual(scenario_cases[0].collection, collection)
         self.assertEqual(scenario_cases[0].url, '/test')
         self.assertEqual(scenario_cases[0].http_method, 'GET')
         self.assertEqual(scenario_cases[0].description, 'test')
+        self.assertFalse(scenario_cases[0].from_oas)
+
+        self.assertEqual(scenario_cases[1].url, '/zaken')
+        self.assertTrue(scenario_cases[1].from_oas)
+
+    def test_reimport_changed_oas(self):
+        oas = {
+            'swagger': '2.0',
+            'paths': {
+                '/zaken': {
+                    'get': {'summary': 'Alle ZAAKen opvragen', 'parameters': [{'name': 'status', 'in': 'query'}]},
+                    'post': {'summary': 'Maak een ZAAK aan'},
+                },
+            }
+        }
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', 'https://some.oas.link/oas.json', json=oas)
+            collection = ScenarioCaseCollection.objects.create(
+                name='test collection',
+                oas_link='https://some.oas.link/oas.json'
+            )
+
+            oas['paths']['/zaken']['get']['parameters'] = [{'name': 'identificatie', 'in': 'query'}]
+            del oas['paths']['/zaken']['post']
+            oas['paths']['/zaken/{uuid}'] = {'get': {'summary': 'Een ZAAK opvragen'}}
+            m.register_uri('GET', 'https://some.oas.link/oas.json', json=oas)
+            # As the admin action does
+            import_scenario_cases.delay(collection.pk)
+
+        collection.refresh_from_db()
+        self.assertEqual(collection.import_status, choices.ImportStatusChoices.finished)
+        self.assertEqual(collection.import_progress, 100)
+
+        scenario_cases = collection.scenariocase_set.all()
+        self.assertEqual(
+            [(case.http_method, case.url) for case in scenario_cases],
+            [('GET', '/zaken'), ('GET', '/zaken/{uuid}')]
+        )
+        self.assertEqual(scenario_cases[0].query_params(), ['identificatie'])
+        self.assertEqual(scenario_cases[1].order, 3)
+
+    def test_import_unreachable_oas(self):
+        with requests_mock.Mocker():
+            collection = ScenarioCaseCollection.objects.create(
+                name='test collection',
+                oas_link='https://some.oas.link/oas.json'
+            )
+
+        collection.refresh_from_db()
+        self.assertEqual(collection.import_status, choices.ImportStatusChoices.error)
+        self.assertFalse(collection.scenariocase_set.exists())
+
+    @mock.patch('vng.testsession.task.import_scenario_cases.delay')
+    def test_import_queued_after_commit(self, delay):
+        with transaction.atomic():
+            collection = ScenarioCaseCollection.objects.create(
+                name='test collection',
+                oas_link='https://some.oas.link/oas.json'
+            )
+            delay.assert_not_called()
+
+        delay.assert_called_once_with(collection.pk)
+        collection.refresh_from_db()
+        self.assertEqual(collection.import_status, choices.ImportStatusChoices.queued)
+
+    @mock.patch('vng.testsession.task.import_scenario_cases.delay')
+    def test_import_queued_when_link_changes(self, delay):
+        collection = ScenarioCaseCollection.objects.create(
+            name='test collection',
+            oas_link='https://some.oas.link/oas.json'
+        )
+        ScenarioCase.objects.create(collection=collection, http_method='GET', url='/manual')
+        delay.reset_mock()
+
+        # Changing the name keeps the scenario cases as they are
+        collection = ScenarioCaseCollection.objects.get(pk=collection.pk)
+        collection.name = 'renamed'
+        collection.save()
+        collection.save()
+        delay.assert_not_called()
+
+        collection.oas_link = 'https://some.oas.link/v2/oas.json'
+        collection.save()
+        delay.assert_called_once_with(collection.pk)
+        self.assertTrue(collection.scenariocase_set.filter(url='/manual').exists())
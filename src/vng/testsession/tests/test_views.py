@@ -3,6 +3,8 @@ import re
 import json
 import jwt
 import copy
+import shutil
+import tempfile
 import unittest
 
 import mock
@@ -10,6 +12,7 @@ import factory
 
 from django.utils.http import urlencode
 from django.conf import settings
+from django.core.cache import cache
 from django.test import override_settings, tag
 from django.urls import reverse
 from django.utils import timezone
@@ -133,6 +136,66 @@ class AuthorizationTests(WebTest):
         }
         call = self.app.post(reverse('apiv1session:test_session-list'), session, status=[401, 302])
 
+
+@override_settings(SUBDOMAIN_SEPARATOR='-')
+class SessionCreationTests(WebTest):
+    csrf_checks = False
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.session_type = SessionTypeFactory()
+        self.url = reverse('apiv1session:test_session-list')
+
+    @mock.patch('vng.api.v1.testsession.views.bootstrap_session')
+    def test_deployed_in_background(self, bootstrap_session):
+        response = self.app.post_json(self.url, {'session_type': self.session_type.name}, user=self.user)
+
+        self.assertEqual(response.status_code, 202)
+        session = Session.objects.get()
+        self.assertEqual(response.json['status'], choices.StatusChoices.starting)
+        self.assertTrue(response.headers['Location'].endswith(
+            reverse('apiv1session:test_session-status-detail', kwargs={'uuid': session.uuid})
+        ))
+        bootstrap_session.delay.assert_called_once_with(session.uuid)
+
+    @mock.patch('vng.api.v1.testsession.views.bootstrap_session')
+    def test_idempotency_key(self, bootstrap_session):
+        headers = {'Idempotency-Key': 'ci-build-42'}
+
+        first = self.app.post_json(self.url, {'session_type': self.session_type.name}, headers=headers, user=self.user)
+        retry = self.app.post_json(self.url, {'session_type': self.session_type.name}, headers=headers, user=self.user)
+
+        self.assertEqual(Session.objects.count(), 1)
+        self.assertEqual(first.json['uuid'], retry.json['uuid'])
+        bootstrap_session.delay.assert_called_once()
+
+    @mock.patch('vng.api.v1.testsession.views.bootstrap_session')
+    def test_idempotency_key_per_user(self, bootstrap_session):
+        headers = {'Idempotency-Key': 'ci-build-42'}
+
+        self.app.post_json(self.url, {'session_type': self.session_type.name}, headers=headers, user=self.user)
+        self.app.post_json(self.url, {'session_type': self.session_type.name}, headers=headers, user=UserFactory())
+
+        self.assertEqual(Session.objects.count(), 2)
+
+    def test_wait_until_running(self):
+        # Without Docker images the eager task deploys the session right away
+        response = self.app.post_json(
+            '{}?wait=5'.format(self.url), {'session_type': self.session_type.name}, user=self.user
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json['status'], choices.StatusChoices.running)
+
+    def test_invalid_wait(self):
+        response = self.app.post_json(
+            '{}?wait=soon'.format(self.url), {'session_type': self.session_type.name}, user=self.user, status=400
+        )
+
+        self.assertEqual(response.json, {'wait': ['A valid integer is required.']})
+        self.assertFalse(Session.objects.exists())
+
+
 @tag('kubernetes')
 @override_settings(SUBDOMAIN_SEPARATOR='-')
 class CreationAndDeletion(WebTest):
@@ -1039,3 +1102,137 @@ class TestMultipleParams(WebTest):
             }
         ))
         self.assertEqual(call.json['message'], 'Success')
+
+
+class SessionReportPdfTests(WebTest):
+
+    def setUp(self):
+        self.session = SessionFactory()
+        self.url = reverse('testsession:session_report-pdf', kwargs={
+            'api_id': self.session.session_type.api.id, 'uuid': self.session.uuid
+        })
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.addCleanup(cache.clear)
+        patcher = mock.patch('vng.utils.pdf.HTML')
+        self.html = patcher.start()
+        self.html.return_value.write_pdf.return_value = b'%PDF-1.4'
+        self.addCleanup(patcher.stop)
+
+    def test_rendered_once(self):
+        with self.settings(PDF_CACHE_DIR=self.cache_dir):
+            call = self.app.get(self.url, user=self.session.user)
+            self.assertEqual(call.status_code, 200)
+            self.assertEqual(call.content_type, 'application/pdf')
+            self.assertEqual(call.body, b'%PDF-1.4')
+
+            call = self.app.get(self.url, user=self.session.user)
+            self.assertEqual(call.body, b'%PDF-1.4')
+        self.assertEqual(self.html.call_count, 1)
+
+    def test_rendered_again_when_results_change(self):
+        with self.settings(PDF_CACHE_DIR=self.cache_dir):
+            self.app.get(self.url, user=self.session.user)
+            self.session.status = choices.StatusChoices.stopped
+            self.session.save()
+            self.app.get(self.url, user=self.session.user)
+        self.assertEqual(self.html.call_count, 2)
+
+    def test_render_in_progress(self):
+        with self.settings(PDF_CACHE_DIR=self.cache_dir):
+            with mock.patch('vng.utils.pdf.render_pdf.delay') as delay:
+                call = self.app.get(self.url, user=self.session.user, status=202)
+                self.assertEqual(call.headers['Retry-After'], '5')
+                # A concurrent request waits for the render already scheduled
+                self.app.get(self.url, user=self.session.user, status=202)
+        self.assertEqual(delay.call_count, 1)
+        self.html.assert_not_called()
+
+    def test_render_failed(self):
+        self.html.return_value.write_pdf.side_effect = ValueError
+        with self.settings(PDF_CACHE_DIR=self.cache_dir):
+            call = self.app.get(self.url, user=self.session.user, status=500)
+            self.assertIn('could not be generated', call.text)
+            # The failure is remembered instead of rendering again
+            self.app.get(self.url, user=self.session.user, status=500)
+        self.assertEqual(self.html.call_count, 1)
+
+    def test_refresh_capped(self):
+        with self.settings(PDF_CACHE_DIR=self.cache_dir, PDF_MAX_REFRESHES=2):
+            with mock.patch('vng.utils.pdf.render_pdf.delay'):
+                call = self.app.get(self.url, user=self.session.user, status=202)
+                self.assertIn('attempt=1', call.text)
+                call = self.app.get(self.url, {'attempt': 2}, user=self.session.user, status=202)
+        self.assertNotIn('Retry-After', call.headers)
+        self.assertNotIn('window.location', call.text)
+
+
+class SessionLogListTests(WebTest):
+
+    def setUp(self):
+        self.session = SessionFactory()
+        self.url = reverse('apiv1session:session_logs', kwargs={'uuid': self.session.uuid})
+        self.logs = [
+            SessionLogFactory(
+                session=self.session, method=method, url='https://example.com{}'.format(path), path=path,
+                response_status=status
+            )
+            for method, path, status in [
+                ('GET', '/zaken/api/v1/zaken', 200),
+                ('POST', '/zaken/api/v1/zaken', 201),
+                ('GET', '/zaken/api/v1/statussen', 404),
+                ('DELETE', '/documenten/api/v1/objecten', 500),
+                ('GET', '/documenten/api/v1/objecten', 200),
+            ]
+        ]
+
+    def get(self, params=None, url=None, **kwargs):
+        return self.app.get(url or self.url, params or {}, user=self.session.user, **kwargs)
+
+    def test_keyset_pages(self):
+        # All the logs have the same date, the id decides the order
+        first = self.get({'page_size': 2})
+        self.assertEqual([log['uuid'] for log in first.json['results']], [str(log.uuid) for log in self.logs[:2]])
+        self.assertIsNone(first.json['previous'])
+
+        second = self.get(url=first.json['next'])
+        third = self.get(url=second.json['next'])
+        self.assertEqual([log['uuid'] for log in second.json['results']], [str(log.uuid) for log in self.logs[2:4]])
+        self.assertEqual([log['uuid'] for log in third.json['results']], [str(self.logs[4].uuid)])
+        self.assertIsNone(third.json['next'])
+
+        back = self.get(url=third.json['previous'])
+        self.assertEqual(back.json['results'], second.json['results'])
+
+    def test_filters(self):
+        def paths(params):
+            return [log['method'] + ' ' + log['path'] for log in self.get(params).json['results']]
+
+        self.assertEqual(paths({'status_from': 400, 'status_to': 499}), ['GET /zaken/api/v1/statussen'])
+        self.assertEqual(paths({'method': 'post'}), ['POST /zaken/api/v1/zaken'])
+        self.assertEqual(paths({'path': '/documenten/'}), [
+            'DELETE /documenten/api/v1/objecten', 'GET /documenten/api/v1/objecten'
+        ])
+
+        scenario_case = ScenarioCaseFactory()
+        Report.objects.create(scenario_case=scenario_case, session_log=self.logs[1])
+        self.assertEqual(paths({'scenario_case': scenario_case.pk}), ['POST /zaken/api/v1/zaken'])
+
+    def test_invalid_parameters(self):
+        self.get({'status_from': 'abc'}, status=400)
+        self.get({'after': 'abc'}, status=404)
+
+    def test_other_user(self):
+        self.app.get(self.url, user=UserFactory(), status=403)
+
+    def test_session_log_view_pages(self):
+        url = reverse('testsession:session_log', kwargs={
+            'api_id': self.session.session_type.api.id, 'uuid': self.session.uuid
+        })
+        with mock.patch('vng.testsession.views.SessionLogView.paginate_by', 2):
+            response = self.app.get(url, user=self.session.user)
+            self.assertIn('GET https://example.com/zaken/api/v1/zaken', response.text)
+            self.assertNotIn('GET https://example.com/zaken/api/v1/statussen', response.text)
+
+            response = response.click(href=r'\?after=')
+            self.assertIn('GET https://example.com/zaken/api/v1/statussen', response.text)
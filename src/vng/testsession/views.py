@@ -1,9 +1,10 @@
+import hashlib
 import json
 import logging
 
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import Http404, HttpResponse, HttpResponseRedirect
 from django.views.generic.edit import FormView, UpdateView
 from django.views.generic.detail import DetailView
 from django.views.generic import TemplateView
@@ -25,6 +26,7 @@ from .models import (
 from .task import bootstrap_session, stop_session
 from .forms import SessionForm
 from ..utils import choices
+from ..utils.pagination import keyset_page
 from ..utils.views import OwnerSingleObject, PDFGenerator
 
 
@@ -41,12 +43,13 @@ class SessionListView(LoginRequiredMixin, ListView):
     def get_context_data(self, *args, **kwargs):
         context = super().get_context_data(*args, **kwargs)
         context['api'] = API.objects.get(id=self.kwargs['api_id'])
-        _choices = dict(choices.StatusChoices.choices)
+        _choices = dict(choices.SessionStatusChoices.choices)
         _choices['error_deploy'] = choices.StatusChoices.error_deploy
         context.update({
             'choices': _choices,
         })
-        sessions_related = [(session, *session.get_report_stats()) for session in context['object_list']]
+        stats = Session.get_report_stats_bulk(context['object_list'])
+        sessions_related = [(session, *stats[session.pk]) for session in context['object_list']]
         context['object_list'] = sessions_related
         return context
 
@@ -56,6 +59,8 @@ class SessionListView(LoginRequiredMixin, ListView):
         '''
         return Session.objects.filter(
             user=self.request.user, session_type__api__id=self.kwargs['api_id']
+        ).select_related('session_type__api').prefetch_related(
+            'exposedurl_set__vng_endpoint', 'exposedurl_set__test_session'
         ).order_by('-started')
 
 
@@ -105,14 +110,27 @@ class SessionLogView(ListView):
     paginate_by = 200
 
     def get_queryset(self):
-        return SessionLog.objects.filter(session__uuid=self.kwargs['uuid']).order_by('date')
+        return SessionLog.objects.filter(session__uuid=self.kwargs['uuid']).defer('request', 'response')
+
+    def paginate_queryset(self, queryset, page_size):
+        try:
+            logs, self.previous_cursor, self.next_cursor = keyset_page(
+                queryset, page_size, after=self.request.GET.get('after'), before=self.request.GET.get('before')
+            )
+        except ValueError:
+            raise Http404
+        return None, None, logs, bool(self.previous_cursor or self.next_cursor)
 
     def get_context_data(self, *args, **kwargs):
         context = super().get_context_data(*args, **kwargs)
+        context.update({
+            'previous_cursor': self.previous_cursor,
+            'next_cursor': self.next_cursor,
+        })
         session = get_object_or_404(Session, uuid=self.kwargs['uuid'])
         context['api_id'] = session.session_type.api.id
         stats = session.get_report_stats()
-        _choices = dict(choices.StatusChoices.choices)
+        _choices = dict(choices.SessionStatusChoices.choices)
         _choices['error_deploy'] = choices.StatusChoices.error_deploy
         context.update({
             'choices': _choices,
@@ -236,6 +254,16 @@ class SessionReportPdf(PDFGenerator, SessionReport):
 
     template_name = 'testsession/session-report-PDF.html'
 
+    def get_pdf_fingerprint(self):
+        return [
+            self.session.status,
+            list(self.session.session_type.scenario_cases.order_by('pk').values_list('pk', flat=True)),
+            list(
+                Report.objects.filter(session_log__session=self.session)
+                .order_by('pk').values_list('pk', 'result')
+            ),
+        ]
+
 
 class SessionTestReport(OwnerSingleObject):
 
@@ -286,6 +314,9 @@ class SessionTestReportPDF(PDFGenerator, SessionTestReport):
         })
         return context
 
+    def get_pdf_fingerprint(self):
+        return [hashlib.sha256((self.object.json_result or '').encode('utf-8')).hexdigest()]
+
 
 class PostmanDownloadView(View):
 
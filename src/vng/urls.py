@@ -7,6 +7,7 @@ from django.views.generic.base import TemplateView
 from .decorators import anonymous_required
 from .base_url import *
 from . import views
+from .utils.views import metrics
 from django.contrib.flatpages.views import flatpage
 
 urlpatterns = base_urlpatterns + [
@@ -21,6 +22,7 @@ urlpatterns = base_urlpatterns + [
     url(r'^consumer/', include('vng.testsession.urls', namespace='testsession')),
     url(r'^design_rules/', include('vng.design_rules.urls', namespace='design_rules')),
     url(r'^pages/', include('django.contrib.flatpages.urls')),
+    path('metrics', metrics, name='metrics'),
     # path('', views.Dashboard.as_view(), name='dashboard'),
     path('', flatpage, {'url': '/'}, name='home'),
 ]
@@ -0,0 +1,115 @@
+'''
+Helpers for the performance tests.
+
+`measure` records the database queries, the wall time and the peak Python
+memory of a block of code. `StubUpstream` is a local HTTP server standing in
+for the API behind a session, so the proxy is measured without the network.
+When `BENCHMARK_REPORT` is set in the environment, every measurement is
+appended to that file as a line of JSON, to compare runs over time.
+'''
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class Measurement:
+
+    def __init__(self, name, scale=None):
+        self.name = name
+        self.scale = scale
+        self.queries = None
+        self.seconds = None
+        self.peak_memory = None
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'scale': self.scale,
+            'queries': self.queries,
+            'seconds': self.seconds,
+            'peak_memory': self.peak_memory,
+        }
+
+
+def _report(measurement):
+    path = os.environ.get('BENCHMARK_REPORT')
+    if path:
+        with open(path, 'a') as f:
+            f.write(json.dumps(measurement.as_dict()) + '\n')
+
+
+@contextlib.contextmanager
+def measure(name, scale=None):
+    '''
+    Measure the block, the figures are set on the yielded `Measurement` when
+    the block ends
+    '''
+    measurement = Measurement(name, scale)
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    try:
+        with CaptureQueriesContext(connection) as context:
+            yield measurement
+    finally:
+        measurement.seconds = time.perf_counter() - start
+        measurement.peak_memory = max(tracemalloc.get_traced_memory()[1] - baseline, 0)
+        if not tracing:
+            tracemalloc.stop()
+    measurement.queries = len(context.captured_queries)
+    _report(measurement)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+
+    def _reply(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        body = json.dumps({'method': self.command, 'path': self.path}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _reply
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubUpstream:
+    '''
+    A local HTTP server answering every request with 200 and a small JSON
+    body, to be used as a context manager
+    '''
+
+    def __enter__(self):
+        self.server = _ThreadingServer(('127.0.0.1', 0), _StubHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}/'.format(self.server.server_address[1])
@@ -15,6 +15,17 @@ class StatusChoices(DjangoChoices):
     error_deploy = ChoiceItem("Error deployment")
 
 
+class SessionStatusChoices(StatusChoices):
+    queued = ChoiceItem("queued")
+
+
+class ImportStatusChoices(DjangoChoices):
+    queued = ChoiceItem("queued")
+    running = ChoiceItem("running")
+    finished = ChoiceItem("finished")
+    error = ChoiceItem("error")
+
+
 class StatusWithScheduledChoices(StatusChoices):
     scheduled = ChoiceItem("Scheduled")
 
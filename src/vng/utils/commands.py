@@ -5,7 +5,7 @@ import subprocess
 logger = logging.getLogger(__name__)
 
 
-def run_command(command):
+def run_command(command, input=None):
     logger.info('running the COMMAND: %s', ' '.join(command) if not type(command) is str else command)
     my_env = os.environ.copy()
     my_env["CLOUDSDK_PYTHON"] = "/usr/bin/python2"
@@ -15,8 +15,13 @@ def run_command(command):
     if "HOME" not in my_env:
         my_env["HOME"] = "/home/maykin"
     # logger.info('Environment: {}'.format(str(my_env)))
-    subp = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=my_env)
-    res, error = subp.communicate('n\n')
+    if input is None:
+        subp = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=my_env)
+        res, error = subp.communicate('n\n')
+    else:
+        # Feed the content through stdin, e.g. for `kubectl apply -f -`
+        subp = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=my_env)
+        res, error = subp.communicate(input.encode('utf-8'))
     if error:
         logger.exception(error)
     if res is not None:
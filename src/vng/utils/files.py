@@ -0,0 +1,52 @@
+'''
+Housekeeping of the files cached on disk.
+
+The age of a cached file is the time since its last use: the caches touch a
+file when they serve it, so its modification time is its last use.
+'''
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def prune_directory(directory, max_age=None, max_bytes=None):
+    '''
+    Remove the files under the directory unused for `max_age` seconds, then
+    the least recently used ones until the rest fits in `max_bytes`. Returns
+    the number of removed files.
+    '''
+    files = []
+    for root, dirs, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Removed by another process meanwhile
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+    files.sort()
+
+    expired = time.time() - max_age if max_age is not None else None
+    total = sum(size for mtime, size, path in files)
+    removed = 0
+    for mtime, size, path in files:
+        if (expired is None or mtime >= expired) and (max_bytes is None or total <= max_bytes):
+            break
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning('Could not remove %s: %s', path, e)
+            continue
+        total -= size
+        removed += 1
+    return removed
@@ -0,0 +1,177 @@
+'''
+Timing of the hot paths.
+
+`timer` measures a block of code. The duration is written to the `performance`
+log, recorded as a span of the Elastic APM transaction when there is one and
+counted in a histogram which `/metrics` exposes in the Prometheus text format.
+The histogram buckets are counters in the cache, so the web and the Celery
+processes add to the same histograms. Every process adds up its observations
+and flushes them to the cache every `METRICS_FLUSH_SECONDS`, one increment per
+changed counter instead of two per observation, and when it exits. A cache
+which is not shared between processes, like the `LocMemCache` of the dev and
+Jenkins settings, only shows the counts of the process serving `/metrics`.
+The label values of a histogram are fixed when it is declared, which keeps the
+number of counters bounded.
+'''
+import atexit
+import collections
+import contextlib
+import functools
+import logging
+import threading
+import time
+
+import elasticapm
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger('performance')
+
+# Upper bounds of the buckets in seconds, the last bucket is +Inf
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+
+registry = []
+
+# Increments not yet flushed to the cache
+_pending = collections.Counter()
+_lock = threading.Lock()
+_flushed = time.monotonic()
+
+
+class Histogram:
+
+    def __init__(self, name, documentation, label, values):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.values = tuple(values)
+        registry.append(self)
+
+    def _key(self, value, suffix):
+        return 'metrics:{}:{}:{}'.format(self.name, value, suffix)
+
+    def observe(self, value, seconds):
+        if value not in self.values:
+            raise ValueError('{} is not a {} of {}'.format(value, self.label, self.name))
+        if not settings.METRICS_ENABLED:
+            return
+        bucket = next((i for i, bound in enumerate(BUCKETS) if seconds <= bound), len(BUCKETS))
+        with _lock:
+            _pending[self._key(value, bucket)] += 1
+            # Counters are integers, the sum is kept in microseconds
+            _pending[self._key(value, 'sum')] += int(seconds * 1000000)
+            due = time.monotonic() - _flushed >= settings.METRICS_FLUSH_SECONDS
+        if due:
+            flush()
+
+    def render(self):
+        lines = [
+            '# HELP {} {}'.format(self.name, self.documentation),
+            '# TYPE {} histogram'.format(self.name),
+        ]
+        keys = [
+            self._key(value, suffix)
+            for value in self.values for suffix in list(range(len(BUCKETS) + 1)) + ['sum']
+        ]
+        counters = cache.get_many(keys)
+        for value in self.values:
+            label = '{}="{}"'.format(self.label, value)
+            count = 0
+            for i, bound in enumerate(BUCKETS + ('+Inf',)):
+                count += counters.get(self._key(value, i), 0)
+                lines.append('{}_bucket{{{},le="{}"}} {}'.format(self.name, label, bound, count))
+            lines.append('{}_sum{{{}}} {}'.format(
+                self.name, label, counters.get(self._key(value, 'sum'), 0) / 1000000
+            ))
+            lines.append('{}_count{{{}}} {}'.format(self.name, label, count))
+        return lines
+
+
+def _increment(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # The counter does not exist yet, another process may create it first
+        if not cache.add(key, delta, timeout=None):
+            cache.incr(key, delta)
+
+
+def flush():
+    '''
+    Add the pending increments of this process to the counters in the cache
+    '''
+    global _flushed
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _flushed = time.monotonic()
+    for key, delta in pending.items():
+        if delta:
+            _increment(key, delta)
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception:
+        logger.exception('Flushing the metrics failed')
+
+
+def render_metrics():
+    flush()
+    lines = []
+    for histogram in registry:
+        lines.extend(histogram.render())
+    return '\n'.join(lines) + '\n'
+
+
+@contextlib.contextmanager
+def timer(histogram, value):
+    start = time.perf_counter()
+    try:
+        with elasticapm.capture_span('{} {}'.format(histogram.name, value), span_type='app'):
+            yield
+    finally:
+        seconds = time.perf_counter() - start
+        logger.info('%s %s=%s %.1f ms', histogram.name, histogram.label, value, seconds * 1000)
+        try:
+            histogram.observe(value, seconds)
+        except Exception:
+            # Metrics must never break the measured code
+            logger.exception('Recording %s failed', histogram.name)
+
+
+def timed(histogram, value):
+    '''
+    Decorator version of `timer`
+    '''
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(histogram, value):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+PROXY = Histogram(
+    'vng_proxy_phase_seconds', 'Duration of the phases of a call through the proxy of a session',
+    'phase', ('lookup', 'rewrite', 'upstream', 'log', 'matching', 'response'),
+)
+PROVIDER_RUN = Histogram(
+    'vng_provider_run_stage_seconds', 'Duration of the stages of a Postman test of a provider run',
+    'stage', ('newman', 'hidden_vars', 'ingest'),
+)
+KUBERNETES = Histogram(
+    'vng_kubernetes_operation_seconds', 'Duration of the Kubernetes operations',
+    'operation', (
+        'initialize', 'fetch', 'delete', 'pod_log', 'pod_status', 'service_status', 'scale', 'exec', 'copy',
+        'apply', 'diff',
+    ),
+)
+DESIGN_RULES = Histogram(
+    'vng_design_rules_stage_seconds', 'Duration of the stages of a design rule session',
+    'stage', ('fetch', 'rules'),
+)
@@ -0,0 +1,104 @@
+import json
+import re
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from vng.design_rules.models import DesignRuleResult
+from vng.servervalidation.models import ServerRun
+from vng.servervalidation.views import EnvironmentList
+from vng.testsession.models import ExposedUrl, Report, Session, SessionLog
+from vng.utils import choices
+
+EXECUTION_TIME_RE = re.compile(r'Execution Time: ([\d.]+) ms')
+
+
+def hot_queries():
+    '''
+    Return the hot queries of the proxy and the list pages as (name, queryset),
+    with the parameters taken from the latest rows in the database
+    '''
+    queries = []
+    exposed_url = ExposedUrl.objects.select_related('session').order_by('-pk').first()
+    if exposed_url:
+        session = exposed_url.session
+        queries += [
+            ('proxy exposed URL', ExposedUrl.objects.filter(session=session, subdomain=exposed_url.subdomain)),
+            ('session reports', Report.objects.filter(session_log__session=session)),
+            ('session logs page', SessionLog.objects.filter(session=session).order_by('date', 'pk')[:200]),
+            ('sessions list', Session.objects.filter(
+                user=session.user, session_type__api=session.session_type.api_id
+            ).order_by('-started')),
+            ('active sessions', Session.objects.filter(
+                user=session.user, status__in=[choices.StatusChoices.starting, choices.StatusChoices.running]
+            )),
+        ]
+    queries.append(('idle sessions', Session.objects.filter(
+        status=choices.StatusChoices.running, last_activity__lte=timezone.now() - timedelta(hours=2)
+    )))
+
+    server_run = ServerRun.objects.exclude(environment=None).select_related('test_scenario').order_by('-pk').first()
+    if server_run:
+        environment_list = EnvironmentList()
+        environment_list.kwargs = {'api_id': server_run.test_scenario.api_id}
+        environment_list.request = SimpleNamespace(user=server_run.user)
+        queries += [
+            ('provider runs list', ServerRun.objects.filter(
+                environment=server_run.environment_id, test_scenario=server_run.test_scenario_id
+            ).order_by('-stopped')[:10]),
+            ('latest badge', ServerRun.objects.filter(environment=server_run.environment_id).order_by('-stopped')[:1]),
+            ('environments list', environment_list.get_queryset()[:10]),
+        ]
+
+    result = DesignRuleResult.objects.order_by('-pk').first()
+    if result:
+        queries.append(('design rule result', DesignRuleResult.objects.filter(
+            design_rule=result.design_rule_id, rule_type=result.rule_type
+        )))
+    return queries
+
+
+class Command(BaseCommand):
+    help = (
+        "Show the EXPLAIN ANALYZE plans of the hot queries. Store the timings with --output before a change and "
+        "compare them afterwards with --compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help="Write the execution times in milliseconds as JSON to this file")
+        parser.add_argument("--compare", help="Compare the execution times with the ones in this file")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per query, the fastest run is reported")
+        parser.add_argument("--quiet", action="store_true", help="Only show the execution times, not the plans")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("EXPLAIN ANALYZE plans need PostgreSQL")
+        baseline = {}
+        if options["compare"]:
+            try:
+                with open(options["compare"]) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(e)
+
+        timings = {}
+        for name, queryset in hot_queries():
+            plans = [queryset.explain(analyze=True) for __ in range(max(options["repeat"], 1))]
+            times = [float(m.group(1)) for m in map(EXECUTION_TIME_RE.search, plans) if m]
+            plan = plans[times.index(min(times))] if times else plans[-1]
+            timings[name] = min(times) if times else None
+
+            line = "{}: {} ms".format(name, timings[name])
+            if baseline.get(name) and timings[name] is not None:
+                line += " (was {} ms, {:+.0%})".format(baseline[name], timings[name] / baseline[name] - 1)
+            self.stdout.write(self.style.MIGRATE_HEADING(line))
+            if not options["quiet"]:
+                self.stdout.write(plan)
+                self.stdout.write("")
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(timings, f, indent=2)
@@ -1,5 +1,13 @@
+import cProfile
+import os
+import re
+import time
+import uuid
+
 from django.conf import settings
 
+from .profiling import SamplingProfiler
+
 
 class APIVersionHeaderMiddleware:
     def __init__(self, get_response):
@@ -9,3 +17,44 @@ class APIVersionHeaderMiddleware:
         response = self.get_response(request)
         response['API-Version'] = settings.SPECTACULAR_SETTINGS.get("VERSION")
         return response
+
+
+class ProfilingMiddleware:
+    """
+    Profile the requests of staff users which send the `X-Profile` header.
+    `X-Profile: pstats` stores the statistics of cProfile, any other value the
+    collapsed stacks of the sampling profiler for a flame graph. The name of
+    the file in `PROFILE_DIR` is returned in the `X-Profile-File` header. The
+    `prune_caches` task removes the profiles older than `PROFILE_MAX_AGE`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = request.META.get('HTTP_X_PROFILE')
+        user = getattr(request, 'user', None)
+        if not mode or user is None or not user.is_staff:
+            return self.get_response(request)
+
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        name = '{}-{}-{}'.format(
+            time.strftime('%Y%m%d-%H%M%S'), re.sub(r'[^\w]+', '_', request.path).strip('_')[:50] or 'root',
+            uuid.uuid4().hex[:8]
+        )
+        if mode == 'pstats':
+            profiler = cProfile.Profile()
+            response = profiler.runcall(self.get_response, request)
+            filename = '{}.pstats'.format(name)
+            profiler.dump_stats(os.path.join(settings.PROFILE_DIR, filename))
+        else:
+            profiler = SamplingProfiler(settings.PROFILE_INTERVAL)
+            profiler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.stop()
+            filename = '{}.folded'.format(name)
+            profiler.dump(os.path.join(settings.PROFILE_DIR, filename))
+        response['X-Profile-File'] = filename
+        return response
@@ -0,0 +1,174 @@
+'''
+Loading of OpenAPI specifications.
+
+The C LibYAML loader and orjson are used when they are installed, large specs
+are parsed several times faster than with the pure Python implementations. The
+parsed spec is indexed once in a `SpecModel`, which is shared by the design
+rules and the scenario case import. References are followed by a `RefResolver`.
+'''
+import json
+import logging
+from collections import namedtuple
+from urllib.parse import unquote, urldefrag, urljoin, urlparse
+
+import yaml
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def load_json(content):
+    if orjson is not None:
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # orjson is stricter than the standard library, e.g. for NaN values
+            pass
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', errors='replace')
+    return json.loads(content)
+
+
+def load_yaml(content):
+    return yaml.load(content, Loader=YamlLoader)
+
+
+class RefResolutionError(Exception):
+    pass
+
+
+def _pointer(document, pointer):
+    target = document
+    for key in pointer.split('/')[1:]:
+        key = unquote(key).replace('~1', '/').replace('~0', '~')
+        try:
+            target = target[int(key)] if isinstance(target, list) else target[key]
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise RefResolutionError('Pointer {} does not exist'.format(pointer))
+    return target
+
+
+class RefResolver:
+    '''
+    Resolve the `$ref`s of a spec to local, relative-file and remote documents.
+
+    Every document is fetched once per resolver and the resolved fragments are
+    memoized, share the resolver between the specs of one import. A `$ref`
+    pointing back into the fragment being resolved (a recursive schema) is
+    kept as it is.
+    '''
+
+    def __init__(self, spec, base_url=None, fetch=None):
+        self.base_url = urldefrag(base_url or '')[0]
+        self.documents = {self.base_url: spec}
+        self._fetch = fetch
+        self._resolved = {}
+        self._resolving = set()
+
+    def _document(self, url):
+        if url not in self.documents:
+            if not urlparse(url).scheme:
+                raise RefResolutionError('Relative reference {} without a base URL'.format(url))
+            fetch = self._fetch or fetch_document
+            self.documents[url] = fetch(url)
+        return self.documents[url]
+
+    def _locate(self, ref, base_url):
+        url, pointer = urldefrag(ref)
+        return (urljoin(base_url, url) if url else base_url), pointer
+
+    def resolve(self, obj, base_url=None):
+        '''
+        Return the object with all its (nested) references replaced by their targets
+        '''
+        return self._resolve(obj, self.base_url if base_url is None else base_url)
+
+    def _resolve(self, obj, base_url):
+        if isinstance(obj, list):
+            return [self._resolve(item, base_url) for item in obj]
+        if not isinstance(obj, dict):
+            return obj
+        if isinstance(obj.get('$ref'), str):
+            key = self._locate(obj['$ref'], base_url)
+            if key in self._resolved:
+                return self._resolved[key]
+            if key in self._resolving:
+                return obj
+            self._resolving.add(key)
+            try:
+                target = _pointer(self._document(key[0]), key[1])
+                self._resolved[key] = self._resolve(target, key[0])
+            finally:
+                self._resolving.discard(key)
+            return self._resolved[key]
+        return {name: self._resolve(value, base_url) for name, value in obj.items()}
+
+
+def fetch_document(url):
+    from .specs import fetch_spec
+
+    response = fetch_spec(url)
+    if not response or not response.ok:
+        raise RefResolutionError('Could not fetch {}'.format(url))
+    try:
+        if urlparse(url).path.endswith('.json'):
+            document = load_json(response.content)
+        else:
+            document = load_yaml(response.content)
+    except (ValueError, yaml.YAMLError) as e:
+        raise RefResolutionError('Could not parse {}: {}'.format(url, e))
+    if not isinstance(document, dict):
+        raise RefResolutionError('{} is not an object'.format(url))
+    return document
+
+
+Operation = namedtuple('Operation', ['path', 'method', 'details', 'parameters'])
+
+
+class SpecModel:
+    '''
+    An OpenAPI specification with its operations and schemas indexed
+    '''
+
+    def __init__(self, spec, base_url=None, resolver=None):
+        self.raw = spec if isinstance(spec, dict) else {}
+        self.resolver = resolver or RefResolver(self.raw, base_url)
+        self.version = self.raw.get('openapi', self.raw.get('swagger'))
+        self.paths = self.raw.get('paths') or {}
+        self.servers = self.raw.get('servers') or []
+        self.schemas = (self.raw.get('components') or {}).get('schemas') or self.raw.get('definitions') or {}
+        self.operations = []
+        for path, path_item in self.paths.items():
+            if not isinstance(path_item, dict):
+                continue
+            for method, details in path_item.items():
+                # Path level parameters are a list, not an operation
+                if not isinstance(details, dict):
+                    continue
+                self.operations.append(Operation(
+                    path, method, details,
+                    [self.resolve(parameter) for parameter in details.get('parameters') or []]
+                ))
+
+    def __bool__(self):
+        return bool(self.raw)
+
+    def resolve(self, obj):
+        '''
+        Return the object with its references resolved, or unresolved when
+        a reference cannot be followed
+        '''
+        try:
+            return self.resolver.resolve(obj)
+        except RefResolutionError as e:
+            logger.info('Could not resolve %s: %s', obj, e)
+            return obj
+
+    def get_schema(self, name):
+        return self.resolve(self.schemas.get(name))
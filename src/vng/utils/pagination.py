@@ -0,0 +1,116 @@
+'''
+Keyset pagination on (date, id).
+
+A page holds the rows after (or before) a row of the previous page, found
+through an index on the ordering instead of an OFFSET scan, so deep pages cost
+the same as the first one. The position is an opaque cursor with the date and
+the id of that row.
+'''
+import base64
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def encode_cursor(obj):
+    position = '{}|{}'.format(obj.date.isoformat(), obj.pk)
+    return base64.urlsafe_b64encode(position.encode('ascii')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    '''
+    Return the (date, id) of the cursor, raises ValueError when it is not valid
+    '''
+    try:
+        date, pk = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('ascii').split('|')
+        date = parse_datetime(date)
+        pk = int(pk)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError('Invalid cursor')
+    if date is None:
+        raise ValueError('Invalid cursor')
+    return date, pk
+
+
+def keyset_page(queryset, page_size, after=None, before=None):
+    '''
+    Return the rows of the page and the cursors of the previous and the next
+    page, None when there is no such page
+    '''
+    if before:
+        date, pk = decode_cursor(before)
+        rows = list(
+            queryset.filter(Q(date__lt=date) | Q(date=date, pk__lt=pk)).order_by('-date', '-pk')[:page_size + 1]
+        )
+        has_previous = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        if not rows:
+            return rows, None, None
+        # The row of the cursor is on the next page
+        return rows, encode_cursor(rows[0]) if has_previous else None, encode_cursor(rows[-1])
+
+    if after:
+        date, pk = decode_cursor(after)
+        queryset = queryset.filter(Q(date__gt=date) | Q(date=date, pk__gt=pk))
+    rows = list(queryset.order_by('date', 'pk')[:page_size + 1])
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    previous = encode_cursor(rows[0]) if after and rows else None
+    return rows, previous, encode_cursor(rows[-1]) if has_next else None
+
+
+class KeysetPagination(BasePagination):
+    '''
+    Pagination with `?after=` and `?before=` cursors, for querysets with a `date` field
+    '''
+    page_size = 100
+    max_page_size = 1000
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            rows, self.previous, self.next = keyset_page(
+                queryset, self.get_page_size(request),
+                after=request.query_params.get('after'), before=request.query_params.get('before')
+            )
+        except ValueError as e:
+            raise NotFound(str(e))
+        return rows
+
+    def get_link(self, param, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'before' if param == 'after' else 'after')
+        return replace_query_param(url, param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_link('after', self.next)),
+            ('previous', self.get_link('before', self.previous)),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,109 @@
+'''
+Rendering of the PDF reports.
+
+WeasyPrint needs tens of seconds and a lot of memory for the reports of large
+Newman runs, so the PDF is written by a Celery task and stored on disk. The
+file is keyed by the object, a fingerprint of its results and
+`PDF_TEMPLATE_VERSION`: later downloads of an unchanged report are served from
+disk and a changed report gets a new key. Concurrent requests for the same
+report share one render through a cache lock. A failed render is remembered
+for `PDF_FAILURE_SECONDS`, so the waiting page is not reloaded for a report
+which cannot be rendered.
+'''
+import hashlib
+import logging
+import os
+import tempfile
+
+from weasyprint import HTML
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ..celery.celery import app
+from .files import touch
+
+logger = logging.getLogger(__name__)
+
+
+def report_key(*parts):
+    key = '|'.join(str(part) for part in parts + (settings.PDF_TEMPLATE_VERSION,))
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def pdf_path(key):
+    return os.path.join(settings.PDF_CACHE_DIR, key[:2], '{}.pdf'.format(key))
+
+
+def _html_path(key):
+    return os.path.join(settings.PDF_CACHE_DIR, key[:2], '{}.html'.format(key))
+
+
+def _lock_key(key):
+    return 'pdf-render-{}'.format(key)
+
+
+def _failure_key(key):
+    return 'pdf-failed-{}'.format(key)
+
+
+class PDFRenderError(Exception):
+    pass
+
+
+def _check_failure(key):
+    if cache.get(_failure_key(key)):
+        raise PDFRenderError('Rendering the PDF report {} failed'.format(key))
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def request_pdf(key, render_html, base_url):
+    '''
+    Return the path of the PDF when it is available, otherwise schedule its
+    render and return None. `render_html` is only called by the request which
+    takes the render lock, the others wait for that render. Raises
+    `PDFRenderError` when the last render of the report failed.
+    '''
+    path = pdf_path(key)
+    if os.path.exists(path):
+        touch(path)
+        return path
+    _check_failure(key)
+    # None when the cache is unreachable, render without the lock then
+    if cache.add(_lock_key(key), True, settings.PDF_RENDER_LOCK_SECONDS) is not False:
+        try:
+            _write(_html_path(key), render_html().encode('utf-8'))
+        except Exception:
+            cache.delete(_lock_key(key))
+            raise
+        render_pdf.delay(key, base_url)
+    # Already written, or failed, when the task ran eagerly
+    if os.path.exists(path):
+        return path
+    _check_failure(key)
+    return None
+
+
+@app.task
+def render_pdf(key, base_url):
+    html_path = _html_path(key)
+    try:
+        with open(html_path, encoding='utf-8') as f:
+            html = f.read()
+        _write(pdf_path(key), HTML(string=html, base_url=base_url).write_pdf())
+    except Exception:
+        logger.exception('Rendering the PDF report %s failed', key)
+        cache.set(_failure_key(key), True, settings.PDF_FAILURE_SECONDS)
+    finally:
+        cache.delete(_lock_key(key))
+        try:
+            os.remove(html_path)
+        except OSError:
+            pass
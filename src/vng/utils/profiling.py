@@ -0,0 +1,49 @@
+'''
+Profiling of single requests.
+
+`SamplingProfiler` takes the stack of the profiled thread at a fixed interval
+and counts the stacks in the collapsed format of flamegraph.pl and speedscope:
+one line per stack with the frames from the root, separated by `;`, followed by
+the number of samples.
+'''
+import collections
+import sys
+import threading
+import time
+
+
+class SamplingProfiler:
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.samples = collections.Counter()
+        self._stop = threading.Event()
+
+    def _stack(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append('{} ({}:{})'.format(code.co_name, code.co_filename, frame.f_lineno))
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+    def _sample(self, thread_id):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                self.samples[self._stack(frame)] += 1
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample, args=(threading.get_ident(),), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.seconds = time.perf_counter() - self.started
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write('{} {}\n'.format(stack, count))
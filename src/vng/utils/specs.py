@@ -0,0 +1,197 @@
+'''
+Fetching of API specifications, shared by the design rules, the scenario case
+import and the OAS inspector.
+
+Successful responses are kept in an on-disk cache keyed by URL. A cached
+specification is revalidated with the ETag and Last-Modified validators of the
+previous response, so an unchanged specification is not transferred again. The
+bodies are stored by content hash, identical specifications are stored once.
+Entries unused for `SPEC_CACHE_MAX_AGE` seconds, and the least recently used
+ones beyond `SPEC_CACHE_MAX_BYTES`, are removed by the `prune_caches` task.
+'''
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from requests.structures import CaseInsensitiveDict
+
+from .files import prune_directory, touch
+from .oas import load_json
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+class SpecResponse:
+    '''
+    The parts of a `requests.Response` needed to read a specification
+    '''
+
+    def __init__(self, url, status_code, headers, content, encoding=None, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.encoding = encoding
+        self.from_cache = from_cache
+
+    @classmethod
+    def from_response(cls, response):
+        return cls(response.url, response.status_code, response.headers, response.content, response.encoding)
+
+    def __repr__(self):
+        return '<SpecResponse [{}]>'.format(self.status_code)
+
+    def __bool__(self):
+        return self.ok
+
+    @property
+    def ok(self):
+        return 200 <= self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    @property
+    def content_hash(self):
+        return content_hash(self.content)
+
+    def json(self):
+        return load_json(self.content)
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class SpecCache:
+
+    def __init__(self, directory=None):
+        self.directory = directory or settings.SPEC_CACHE_DIR
+
+    def _meta_path(self, url):
+        return os.path.join(self.directory, 'urls', '{}.json'.format(content_hash(url.encode('utf-8'))))
+
+    def _blob_path(self, digest):
+        return os.path.join(self.directory, 'blobs', digest[:2], digest)
+
+    def get(self, url):
+        '''
+        Return the metadata of the cached response of the URL, None when absent
+        '''
+        try:
+            with open(self._meta_path(url)) as f:
+                meta = json.load(f)
+            if os.path.exists(self._blob_path(meta['hash'])):
+                return meta
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    def load(self, meta, headers=None):
+        with open(self._blob_path(meta['hash']), 'rb') as f:
+            content = f.read()
+        touch(self._blob_path(meta['hash']))
+        return SpecResponse(
+            meta['url'], meta['status_code'], headers or meta['headers'], content,
+            meta['encoding'], from_cache=True
+        )
+
+    def store(self, url, response):
+        digest = content_hash(response.content)
+        try:
+            if os.path.exists(self._blob_path(digest)):
+                touch(self._blob_path(digest))
+            else:
+                _write(self._blob_path(digest), response.content)
+        except OSError as e:
+            logger.warning('Could not cache the specification of %s: %s', url, e)
+            return SpecResponse.from_response(response)
+        self._store_meta(url, {
+            'url': response.url,
+            'status_code': response.status_code,
+            'headers': dict(response.headers),
+            'encoding': response.encoding,
+            'hash': digest,
+        })
+        return SpecResponse.from_response(response)
+
+    def revalidated(self, url, meta, headers):
+        '''
+        Return the cached response, updated with the headers of a 304 response
+        '''
+        merged = CaseInsensitiveDict(meta['headers'])
+        merged.update(headers)
+        meta['headers'] = dict(merged)
+        self._store_meta(url, meta)
+        return self.load(meta, merged)
+
+    def _store_meta(self, url, meta):
+        try:
+            _write(self._meta_path(url), json.dumps(meta).encode('utf-8'))
+        except OSError as e:
+            logger.warning('Could not cache the specification of %s: %s', url, e)
+
+    def prune(self, max_age=None, max_bytes=None):
+        '''
+        Remove the bodies unused for `max_age` seconds and the least recently
+        used ones beyond `max_bytes`, and the metadata unused for `max_age`
+        seconds. Metadata whose body is gone counts as a cache miss.
+        '''
+        max_age = settings.SPEC_CACHE_MAX_AGE if max_age is None else max_age
+        max_bytes = settings.SPEC_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        removed = prune_directory(os.path.join(self.directory, 'blobs'), max_age, max_bytes)
+        return removed + prune_directory(os.path.join(self.directory, 'urls'), max_age)
+
+
+def fetch_spec(url, timeout=60, verify=True, cache=None):
+    '''
+    Return the response of the URL, served from the cache when the
+    specification did not change, None when the URL did not resolve
+    '''
+    cache = cache or SpecCache()
+    meta = cache.get(url)
+    headers = {}
+    if meta:
+        validators = CaseInsensitiveDict(meta['headers'])
+        if 'ETag' in validators:
+            headers['If-None-Match'] = validators['ETag']
+        if 'Last-Modified' in validators:
+            headers['If-Modified-Since'] = validators['Last-Modified']
+
+    try:
+        response = requests.get(url, headers=headers, timeout=timeout, verify=verify)
+    except requests.RequestException as e:
+        logger.info('Fetching %s failed: %s', url, e)
+        return None
+
+    if response.status_code == 304 and meta:
+        return cache.revalidated(url, meta, response.headers)
+    if response.ok:
+        return cache.store(url, response)
+    return SpecResponse.from_response(response)
+
+
+def fetch_specs(urls, **kwargs):
+    '''
+    Fetch the URLs in parallel, returns the responses in the same order
+    '''
+    if not urls:
+        return []
+    cache = kwargs.pop('cache', None) or SpecCache()
+    with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+        futures = [executor.submit(fetch_spec, url, cache=cache, **kwargs) for url in urls]
+        return [future.result() for future in futures]
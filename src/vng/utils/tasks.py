@@ -0,0 +1,21 @@
+from celery.utils.log import get_task_logger
+
+from django.conf import settings
+
+from ..celery.celery import app
+from .files import prune_directory
+from .specs import SpecCache
+
+logger = get_task_logger(__name__)
+
+
+@app.task
+def prune_caches():
+    '''
+    Remove the stale files of the caches on disk and the old request profiles
+    '''
+    logger.info('Removed %s files from the specification cache', SpecCache().prune())
+    removed = prune_directory(settings.PDF_CACHE_DIR, settings.PDF_CACHE_MAX_AGE, settings.PDF_CACHE_MAX_BYTES)
+    logger.info('Removed %s files from the PDF cache', removed)
+    removed = prune_directory(settings.PROFILE_DIR, settings.PROFILE_MAX_AGE, settings.PROFILE_MAX_BYTES)
+    logger.info('Removed %s request profiles', removed)
@@ -1,11 +1,14 @@
 import functools
+import hmac
+import os
+import re
 from collections.abc import Iterable
 
-from weasyprint import HTML
-
 from django import http
-from django.http import Http404, HttpResponse
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
 from django.template import loader, TemplateDoesNotExist
+from django.template.response import TemplateResponse
 from django.shortcuts import get_object_or_404
 from django.views.defaults import ERROR_500_TEMPLATE_NAME
 from django.utils.decorators import method_decorator
@@ -17,6 +20,9 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic.list import MultipleObjectMixin, MultipleObjectTemplateResponseMixin, ListView
 from django.views.generic.detail import DetailView
 
+from .instrumentation import render_metrics
+from .pdf import PDFRenderError, report_key, request_pdf
+
 
 def rsetattr(obj, attr, val):
     pre, _, post = attr.rpartition('.')
@@ -29,6 +35,52 @@ def rgetattr(obj, attr, *args):
     return functools.reduce(_getattr, [obj] + attr.split('.'))
 
 
+BYTE_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _read_range(f, length, chunk_size=64 * 1024):
+    with f:
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def ranged_file_response(request, path, content_type, filename=None):
+    """
+    Stream the file, or the part of it asked for with a single byte range in
+    the `Range` header. Other ranges are ignored and the whole file is sent.
+    """
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        raise Http404
+    match = BYTE_RANGE_RE.match(request.META.get('HTTP_RANGE', '').replace(' ', ''))
+    if match and any(match.groups()):
+        first, last = match.groups()
+        if first:
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1
+        if start >= size or start > end:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */{}'.format(size)
+            return response
+        f = open(path, 'rb')
+        f.seek(start)
+        response = StreamingHttpResponse(_read_range(f, end - start + 1), status=206, content_type=content_type)
+        response['Content-Range'] = 'bytes {}-{}/{}'.format(start, end, size)
+        response['Content-Length'] = end - start + 1
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    response['Accept-Ranges'] = 'bytes'
+    if filename:
+        response['Content-Disposition'] = 'attachment; filename="{}"'.format(filename)
+    return response
+
+
 @requires_csrf_token
 def server_error(request, template_name=ERROR_500_TEMPLATE_NAME):
     """
@@ -48,6 +100,20 @@ def server_error(request, template_name=ERROR_500_TEMPLATE_NAME):
     return http.HttpResponseServerError(template.render(context))
 
 
+def metrics(request):
+    """
+    The timing histograms in the Prometheus text format, for staff users and
+    for requests with the bearer token of `METRICS_TOKEN`.
+    """
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    token_valid = bool(settings.METRICS_TOKEN) and hmac.compare_digest(
+        authorization, 'Bearer {}'.format(settings.METRICS_TOKEN)
+    )
+    if not token_valid and not request.user.is_staff:
+        raise PermissionDenied
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 class ObjectOwner(LoginRequiredMixin):
     field_name = None
     user_field = 'user'
@@ -116,11 +182,64 @@ class OwnerSingleObject(ObjectOwner, DetailView):
 
 
 class PDFGenerator():
+    """
+    Serve the rendered template as a PDF. The PDF is rendered in the
+    background and stored, until it is available a page refreshing itself is
+    returned with status 202. The page stops refreshing after
+    `PDF_MAX_REFRESHES` attempts, and an error page is returned with status 500
+    when the render failed. Subclasses describe the results shown by the
+    report in `get_pdf_fingerprint`, a changed fingerprint renders a new PDF.
+    """
+
+    generating_template_name = 'pdf-generating.html'
+    failed_template_name = 'pdf-failed.html'
+    refresh_seconds = 5
+
+    def get_pdf_fingerprint(self):
+        return []
+
+    def get_pdf_filename(self):
+        return getattr(self, 'filename', None)
+
+    def render_html(self):
+        context = self.get_context_data(object=self.object)
+        return self.render_to_response(context).render().content.decode('utf-8')
 
     def get(self, request, *args, **kwargs):
-        response = super().get(request, *args, **kwargs).render().content.decode('utf-8')
-        pdf = HTML(string=response, base_url=request.build_absolute_uri('/')).write_pdf()
-        response = HttpResponse(pdf, content_type='application/pdf')
-        if hasattr(self, 'filename'):
-            response['Content-Disposition'] = 'attachment; filename="{}"'.format(self.filename)
-        return response
+        self.object = self.get_object()
+        if isinstance(self, OwnerSingleObject):
+            self.check_ownership(self.get_queryset(self.object))
+
+        key = report_key(
+            self.template_name, type(self.object).__name__, getattr(self.object, 'uuid', self.object.pk),
+            *self.get_pdf_fingerprint()
+        )
+        try:
+            path = request_pdf(key, self.render_html, request.build_absolute_uri('/'))
+        except PDFRenderError:
+            return TemplateResponse(request, self.failed_template_name, status=500)
+        if path is None:
+            try:
+                attempt = int(request.GET.get('attempt', 0))
+            except ValueError:
+                attempt = 0
+            refresh = attempt < settings.PDF_MAX_REFRESHES
+            query = request.GET.copy()
+            query.pop('attempt', None)
+            # Trying again by hand starts counting the attempts again
+            retry_url = '{}?{}'.format(request.path, query.urlencode()) if query else request.path
+            query['attempt'] = attempt + 1
+            response = TemplateResponse(request, self.generating_template_name, {
+                'refresh': refresh,
+                'refresh_seconds': self.refresh_seconds,
+                'refresh_url': '{}?{}'.format(request.path, query.urlencode()),
+                'retry_url': retry_url,
+            }, status=202)
+            if refresh:
+                response['Retry-After'] = self.refresh_seconds
+            return response
+
+        filename = self.get_pdf_filename()
+        return FileResponse(
+            open(path, 'rb'), content_type='application/pdf', as_attachment=bool(filename), filename=filename or ''
+        )